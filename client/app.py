@@ -3,6 +3,7 @@ from components.auth_ui import render_auth
 from components.upload import render_uploader
 from components.sidebar import render_sidebar
 from components.chatUI import render_chat
+from components.history_download import render_history_download
 
 st.set_page_config(page_title="VitaAI", layout="wide", page_icon="🩺")
 
@@ -17,5 +18,8 @@ else:
     with st.expander("📂 Upload Documents", expanded=False):
         render_uploader()
 
+    with st.expander("⬇️ Export Chats", expanded=False):
+        render_history_download()
+
     # 3. Render the Chat Interface
     render_chat()
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Benchmark: API call latency from the Streamlit client, new connection per call
+(plain requests.get, the old behaviour) vs the pooled keep-alive session (utils/http.py).
+
+A local stub server answers GET /chat/sessions with a small JSON body. Loopback has
+almost no latency, so --rtt-ms emulates the network: every request costs one round
+trip and every new connection one more (TCP handshake), or two more with --tls.
+
+Run from the client directory:
+    python -m benchmarks.bench_http_pool --requests 300 --rtt-ms 20 --tls
+"""
+import argparse
+import json
+import os
+import socket
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from utils.http import make_session, TIMEOUTS
+
+BODY = json.dumps([{"id": i, "title": f"Chat {i}", "updated_at": None} for i in range(20)]).encode()
+
+
+def make_handler(rtt: float, tls: bool):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive unless the client closes
+
+        def setup(self):
+            if tls:
+                self.request.do_handshake()  # in the handler thread, not the accept loop
+            # Headers and body are separate writes; like uvicorn, don't let Nagle hold the body back
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            super().setup()
+            self.connection.settimeout(30)  # idle keep-alive connections must not pin threads
+            time.sleep(rtt * (2 if tls else 1))
+
+        def do_GET(self):
+            time.sleep(rtt)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def self_signed_context(root: str) -> ssl.SSLContext:
+    cert, key = os.path.join(root, "cert.pem"), os.path.join(root, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def start_server(rtt: float, tls: bool, root: str):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(rtt, tls))
+    server.daemon_threads = True
+    if tls:
+        context = self_signed_context(root)
+        server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scheme = "https" if tls else "http"
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/chat/sessions"
+
+
+def run(get, url: str, n: int) -> list[float]:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = get(url)
+        response.raise_for_status()
+        response.json()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list[float]):
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(f"{label:<28} mean {statistics.mean(latencies):7.2f} ms  "
+          f"p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="emulated network round trip")
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS with a self-signed certificate")
+    args = parser.parse_args()
+    rtt = args.rtt_ms / 1000
+
+    with tempfile.TemporaryDirectory() as root:
+        server, url = start_server(rtt, args.tls, root)
+        verify = not args.tls  # self-signed
+        timeout = TIMEOUTS["default"]
+        warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+
+        def unpooled(u):
+            return requests.get(u, timeout=timeout, verify=verify)
+
+        session = make_session()
+
+        def pooled(u):
+            return session.get(u, timeout=timeout, verify=verify)
+
+        run(unpooled, url, 5)  # warm up imports and the server threads
+        run(pooled, url, 5)
+        results = {
+            "new connection per call": run(unpooled, url, args.requests),
+            "pooled keep-alive session": run(pooled, url, args.requests),
+        }
+        server.shutdown()
+
+    print(f"{args.requests} sequential GETs, rtt {args.rtt_ms:g} ms, {'https' if args.tls else 'http'}")
+    for label, latencies in results.items():
+        report(label, latencies)
+    before, after = (statistics.mean(v) for v in results.values())
+    print(f"speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
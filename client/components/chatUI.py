@@ -1,6 +1,28 @@
+import time
 import streamlit as st
-import json
-from utils.api import ask_question_stream, get_session_messages_api
+from utils.api import ask_question_stream
+from utils.data import get_messages, get_earlier_messages, invalidate_messages, invalidate_sessions, MESSAGES_PAGE
+
+# Only the latest messages are rendered; older ones are shown a page at a time on request
+HISTORY_WINDOW = 20
+HISTORY_PAGE = 20
+# Redraw the streaming answer at most this often (each redraw re-renders the whole markdown)
+RENDER_INTERVAL_SECONDS = 1 / 15
+
+
+def _to_chat(history):
+    return [{"role": msg["role"], "content": msg["content"]} for msg in history]
+
+
+def _next_cursor(page):
+    """before_id for the page before this one, or None if this was the oldest."""
+    return page[0]["id"] if len(page) >= MESSAGES_PAGE else None
+
+
+def load_earlier_page(session_id, token):
+    page = get_earlier_messages(session_id, token, st.session_state.history_before_id)
+    st.session_state.messages = _to_chat(page) + st.session_state.messages
+    st.session_state.history_before_id = _next_cursor(page)
 
 
 def render_chat():
@@ -16,14 +38,11 @@ def render_chat():
     # --- Load History ---
     if st.session_state.get("loaded_session_id") != session_id:
         with st.spinner("Loading history..."):
-            history = get_session_messages_api(session_id, token)
-            st.session_state.messages = []
-            for msg in history:
-                st.session_state.messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+            history = get_messages(session_id, token)
+            st.session_state.messages = _to_chat(history)
+            st.session_state.history_before_id = _next_cursor(history)
             st.session_state.loaded_session_id = session_id
+            st.session_state.history_window = HISTORY_WINDOW
 
         # --- ZERO STATE: Show Suggestions if chat is empty ---
         if not st.session_state.messages:
@@ -39,8 +58,19 @@ def render_chat():
 
 
 
-    # --- Display Messages ---
-    for msg in st.session_state.messages:
+    # --- Display Messages (latest window only) ---
+    messages = st.session_state.messages
+    window = st.session_state.get("history_window", HISTORY_WINDOW)
+    hidden = len(messages) - window
+    more_on_server = st.session_state.get("history_before_id") is not None
+    if hidden > 0 or more_on_server:
+        label = f"⬆️ Show earlier messages ({hidden} hidden)" if hidden > 0 else "⬆️ Load earlier messages"
+        if st.button(label):
+            if hidden < HISTORY_PAGE and more_on_server:
+                load_earlier_page(session_id, token)
+            st.session_state.history_window = window + HISTORY_PAGE
+            st.rerun()
+    for msg in messages[-window:]:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
 
@@ -57,33 +87,33 @@ def render_chat():
 
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
-            full_response = ""
-            raw_stream_data = ""
+            parts = []
             sources_data = []
-
-            for chunk in ask_question_stream(user_input, session_id, token):
-                raw_stream_data += chunk
-
-                if "|||SOURCES|||" in raw_stream_data:
-                    parts = raw_stream_data.split("|||SOURCES|||")
-                    full_response = parts[0]
-                    try:
-                        if len(parts) > 1 and parts[1].strip():
-                            sources_data = json.loads(parts[1])
-                    except:
-                        pass
-                else:
-                    full_response = raw_stream_data
-
-                message_placeholder.markdown(full_response + "▌")
-
+            error = None
+            last_render = 0.0
+
+            for event, data in ask_question_stream(user_input, session_id, token):
+                if event == "token":
+                    parts.append(data["text"])
+                    now = time.monotonic()
+                    if now - last_render >= RENDER_INTERVAL_SECONDS:
+                        message_placeholder.markdown("".join(parts) + "▌")
+                        last_render = now
+                elif event == "sources":
+                    sources_data = data
+                elif event == "error":
+                    error = data.get("message", "Something went wrong")
+
+            full_response = "".join(parts)
             message_placeholder.markdown(full_response)
+            if error:
+                st.error(error)
 
             # --- Render Sources with Tags ---
             if sources_data:
                 with st.expander("📚 Referenced Sources", expanded=False):
                     for idx, source in enumerate(sources_data):
-                        score = source.get("score", 0)
+                        score = source.get("score")  # vector similarity; None for keyword-only hits
                         src_type = source.get("type", "Private")
 
                         # Determine Badge Style
@@ -92,13 +122,20 @@ def render_chat():
                         else:
                             badge_html = "<span style='background-color:#F3E5F5; color:#4A148C; padding:2px 6px; border-radius:4px; font-size:0.8em;'>🔒 Private</span>"
 
-                        score_color = "green" if score > 0.7 else "orange" if score > 0.5 else "red"
+                        if score is None:
+                            score_color, score_text = "gray", "Keyword match"
+                        else:
+                            score_color = "green" if score > 0.7 else "orange" if score > 0.5 else "red"
+                            score_text = f"Similarity: {score:.2f}"
 
                         st.markdown(
                             f"**{idx + 1}. {source['source']}** {badge_html} "
                             f"<span style='color:{score_color}; font-size:0.8em;'> "
-                            f"(Similarity: {score:.2f})</span>",
+                            f"({score_text})</span>",
                             unsafe_allow_html=True
                         )
 
-        st.session_state.messages.append({"role": "assistant", "content": full_response})
\ No newline at end of file
+        st.session_state.messages.append({"role": "assistant", "content": full_response})
+        # The server now has two more messages (and maybe a new title)
+        invalidate_messages(session_id)
+        invalidate_sessions()
\ No newline at end of file
@@ -1,11 +1,37 @@
 import streamlit as st
+from utils.api import export_chats_api
+
+# label -> (format parameter, MIME type for the download)
+EXPORT_FORMATS = {
+    "Markdown": ("markdown", "text/markdown"),
+    "CSV": ("csv", "text/csv"),
+    "NDJSON": ("ndjson", "application/x-ndjson"),
+}
+
 
 def render_history_download():
-    if st.session_state.get("messages"):
-        chat_text = "\n\n".join([f"{m['role'].upper()}: {m['content']}" for m in st.session_state.messages])
-        st.download_button(
-            "Download Chat History",
-            chat_text,
-            file_name="chat_history.txt",
-            mime="text/plain"
-        )
\ No newline at end of file
+    """Exports are built and streamed by the server (GET /chat/export), sources included."""
+    token = st.session_state.get("token")
+    session_id = st.session_state.get("active_session_id")
+    if not token:
+        return
+
+    label = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+    scope = st.radio("Chats", ["This chat", "All chats"], horizontal=True, key="export_scope",
+                     disabled=not session_id, index=0 if session_id else 1)
+    fmt, mime = EXPORT_FORMATS[label]
+
+    # Fetched on request only, never on every rerun
+    if st.button("Prepare export"):
+        with st.spinner("Exporting..."):
+            data, name = export_chats_api(token, fmt, session_id if scope == "This chat" else None)
+        if data is None:
+            st.error(name)
+            st.session_state.pop("export_file", None)
+        else:
+            st.session_state.export_file = (data, name, mime)
+
+    if "export_file" in st.session_state:
+        data, name, mime = st.session_state.export_file
+        data.seek(0)
+        st.download_button("Download Chat History", data, file_name=name, mime=mime)
@@ -1,6 +1,6 @@
 import streamlit as st
-from utils.api import get_sessions_api, create_session_api, delete_session_api
-import time
+from utils.api import create_session_api, delete_session_api
+from utils.data import get_sessions, invalidate_sessions
 
 
 def render_sidebar():
@@ -14,6 +14,7 @@ def render_sidebar():
     if st.sidebar.button("➕ New Chat", use_container_width=True):
         new_session = create_session_api(token)
         if new_session:
+            invalidate_sessions()
             st.session_state.active_session_id = new_session["id"]
             # Clear messages so the UI reloads cleanly
             st.session_state.messages = []
@@ -22,8 +23,8 @@ def render_sidebar():
     st.sidebar.markdown("---")
     st.sidebar.subheader("History")
 
-    # --- 2. Load Sessions ---
-    sessions = get_sessions_api(token)
+    # --- 2. Load Sessions (cached; see utils/data.py) ---
+    sessions = get_sessions(token)
 
     # Initialize active session if not set
     if "active_session_id" not in st.session_state and sessions:
@@ -32,6 +33,7 @@ def render_sidebar():
         # No sessions? Create one automatically for good UX
         new_session = create_session_api(token)
         if new_session:
+            invalidate_sessions()
             st.session_state.active_session_id = new_session["id"]
             st.rerun()
 
@@ -44,15 +46,21 @@ def render_sidebar():
         is_active = (st.session_state.get("active_session_id") == sess["id"])
         label = f"📂 {sess['title']}" if is_active else sess['title']
 
+        # Count and preview come with the list (denormalized on the server), no extra calls
+        count = sess.get("message_count", 0)
+        preview = sess.get("last_preview") or "No messages yet"
         with col1:
-            if st.button(label, key=f"sess_{sess['id']}", use_container_width=True):
+            if st.button(label, key=f"sess_{sess['id']}", use_container_width=True,
+                         help=f"{count} messages · {preview}"):
                 st.session_state.active_session_id = sess["id"]
-                st.session_state.messages = []  # Force reload of messages
+                st.session_state.messages = []  # Force reload of messages (served from the cache)
+                st.session_state.pop("loaded_session_id", None)
                 st.rerun()
 
         with col2:
             if st.button("🗑️", key=f"del_{sess['id']}"):
                 delete_session_api(sess["id"], token)
+                invalidate_sessions()
                 # If we deleted the active one, clear the state
                 if is_active:
                     del st.session_state.active_session_id
@@ -1,8 +1,60 @@
 import streamlit as st
-from utils.api import upload_files_api, get_session_files_api, delete_file_api, check_task_status_api
+from utils.api import upload_files_api, delete_file_api, check_task_status_api, stream_task_progress
+from utils.data import get_files, invalidate_files
 import time
 
 
+STAGE_LABELS = {
+    "parse": "📄 Reading documents",
+    "embed": "🧠 Embedding & indexing",
+}
+
+
+def render_progress_event(event, progress_text, progress_bar):
+    status = event.get("status")
+    progress_bar.progress(min(100, int(event.get("progress", 0) * 100)))
+
+    if status == "SUCCESS":
+        progress_bar.progress(100)
+        progress_text.success(f"✅ Complete! {event.get('files_done', 0)}/{event.get('files_total', 0)} files indexed.")
+        time.sleep(1)
+    elif status == "FAILURE":
+        progress_text.error(f"❌ Processing Failed. {event.get('error', '')}")
+    else:
+        label = STAGE_LABELS.get(event.get("stage"), "⚙️ Processing")
+        eta = event.get("eta_seconds")
+        eta_text = f" · ~{int(eta)}s left" if eta is not None else ""
+        progress_text.text(
+            f"{label}: {event.get('pages_parsed', 0)}/{event.get('pages_total', 0)} pages, "
+            f"{event.get('chunks_upserted', 0)}/{event.get('chunks_total', 0)} chunks{eta_text}"
+        )
+
+
+def poll_task_status(task_id, token, progress_text, progress_bar):
+    """Fallback when the progress stream is unavailable: coarse 1s polling."""
+    status = "PENDING"
+    while status not in ["SUCCESS", "FAILURE"]:
+        status_data = check_task_status_api(task_id, token)
+        status = status_data.get("status", "PENDING")
+
+        if status == "PENDING":
+            progress_text.text("⏳ Queued...")
+            progress_bar.progress(10)
+        elif status == "STARTED":
+            progress_text.text("⚙️ Processing vectors (this may take a moment)...")
+            progress_bar.progress(50)
+        elif status == "SUCCESS":
+            progress_bar.progress(100)
+            progress_text.success("✅ Complete!")
+            time.sleep(1)
+            break
+        elif status == "FAILURE":
+            progress_text.error("❌ Processing Failed.")
+            break
+
+        time.sleep(1)  # Wait 1 second before checking again
+
+
 def render_uploader():
     session_id = st.session_state.get("active_session_id")
     token = st.session_state.get("token")
@@ -17,8 +69,8 @@ def render_uploader():
     # We use a container so we can refresh just this part if needed
     file_list_container = st.container()
 
-    # Fetch files
-    files = get_session_files_api(session_id, token)
+    # Fetch files (cached; see utils/data.py)
+    files = get_files(session_id, token)
 
     with file_list_container:
         if files:
@@ -27,6 +79,7 @@ def render_uploader():
                 col1.text(f"📄 {f['filename']}")
                 if col2.button("🗑️", key=f"del_file_{f['id']}"):
                     delete_file_api(session_id, f['id'], token)
+                    invalidate_files(session_id)
                     st.rerun()
         else:
             st.caption("No files uploaded yet.")
@@ -50,33 +103,19 @@ def render_uploader():
                     task_id = resp_data.get("task_id")
 
                     if task_id:
-                        # 2. Poll for Completion
+                        # 2. Follow progress (pushed by the server, polling as a fallback)
                         progress_text = st.empty()
                         progress_bar = st.progress(0)
+                        progress_text.text("⏳ Queued...")
 
-                        status = "PENDING"
-                        while status not in ["SUCCESS", "FAILURE"]:
-                            status_data = check_task_status_api(task_id, token)
-                            status = status_data.get("status", "PENDING")
-
-                            if status == "PENDING":
-                                progress_text.text("⏳ Queued...")
-                                progress_bar.progress(10)
-                            elif status == "STARTED":
-                                progress_text.text("⚙️ Processing vectors (this may take a moment)...")
-                                progress_bar.progress(50)
-                            elif status == "SUCCESS":
-                                progress_bar.progress(100)
-                                progress_text.success("✅ Complete!")
-                                time.sleep(1)
-                                break
-                            elif status == "FAILURE":
-                                progress_text.error("❌ Processing Failed.")
-                                break
-
-                            time.sleep(1)  # Wait 1 second before checking again
+                        try:
+                            for event in stream_task_progress(task_id, token):
+                                render_progress_event(event, progress_text, progress_bar)
+                        except Exception:
+                            poll_task_status(task_id, token, progress_text, progress_bar)
 
                         # 3. Refresh to show new files
+                        invalidate_files(session_id)
                         st.rerun()
                     else:
                         st.warning("Upload started, but could not track progress.")
@@ -1,6 +1,10 @@
 import requests
+import json
 import streamlit as st
 import os
+import io
+from utils.stream import SSEDecoder
+from utils.http import request, get_http2_client
 
 # --- API URL SETUP ---
 api_url_env = os.getenv("API_URL")
@@ -12,11 +16,13 @@ else:
     except Exception:
         API_URL = "http://localhost:8000"
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
 # --- AUTH FUNCTIONS ---
 
 def login_api(email, password):
     try:
-        response = requests.post(f"{API_URL}/auth/login", data={"username": email, "password": password})
+        response = request("POST", f"{API_URL}/auth/login", "auth", data={"username": email, "password": password})
         if response.status_code == 200:
             return response.json()
         else:
@@ -30,7 +36,7 @@ def register_api(email, password):
     Server sends OTP to email and stores password/OTP in Redis temporarily.
     """
     try:
-        response = requests.post(f"{API_URL}/auth/register", json={"email": email, "password": password})
+        response = request("POST", f"{API_URL}/auth/register", "auth", json={"email": email, "password": password})
         if response.status_code == 200:
             return response.json() # Expecting {"message": "OTP sent..."}
         else:
@@ -49,7 +55,7 @@ def verify_otp_api(email, otp, password):
             "otp": otp,
             "password": password
         }
-        response = requests.post(f"{API_URL}/auth/verify", json=payload)
+        response = request("POST", f"{API_URL}/auth/verify", "auth", json=payload)
         if response.status_code == 200:
             return response.json()
         else:
@@ -59,22 +65,25 @@ def verify_otp_api(email, otp, password):
 
 # --- SESSION & CHAT FUNCTIONS (Keep existing) ---
 
-def get_sessions_api(token):
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{API_URL}/chat/sessions", headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        return []
-    except Exception as e:
-        st.error(f"Failed to fetch sessions: {e}")
-        return []
+def fetch_if_changed(path, token, etag=None):
+    """
+    GET with If-None-Match. Returns (data, etag); data is None when the server
+    answers 304 Not Modified. Raises on errors (see utils/data.py).
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    if etag:
+        headers["If-None-Match"] = etag
+    response = request("GET", f"{API_URL}{path}", headers=headers)
+    if response.status_code == 304:
+        return None, etag
+    response.raise_for_status()
+    return response.json(), response.headers.get("ETag")
 
 def create_session_api(token, title="New Chat"):
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.post(
-            f"{API_URL}/chat/sessions",
+        response = request(
+            "POST", f"{API_URL}/chat/sessions",
             json={"title": title},
             headers=headers
         )
@@ -88,61 +97,104 @@ def create_session_api(token, title="New Chat"):
 def delete_session_api(session_id, token):
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        requests.delete(f"{API_URL}/chat/sessions/{session_id}", headers=headers)
+        request("DELETE", f"{API_URL}/chat/sessions/{session_id}", headers=headers)
         return True
     except Exception:
         return False
 
-def get_session_messages_api(session_id, token):
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{API_URL}/chat/sessions/{session_id}/messages", headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        return []
-    except Exception:
-        return []
-
 def ask_question_stream(question, session_id, token):
+    """
+    Streams the answer as (event, data) pairs:
+    ("token", {"text"}) ..., ("sources", [...]), ("usage", {...}), ("error", {"message"}), ("done", {}).
+    """
+    decoder = SSEDecoder()
+    headers = {"Authorization": f"Bearer {token}", "Accept": "text/event-stream"}
+    url = f"{API_URL}/ask/{session_id}"
+
+    http2 = get_http2_client()
+    if http2 is not None:
+        import httpx
+        try:
+            with http2.stream("POST", url, data={"question": question}, headers=headers) as r:
+                r.raise_for_status()
+                for chunk in r.iter_text():
+                    if chunk:
+                        yield from decoder.feed(chunk)
+        except httpx.HTTPError as e:
+            yield "error", {"message": f"Connection Error: {e}"}
+        return
+
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        with requests.post(
-                f"{API_URL}/ask/{session_id}",
-                data={"question": question},
-                stream=True,
-                headers=headers
-        ) as r:
+        with request("POST", url, "ask", data={"question": question}, stream=True, headers=headers) as r:
             r.raise_for_status()
-            for chunk in r.iter_content(chunk_size=None):
+            r.encoding = "utf-8"  # decoded incrementally, so split multi-byte characters are safe
+            for chunk in r.iter_content(chunk_size=None, decode_unicode=True):
                 if chunk:
-                    yield chunk.decode('utf-8')
+                    yield from decoder.feed(chunk)
     except requests.exceptions.RequestException as e:
-        yield f"Connection Error: {e}"
+        yield "error", {"message": f"Connection Error: {e}"}
 
-def get_session_files_api(session_id, token):
+def export_chats_api(token, fmt, session_id=None):
+    """
+    Downloads GET /chat/export (one session, or all when session_id is None) as it streams.
+    Returns (BytesIO, filename), or (None, error message).
+    """
+    params = {"format": fmt}
+    if session_id is not None:
+        params["session_id"] = session_id
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        res = requests.get(f"{API_URL}/chat/sessions/{session_id}/files", headers=headers)
-        return res.json() if res.status_code == 200 else []
-    except: return []
+        with request("GET", f"{API_URL}/chat/export", "export", params=params, headers=headers, stream=True) as r:
+            if r.status_code != 200:
+                return None, f"Export failed ({r.status_code})"
+            out = io.BytesIO()
+            for chunk in r.iter_content(chunk_size=64 * 1024):
+                out.write(chunk)
+            out.seek(0)
+            disposition = r.headers.get("Content-Disposition", "")
+            filename = disposition.split('filename="')[-1].rstrip('"') if "filename=" in disposition else f"chats.{fmt}"
+            return out, filename
+    except requests.exceptions.RequestException as e:
+        return None, f"Connection Error: {e}"
 
 def delete_file_api(session_id, file_id, token):
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        requests.delete(f"{API_URL}/chat/sessions/{session_id}/files/{file_id}", headers=headers)
+        request("DELETE", f"{API_URL}/chat/sessions/{session_id}/files/{file_id}", headers=headers)
         return True
     except: return False
 
+def _iter_file(f, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Yields the file in chunks so requests streams it instead of building the body in memory."""
+    f.seek(0)
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
 def upload_files_api(files, session_id, token):
+    """
+    Streams each file to PUT /upload_files/stream, then starts processing
+    for all of them with one POST /upload_files/process call.
+    """
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        data = {"session_id": str(session_id)}
-        files_payload = [("files", (f.name, f.read(), f.type)) for f in files]
-
-        response = requests.post(
-            f"{API_URL}/upload_files/",
-            data=data,
-            files=files_payload,
+        upload_ids = []
+        for f in files:
+            response = request(
+                "PUT", f"{API_URL}/upload_files/stream", "upload",
+                params={"filename": f.name},
+                data=_iter_file(f),
+                headers={**headers, "Content-Type": "application/octet-stream"}
+            )
+            if response.status_code != 200:
+                return response
+            upload_ids.append(response.json()["upload_id"])
+
+        response = request(
+            "POST", f"{API_URL}/upload_files/process",
+            json={"session_id": session_id, "upload_ids": upload_ids},
             headers=headers
         )
         return response
@@ -152,9 +204,24 @@ def upload_files_api(files, session_id, token):
 def check_task_status_api(task_id, token):
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{API_URL}/upload_files/status/{task_id}", headers=headers)
+        response = request("GET", f"{API_URL}/upload_files/status/{task_id}", "status", headers=headers)
         if response.status_code == 200:
             return response.json()
         return {"status": "UNKNOWN"}
     except Exception:
-        return {"status": "ERROR"}
\ No newline at end of file
+        return {"status": "ERROR"}
+
+def stream_task_progress(task_id, token):
+    """
+    Subscribes to the server-sent progress events of an ingestion task.
+    Yields one dict per event; raises on connection errors so callers can fall back to polling.
+    """
+    headers = {"Authorization": f"Bearer {token}", "Accept": "text/event-stream"}
+    with request("GET", f"{API_URL}/upload_files/progress/{task_id}", "progress", headers=headers, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines(decode_unicode=True):
+            if line and line.startswith("data:"):
+                event = json.loads(line[len("data:"):].strip())
+                yield event
+                if event.get("status") in ("SUCCESS", "FAILURE"):
+                    return
@@ -0,0 +1,83 @@
+"""
+Client-side data layer: chat sessions, message history and file lists, cached in st.session_state.
+
+- Reruns within FRESH_SECONDS of the last check reuse the cached copy (no request at all),
+  so clicking around widgets doesn't hit the API.
+- After that, the copy is revalidated with its ETag; an unchanged list costs a 304.
+- Our own writes (new chat, delete, ask, upload) invalidate the affected entries right away.
+"""
+
+import time
+import streamlit as st
+from utils.api import fetch_if_changed
+
+FRESH_SECONDS = 15
+# History is fetched a page at a time, newest first (GET .../messages?limit=&before_id=)
+MESSAGES_PAGE = 100
+
+
+def _cache():
+    return st.session_state.setdefault("_data_cache", {})
+
+
+def _get(path, token, label=None):
+    entry = _cache().get(path)
+    now = time.monotonic()
+    if entry and now - entry["checked"] < FRESH_SECONDS:
+        return entry["data"]
+
+    try:
+        data, etag = fetch_if_changed(path, token, entry["etag"] if entry else None)
+    except Exception as e:
+        if entry:
+            return entry["data"]  # keep showing what we have
+        if label:
+            st.error(f"Failed to fetch {label}: {e}")
+        return []
+
+    if data is None:  # 304 Not Modified
+        entry["checked"] = now
+        return entry["data"]
+    _cache()[path] = {"data": data, "etag": etag, "checked": now}
+    return data
+
+
+def _invalidate(path):
+    entry = _cache().get(path)
+    if entry:
+        entry["checked"] = float("-inf")  # revalidate on next read (the ETag may still save the download)
+
+
+def get_sessions(token):
+    return _get("/chat/sessions", token, label="sessions")
+
+
+def _messages_path(session_id, before_id=None):
+    path = f"/chat/sessions/{session_id}/messages?limit={MESSAGES_PAGE}"
+    return f"{path}&before_id={before_id}" if before_id is not None else path
+
+
+def get_messages(session_id, token):
+    """The latest MESSAGES_PAGE messages, oldest first. A full page means there may be more."""
+    return _get(_messages_path(session_id), token)
+
+
+def get_earlier_messages(session_id, token, before_id):
+    """The MESSAGES_PAGE messages before message `before_id`, oldest first."""
+    return _get(_messages_path(session_id, before_id), token)
+
+
+def get_files(session_id, token):
+    return _get(f"/chat/sessions/{session_id}/files", token)
+
+
+def invalidate_sessions():
+    _invalidate("/chat/sessions")
+
+
+def invalidate_messages(session_id):
+    _invalidate(_messages_path(session_id))  # older pages never change
+
+
+def invalidate_files(session_id):
+    _invalidate(f"/chat/sessions/{session_id}/files")
@@ -0,0 +1,101 @@
+"""
+Shared HTTP transport for the API client (utils/api.py).
+
+- One pooled requests.Session per process, so Streamlit reruns, the upload poll loop and
+  history reads reuse keep-alive connections instead of paying TCP (+TLS) setup every call.
+- Every call has a (connect, read) timeout picked by endpoint kind; see TIMEOUTS.
+- Idempotent methods (GET, HEAD, OPTIONS, DELETE) are retried on connection errors and
+  502/503/504 with exponential, jittered backoff. POST and PUT are only retried when the
+  connection could not be opened, i.e. before anything was sent.
+- Optional HTTP/2 transport for the streaming /ask call (API_HTTP2=true, needs
+  `httpx[http2]`). It only helps behind a proxy that terminates HTTP/2 (uvicorn itself
+  speaks HTTP/1.1); without httpx it falls back to the pooled session.
+
+Kept free of Streamlit imports so benchmarks can use it directly.
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+RETRIES = int(os.getenv("API_RETRIES", "3"))
+HTTP2 = os.getenv("API_HTTP2", "false").lower() == "true"
+
+CONNECT_TIMEOUT = 3.05
+# Read timeout per endpoint kind. For streams it is the longest allowed gap between bytes.
+TIMEOUTS = {
+    "default": (CONNECT_TIMEOUT, 15),
+    "status": (CONNECT_TIMEOUT, 5),        # task status polls, once a second
+    "auth": (CONNECT_TIMEOUT, 30),         # registration sends an e-mail
+    "upload": (CONNECT_TIMEOUT, 300),      # streamed file bodies
+    "ask": (CONNECT_TIMEOUT, 120),         # retrieval + first token can take a while
+    "progress": (CONNECT_TIMEOUT, 60),     # ingestion progress events; falls back to polling
+    "export": (CONNECT_TIMEOUT, 120),      # streamed chat exports
+}
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "DELETE"})
+
+_session = None
+_http2_client = None
+_lock = threading.Lock()
+
+
+def make_session(pool_size: int = POOL_SIZE, retries: int = RETRIES) -> requests.Session:
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.25,     # 0.25s, 0.5s, 1s, ...
+        backoff_jitter=0.25,     # + up to 0.25s, so clients that failed together don't retry together
+        status_forcelist=(502, 503, 504),
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False,   # hand the last response back instead of raising
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = make_session()
+    return _session
+
+
+def request(method: str, url: str, kind: str = "default", **kwargs) -> requests.Response:
+    """requests.request() on the shared session, with the timeout for `kind` unless given."""
+    kwargs.setdefault("timeout", TIMEOUTS.get(kind, TIMEOUTS["default"]))
+    return get_session().request(method, url, **kwargs)
+
+
+def get_http2_client():
+    """Shared httpx client with HTTP/2, or None when disabled or httpx/h2 is not installed."""
+    global _http2_client
+    if not HTTP2:
+        return None
+    if _http2_client is None:
+        with _lock:
+            if _http2_client is None:
+                try:
+                    import httpx
+                    connect, read = TIMEOUTS["ask"]
+                    _http2_client = httpx.Client(
+                        timeout=httpx.Timeout(read, connect=connect),
+                        # httpx retries only failed connection attempts, like POST above
+                        transport=httpx.HTTPTransport(
+                            http2=True, retries=RETRIES,
+                            limits=httpx.Limits(max_keepalive_connections=POOL_SIZE),
+                        ),
+                    )
+                except ImportError:
+                    _http2_client = False  # don't retry the import on every call
+    return _http2_client or None
@@ -0,0 +1,42 @@
+import json
+
+
+class SSEDecoder:
+    """
+    Incremental parser for the /ask event stream (Server-Sent Events with JSON data).
+    feed() takes text as it arrives and returns the complete (event, data) pairs in it;
+    only the new text is scanned, so each token costs the same no matter how long the answer is.
+    Mirrors server/modules/stream_events.py (the client ships without the server code);
+    server/tests/test_stream_events.py checks both decode the same framing.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text):
+        # A "\n\n" boundary may straddle two pieces, so resume the search one char back
+        start = max(0, len(self._buffer) - 1)
+        buffer = self._buffer + text
+        events, pos = [], 0
+        while True:
+            end = buffer.find("\n\n", start)
+            if end == -1:
+                break
+            parsed = self._parse(buffer[pos:end])
+            if parsed:
+                events.append(parsed)
+            pos = start = end + 2
+        self._buffer = buffer[pos:]
+        return events
+
+    @staticmethod
+    def _parse(frame):
+        event, data = "message", []
+        for line in frame.split("\n"):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data.append(line[len("data:"):].lstrip())
+        if not data:
+            return None  # comment / keepalive
+        return event, json.loads("\n".join(data))
@@ -0,0 +1,98 @@
+"""
+Benchmark: recall@k vs latency of the ANN indexes against exact search.
+
+Synthetic embeddings are drawn around random cluster centres (real chunk
+embeddings are clustered by topic, uniform noise would flatter nothing).
+Queries are perturbed copies of stored vectors. Recall@k is the overlap
+with the exact top-k from exact_top_k().
+
+Run from the server directory:
+    python -m benchmarks.bench_ann --rows 200000 --dim 256
+    python -m benchmarks.bench_ann --index hnsw --ef 32 64 128
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from modules.ann_index import ANN_INDEXES
+from modules.local_vector_store import exact_top_k, normalize_rows
+
+
+def synthetic_embeddings(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    vectors = centres[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return normalize_rows(vectors).astype(np.float32)
+
+
+def time_search(search, queries, runs_per_query: int = 1):
+    """Per-query latency in ms (single-query calls, like the /ask path)."""
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        for _ in range(runs_per_query):
+            rows, _ = search(q[None, :])
+        latencies.append((time.perf_counter() - start) / runs_per_query * 1000)
+        results.append(rows[0])
+    return latencies, results
+
+
+def recall(approx, exact, k: int) -> float:
+    return statistics.mean(len(set(a[:k]) & set(e[:k])) / k for a, e in zip(approx, exact))
+
+
+def report(label, latencies, rec=None, extra=""):
+    p50 = statistics.median(latencies)
+    p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+    rec_text = f"recall {rec:.3f}" if rec is not None else "recall 1.000"
+    print(f"{label:<24} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  {rec_text}  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index", choices=list(ANN_INDEXES), default="ivf")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows} x {args.dim} embeddings ...")
+    matrix = synthetic_embeddings(args.rows, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    picked = matrix[rng.choice(args.rows, args.queries, replace=False)]
+    queries = normalize_rows(picked + 0.3 * rng.standard_normal(picked.shape).astype(np.float32))
+    mask = np.ones(args.rows, dtype=bool)
+
+    exact_lat, exact_rows = time_search(lambda q: exact_top_k(matrix, q, args.k, mask), queries)
+    report("exact", exact_lat)
+
+    start = time.perf_counter()
+    index = ANN_INDEXES[args.index].train(matrix, np.arange(args.rows), nlist=args.nlist)
+    index.extend(matrix, args.rows)
+    print(f"{args.index} build: {time.perf_counter() - start:.1f} s")
+
+    if args.index == "ivf":
+        for nprobe in args.nprobe:
+            index.nprobe = nprobe
+            lat, rows = time_search(lambda q: index.search(matrix, q, args.k, mask), queries)
+            report(f"ivf nprobe={nprobe}", lat, recall(rows, exact_rows, args.k),
+                   f"speedup {statistics.median(exact_lat) / statistics.median(lat):.1f}x")
+    else:
+        for ef in args.ef:
+            index.ef_search = ef
+            index.graph.set_ef(ef)
+            lat, rows = time_search(lambda q: index.search(matrix, q, args.k, mask), queries)
+            report(f"hnsw ef={ef}", lat, recall(rows, exact_rows, args.k),
+                   f"speedup {statistics.median(exact_lat) / statistics.median(lat):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
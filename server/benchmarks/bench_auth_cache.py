@@ -0,0 +1,70 @@
+"""
+Microbenchmark: per-request authentication overhead.
+
+Compares, per call:
+- get_current_user with an empty cache (JWT decode + DB lookup, the old behaviour)
+- get_current_user with a warm in-process cache
+- get_token_principal (signed-claim fast path for read-only endpoints)
+
+Run from the server directory:
+    python -m benchmarks.bench_auth_cache --iterations 2000
+"""
+import argparse
+import asyncio
+import time
+
+import benchmarks.offline_env  # noqa: F401  (sets offline defaults before config loads)
+from database import Base, engine, SessionLocal, AsyncSessionLocal
+import models.user
+import models.chat
+import models.file
+import models.message
+from models.user import User
+from config import user_cache
+from utils.security import create_access_token
+from utils.auth_deps import get_current_user, get_token_principal
+
+
+def setup():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", hashed_password="x", is_verified=True)
+        db.add(user)
+        db.commit()
+        return create_access_token({"sub": user.email, "uid": user.id, "role": user.role.value})
+    finally:
+        db.close()
+
+
+async def time_calls(dependency, token, iterations, clear_cache=False):
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            if clear_cache:
+                user_cache.memory.clear()
+            await dependency(token, db)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Measure the local tiers only
+    user_cache.redis = None
+    token = setup()
+
+    cold = asyncio.run(time_calls(get_current_user, token, args.iterations, clear_cache=True))
+    warm = asyncio.run(time_calls(get_current_user, token, args.iterations))
+    fast = asyncio.run(time_calls(get_token_principal, token, args.iterations))
+
+    print(f"get_current_user (DB lookup):    {cold:8.1f} us/request")
+    print(f"get_current_user (cached):       {warm:8.1f} us/request  (saves {cold - warm:.1f} us)")
+    print(f"get_token_principal (claims):    {fast:8.1f} us/request  (saves {cold - fast:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
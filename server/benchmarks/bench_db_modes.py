@@ -0,0 +1,107 @@
+"""
+Load test: sync vs async DB layer under concurrent requests.
+
+Each simulated /ask request does what the route does against the DB
+(ownership check, save user message, load history, save answer) plus an
+awaited I/O wait standing in for retrieval + LLM streaming.
+
+- sync mode:  the whole handler in a 40-thread pool, the way FastAPI runs a sync
+              route (anyio's default thread limit), with a blocking I/O wait.
+              Calling blocking crud straight from async code would deadlock once
+              every pooled connection is held across an await.
+- async mode: crud.aio calls on AsyncSession
+
+Run from the server directory (SQLite by default, or point DATABASE_URL at a
+local Postgres to compare against a real server):
+    python -m benchmarks.bench_db_modes --requests 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import benchmarks.offline_env  # noqa: F401  (sets offline defaults before config loads)
+from database import Base, engine, SessionLocal, AsyncSessionLocal
+import models.user
+import models.chat
+import models.file
+import models.message
+from models.user import User
+from models.message import MessageRole
+from schemas.chat import ChatSessionCreate
+from schemas.message import MessageCreate
+import crud.chat as chat_crud
+import crud.message as message_crud
+import crud.aio.chat as async_chat_crud
+import crud.aio.message as async_message_crud
+
+
+def setup():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", hashed_password="x", is_verified=True)
+        db.add(user)
+        db.commit()
+        session = chat_crud.create_session(db, ChatSessionCreate(title="bench"), user.id)
+        return user.id, session.id
+    finally:
+        db.close()
+
+
+THREADPOOL = ThreadPoolExecutor(max_workers=40)  # FastAPI/anyio default for sync routes
+
+
+def sync_handler(user_id, session_id, io_wait):
+    db = SessionLocal()
+    try:
+        chat_crud.get_session(db, session_id, user_id)
+        message_crud.create_message(db, MessageCreate(content="q", role=MessageRole.USER), user_id, session_id)
+        message_crud.get_messages_page(db, session_id, user_id)
+        time.sleep(io_wait)
+        message_crud.create_message(db, MessageCreate(content="a", role=MessageRole.ASSISTANT), user_id, session_id)
+    finally:
+        db.close()
+
+
+async def sync_request(user_id, session_id, io_wait):
+    await asyncio.get_running_loop().run_in_executor(THREADPOOL, sync_handler, user_id, session_id, io_wait)
+
+
+async def async_request(user_id, session_id, io_wait):
+    async with AsyncSessionLocal() as db:
+        await async_chat_crud.get_session(db, session_id, user_id)
+        await async_message_crud.create_message(db, MessageCreate(content="q", role=MessageRole.USER), user_id, session_id)
+        await async_message_crud.get_messages_page(db, session_id, user_id)
+        await asyncio.sleep(io_wait)
+        await async_message_crud.create_message(db, MessageCreate(content="a", role=MessageRole.ASSISTANT), user_id, session_id)
+
+
+async def run(handler, total, concurrency, io_wait, user_id, session_id):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await handler(user_id, session_id, io_wait)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--io-wait", type=float, default=0.02, help="simulated retrieval/LLM await (s)")
+    args = parser.parse_args()
+
+    for name, handler in (("sync", sync_request), ("async", async_request)):
+        user_id, session_id = setup()
+        rps = asyncio.run(run(handler, args.requests, args.concurrency, args.io_wait, user_id, session_id))
+        print(f"{name:>5} mode: {rps:8.1f} req/s  ({args.requests} requests, concurrency {args.concurrency})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: ingestion throughput, old per-file loop vs the staged pipeline.
+
+Uses a fake embedder and fake vector store (sleeps simulate API round trips) on
+synthetic page text, so it measures the split/embed/upsert stages without
+network access. Parsing is skipped because it depends on real PDFs.
+
+Run from the server directory:
+    python -m benchmarks.bench_ingestion --files 8 --pages 40
+"""
+import argparse
+import time
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from modules.ingestion import IngestionPipeline, IngestedFile
+
+EMBED_CALL_LATENCY = 0.05
+EMBED_PER_TEXT = 0.001
+UPSERT_CALL_LATENCY = 0.03
+
+
+class FakeEmbedder:
+    def embed_documents(self, texts):
+        time.sleep(EMBED_CALL_LATENCY + EMBED_PER_TEXT * len(texts))
+        return [[float(len(t) % 7)] * 8 for t in texts]
+
+
+class FakeStore:
+    def __init__(self):
+        self.count = 0
+
+    def upsert(self, vectors, namespace):
+        time.sleep(UPSERT_CALL_LATENCY)
+        self.count += len(vectors)
+
+    def fetch(self, ids, namespace):
+        return {}
+
+    def delete(self, namespace, filter=None, ids=None):
+        pass
+
+
+def synthetic_pages(pages):
+    sentence = "Metformin 500 mg is taken twice daily with meals to control blood glucose. "
+    return [Document(page_content=sentence * 40, metadata={"page": i}) for i in range(pages)]
+
+
+def run_sequential(files, splitter, embedder, store):
+    """Old behaviour: per file, embed in batches of 32 then upsert in batches of 32, one after another."""
+    for f, pages in files:
+        chunks = splitter.split_documents(pages)
+        for i in range(0, len(chunks), 32):
+            batch = chunks[i:i + 32]
+            vectors = embedder.embed_documents([c.page_content for c in batch])
+            store.upsert(list(zip(range(len(batch)), vectors)), "bench")
+
+
+def run_pipeline(files, pipeline):
+    all_chunks = []
+    for f, pages in files:
+        pipeline.split(f, pages)
+        all_chunks.extend(f.chunks)
+    pipeline.embed_and_upsert(all_chunks, "bench")
+    return len(all_chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
+    files = [
+        (IngestedFile(file_path=f"f{i}.pdf", filename=f"f{i}.pdf", file_uuid=f"{i:08d}"), synthetic_pages(args.pages))
+        for i in range(args.files)
+    ]
+
+    start = time.perf_counter()
+    run_sequential(files, splitter, FakeEmbedder(), FakeStore())
+    seq = time.perf_counter() - start
+
+    pipeline = IngestionPipeline(
+        FakeEmbedder(), FakeStore(), splitter,
+        embed_batch_size=args.batch_size, embed_concurrency=args.concurrency
+    )
+    start = time.perf_counter()
+    chunks = run_pipeline(files, pipeline)
+    staged = time.perf_counter() - start
+
+    pages = args.files * args.pages
+    print(f"{args.files} files, {pages} pages, {chunks} chunks")
+    print(f"sequential: {seq:6.2f} s  {chunks / seq:8.1f} chunks/s")
+    print(f"pipeline:   {staged:6.2f} s  {chunks / staged:8.1f} chunks/s  ({seq / staged:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
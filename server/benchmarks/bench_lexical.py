@@ -0,0 +1,104 @@
+"""
+Benchmark: BM25 lexical index build time, query latency and memory.
+
+Builds an in-memory BM25Index over synthetic ~1000-character chunks that mix
+common words with drug names, dosages and ICD-10 codes, then runs keyword
+queries against it. Numbers are reported per 100k chunks.
+
+Run from the server directory:
+    python -m benchmarks.bench_lexical --chunks 100000
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from modules.lexical_index import BM25Index
+
+DRUGS = [
+    "metformin", "lisinopril", "atorvastatin", "amlodipine", "omeprazole", "levothyroxine",
+    "co-amoxiclav", "warfarin", "apixaban", "salbutamol", "prednisolone", "sertraline",
+]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_chunk(vocab: list[str], rng: random.Random, chars: int = 1000) -> str:
+    words = []
+    length = 0
+    while length < chars:
+        roll = rng.random()
+        if roll < 0.02:
+            word = rng.choice(DRUGS)
+        elif roll < 0.03:
+            word = f"{rng.choice([5, 10, 20, 40, 250, 500])}mg"
+        elif roll < 0.035:
+            word = f"{rng.choice('EIJKN')}{rng.randint(10, 99)}.{rng.randint(0, 9)}"
+        else:
+            # Zipf-like: a few words are very common, most are rare
+            word = vocab[min(int(rng.paretovariate(1.1)) - 1, len(vocab) - 1)]
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocab = make_vocabulary(args.vocab, rng)
+    rng.shuffle(vocab)
+    print(f"Generating {args.chunks} chunks ...")
+    chunks = [make_chunk(vocab, rng) for _ in range(args.chunks)]
+    text_bytes = sum(len(c) for c in chunks)
+
+    # Build time without tracing overhead
+    index = BM25Index()
+    start = time.perf_counter()
+    for i, text in enumerate(chunks):
+        index.add(f"doc_{i}", text, {"source": "synthetic.pdf", "file_uuid": "f"})
+    build_s = time.perf_counter() - start
+
+    # Memory: rebuild under tracemalloc; chunk text itself is shared with `chunks`
+    del index
+    tracemalloc.start()
+    index = BM25Index()
+    for i, text in enumerate(chunks):
+        index.add(f"doc_{i}", text, {"source": "synthetic.pdf", "file_uuid": "f"})
+    index_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queries = [
+        f"{rng.choice(DRUGS)} {rng.choice(['5mg', '500mg', 'dose'])} {rng.choice(vocab[:2000])}"
+        for _ in range(args.queries // 2)
+    ] + [
+        f"{rng.choice('EIJKN')}{rng.randint(10, 99)}.{rng.randint(0, 9)} {rng.choice(vocab[:5000])}"
+        for _ in range(args.queries - args.queries // 2)
+    ]
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, k=10)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    scale = 100_000 / args.chunks
+    print(f"chunks: {args.chunks}  terms: {len(index.postings)}")
+    print(f"build:  {build_s:.1f} s  ({build_s * scale:.1f} s per 100k chunks, "
+          f"{args.chunks / build_s:.0f} chunks/s)")
+    print(f"memory: {index_bytes / 2**20:.0f} MB index structures "
+          f"({index_bytes * scale / 2**20:.0f} MB per 100k) + {text_bytes / 2**20:.0f} MB chunk text")
+    print(f"query:  p50 {statistics.median(latencies):.2f} ms  "
+          f"p95 {sorted(latencies)[int(len(latencies) * 0.95) - 1]:.2f} ms  "
+          f"max {max(latencies):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
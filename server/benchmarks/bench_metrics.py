@@ -0,0 +1,195 @@
+"""
+Microbenchmark: overhead of the stage metrics (modules/metrics.py) on the /ask hot path.
+
+1. Cost of one `timed` block / `observe` / `observe_request` call, with metrics
+   enabled and disabled.
+2. The CPU-bound part of /ask with metrics on vs off: hybrid retrieval over two
+   namespaces (local vector store + BM25), merge and context build, plus the other
+   samples one request records (auth, DB, TTFT, generation, total, HTTP). Embedding,
+   LLM and DB time are left out, so this is the worst case; real requests are far longer.
+   The pass/fail verdict is the direct cost: `timed` samples per request x the cost of
+   a timed block, `observe` samples x the cost of an observe call, plus one
+   observe_request, since the on/off wall-clock difference is often smaller than
+   run-to-run noise.
+
+Run from the server directory:
+    python -m benchmarks.bench_metrics --chunks 10000 --requests 500
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from modules import metrics
+from modules.metrics import timed, observe, observe_request
+from modules.local_vector_store import LocalVectorStore
+from modules.lexical_index import LexicalIndex
+from modules.retrieval import HybridRetriever
+from modules.merge import merge_results
+from modules.context_builder import build_context
+from benchmarks.bench_lexical import DRUGS, make_vocabulary, make_chunk
+
+NAMESPACES = {"session_1": "Private", "global_kb": "Global"}
+# Samples an /ask request records outside retrieval and context build
+# Samples an /ask request records outside retrieval and context build: `timed` blocks ...
+TIMED_STAGES = ["auth", "db_write_message", "db_read_history", "db_write_message"]
+# ... and durations measured around the stream and passed to observe()
+OBSERVED_STAGES = ["ttft", "generation", "ask_total"]
+
+
+class LookupEmbedder:
+    """Precomputed question vectors, so embedding costs nothing."""
+
+    def __init__(self, vectors: dict):
+        self.vectors = vectors
+
+    def embed_query(self, text: str):
+        return self.vectors[text]
+
+
+def ns_per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def per_call_costs(n: int):
+    def block():
+        with timed("bench_block"):
+            pass
+
+    def sample():
+        observe("bench_sample", 0.001)
+
+    def request():
+        observe_request("GET", "/bench", 200, 0.001)
+
+    results = {}
+    for enabled in (False, True):
+        metrics.configure(enabled=enabled)
+        results[enabled] = (ns_per_call(block, n), ns_per_call(sample, n), ns_per_call(request, n))
+    return results
+
+
+def build_corpus(root: str, chunks: int, dim: int, rng: random.Random):
+    np_rng = np.random.default_rng(rng.randint(0, 2 ** 31))
+    vocab = make_vocabulary(20_000, rng)
+    store = LocalVectorStore(f"{root}/vectors")
+    lexical = LexicalIndex(f"{root}/lexical")
+    per_ns = chunks // len(NAMESPACES)
+    for ns in NAMESPACES:
+        texts = [make_chunk(vocab, rng) for _ in range(per_ns)]
+        vectors = np_rng.standard_normal((per_ns, dim)).astype(np.float32)
+        records, docs = [], []
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            metadata = {"source": f"doc{i % 50}.pdf", "file_uuid": f"f{i % 50}"}
+            records.append({"id": f"{ns}_{i}", "values": vector.tolist(), "metadata": {**metadata, "text": text}})
+            docs.append(Document(page_content=text, metadata=metadata, id=f"{ns}_{i}"))
+        for start in range(0, len(records), 1000):
+            store.upsert(records[start:start + 1000], ns)
+        lexical.add(ns, docs)
+    return store, lexical, vocab
+
+
+def recorded_samples() -> dict:
+    """Stage samples recorded so far, by stage (HTTP samples are costed separately)."""
+    counts = {}
+    for metric in metrics.STAGE_SECONDS.collect():
+        for x in metric.samples:
+            if x.name.endswith("_count"):
+                counts[x.labels["stage"]] = x.value
+    return counts
+
+
+async def one_request(retriever, question):
+    vector = await retriever.embed(question)
+    docs = await retriever.retrieve(question, NAMESPACES, k=4, vector=vector)
+    with timed("context_build"):
+        final = merge_results(docs, k=4, lambda_=0.7, duplicate_threshold=0.8)
+        build_context(final, 1200)
+    for stage in TIMED_STAGES:
+        with timed(stage):
+            pass
+    for stage in OBSERVED_STAGES:
+        observe(stage, 0.001)
+    observe_request("POST", "/ask/{session_id}", 200, 0.01)
+
+
+async def run_requests(retriever, questions, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(q):
+        async with semaphore:
+            await one_request(retriever, q)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[limited(q) for q in questions])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000, help="iterations for the per-call costs")
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--requests", type=int, default=500, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=10, help="alternating off/on rounds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-overhead", type=float, default=0.01)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    costs = per_call_costs(args.calls)
+    print(f"timed block: {costs[True][0]:6.0f} ns enabled, {costs[False][0]:6.0f} ns disabled")
+    print(f"observe:     {costs[True][1]:6.0f} ns enabled, {costs[False][1]:6.0f} ns disabled")
+    print(f"request:     {costs[True][2]:6.0f} ns enabled, {costs[False][2]:6.0f} ns disabled")
+
+    with tempfile.TemporaryDirectory() as root:
+        store, lexical, vocab = build_corpus(root, args.chunks, args.dim, rng)
+        questions = [
+            f"{rng.choice(DRUGS)} {' '.join(rng.choice(vocab[:2000]) for _ in range(5))} {i}"
+            for i in range(args.requests)
+        ]
+        np_rng = np.random.default_rng(2)
+        embedder = LookupEmbedder({q: np_rng.standard_normal(args.dim).tolist() for q in questions})
+        retriever = HybridRetriever(store, embedder, timeout=30, lexical=lexical)
+
+        metrics.configure(enabled=False)
+        asyncio.run(run_requests(retriever, questions[:50], args.concurrency))  # warm up
+        before = recorded_samples()
+        timings = {False: [], True: []}
+        for r in range(args.rounds):
+            # Alternate the order so drift (thermal, caches) doesn't favour one side
+            for enabled in ((False, True) if r % 2 == 0 else (True, False)):
+                metrics.configure(enabled=enabled)
+                timings[enabled].append(asyncio.run(run_requests(retriever, questions, args.concurrency)))
+
+    # Fastest round of each: the least disturbed by other load on the machine
+    off, on = min(timings[False]), min(timings[True])
+    spread = (max(timings[False]) - off) / off
+    per_request_us = off / args.requests * 1e6
+    print(f"hot path: {per_request_us:.0f} us/request without metrics, "
+          f"{on / args.requests * 1e6:.0f} us/request with metrics "
+          f"({(on - off) / off:+.2%}; rounds vary by up to {spread:.0%})")
+
+    # The wall-clock difference is usually within run-to-run noise, so the verdict uses the
+    # direct cost: samples actually recorded per request x the cost of recording each kind,
+    # plus the one observe_request the middleware makes
+    after = recorded_samples()
+    per_request = args.requests * args.rounds
+    observed = sum(after.get(s, 0) - before.get(s, 0) for s in set(OBSERVED_STAGES)) / per_request
+    blocks = sum(after[s] - before.get(s, 0) for s in after) / per_request - observed
+    direct_us = (blocks * costs[True][0] + observed * costs[True][1] + costs[True][2]) / 1000
+    overhead = direct_us / per_request_us
+    print(f"direct:   {blocks:.0f} timed x {costs[True][0]:.0f} ns + {observed:.0f} observe x "
+          f"{costs[True][1]:.0f} ns + {costs[True][2]:.0f} ns request = {direct_us:.1f} us/request")
+    print(f"overhead: {overhead:.2%} (limit {args.max_overhead:.0%}) -> "
+          f"{'OK' if overhead < args.max_overhead else 'TOO HIGH'}")
+
+if __name__ == "__main__":
+    main()
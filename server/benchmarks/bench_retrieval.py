@@ -0,0 +1,80 @@
+"""
+Benchmark: sequential vs concurrent hybrid retrieval.
+
+Uses a local fake embedder and vector store that sleep to simulate network
+round trips, so it runs without any API keys.
+
+Run from the server directory:
+    python -m benchmarks.bench_retrieval
+"""
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from modules.retrieval import HybridRetriever
+
+EMBED_LATENCY = 0.08
+QUERY_LATENCY = 0.06
+RUNS = 20
+
+
+class FakeEmbedder:
+    def embed_query(self, text):
+        time.sleep(EMBED_LATENCY)
+        return [float(len(text))] * 8
+
+
+class FakeVectorStore:
+    """Mimics PineconeVectorStore: query-by-text embeds first, then queries."""
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+
+    def similarity_search_by_vector_with_score(self, vector, k=3, namespace=None):
+        time.sleep(QUERY_LATENCY)
+        return [
+            (SimpleNamespace(page_content=f"{namespace} chunk {i}", metadata={}), 1.0 - i * 0.1)
+            for i in range(k)
+        ]
+
+    def similarity_search_with_score(self, query, k=3, namespace=None):
+        vector = self.embedder.embed_query(query)
+        return self.similarity_search_by_vector_with_score(vector, k=k, namespace=namespace)
+
+
+def run_sequential(store, question):
+    docs = store.similarity_search_with_score(question, k=3, namespace="session_1")
+    docs += store.similarity_search_with_score(question, k=3, namespace="global_kb")
+    return docs
+
+
+async def run_concurrent(retriever, question):
+    return await retriever.retrieve(question, {"session_1": "Private", "global_kb": "Global"}, k=3)
+
+
+def main():
+    embedder = FakeEmbedder()
+    store = FakeVectorStore(embedder)
+    retriever = HybridRetriever(store, embedder, timeout=5.0)
+    question = "What is the recommended dose of metformin?"
+
+    seq, conc = [], []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        run_sequential(store, question)
+        seq.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        asyncio.run(run_concurrent(retriever, question))
+        conc.append(time.perf_counter() - start)
+
+    seq_ms = statistics.median(seq) * 1000
+    conc_ms = statistics.median(conc) * 1000
+    print(f"sequential  (2x embed + 2x query): p50 {seq_ms:.1f} ms")
+    print(f"concurrent  (1x embed + parallel): p50 {conc_ms:.1f} ms")
+    print(f"latency reduction: {(1 - conc_ms / seq_ms) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
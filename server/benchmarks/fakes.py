@@ -0,0 +1,159 @@
+"""
+Deterministic local stand-ins for the external services, for offline benchmarks.
+
+- HashingEmbedder: bag-of-words feature hashing (same text -> same vector, no network)
+- FakeStreamingLLM: LangChain chat model that streams a canned answer with set latencies
+- NullRedis: accepts the Redis calls the server makes and does nothing
+- write_text_pdf: minimal text-only PDF writer, so ingestion parses real PDFs
+"""
+import asyncio
+import math
+import re
+import time
+import zlib
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from modules.lexical_index import tokenize
+
+
+class HashingEmbedder(Embeddings):
+    """Signed feature hashing of tokens into `dim` dimensions, L2-normalized."""
+
+    def __init__(self, dim: int = 384, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        for token in tokenize(text):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: list[str], **kwargs) -> list[list[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """
+    Streams `answer_tokens` words taken from the prompt's context, after `first_token_latency`
+    seconds and then one word every `token_latency` seconds. Output depends only on the prompt.
+    """
+
+    first_token_latency: float = 0.2
+    token_latency: float = 0.01
+    answer_tokens: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _tokens(self, messages) -> list[str]:
+        prompt = " ".join(str(m.content) for m in messages)
+        context = prompt.split("Context:", 1)[-1]
+        words = re.findall(r"\S+", context) or ["No", "context."]
+        return [words[i % len(words)] for i in range(self.answer_tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_latency + self.token_latency * (len(tokens) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.first_token_latency + self.token_latency * (len(tokens) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_latency)
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class NullRedis:
+    """No-op stand-in for the sync Redis client (progress publishing, cache versions)."""
+
+    def get(self, key):
+        return None
+
+    def setex(self, key, ttl, value):
+        return True
+
+    def set(self, key, value, *args, **kwargs):
+        return True
+
+    def publish(self, channel, message):
+        return 0
+
+    def incr(self, key):
+        return 1
+
+    def delete(self, *keys):
+        return 0
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, pages: list[str], line_chars: int = 95, lines_per_page: int = 60):
+    """Writes a Helvetica text-only PDF, one string per page (long pages are cut at lines_per_page)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for text in pages:
+        lines = []
+        for paragraph in text.split("\n"):
+            words, line = paragraph.split(), ""
+            for word in words:
+                if line and len(line) + len(word) + 1 > line_chars:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}".strip()
+            lines.append(line)
+        body = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in lines[:lines_per_page]
+        ) + " ET"
+        stream = body.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
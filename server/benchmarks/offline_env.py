@@ -0,0 +1,34 @@
+"""
+Environment defaults so benchmarks can import the server modules offline.
+
+Must be imported BEFORE config/database. Real values already set in the
+environment (or .env) always win.
+"""
+import os
+import tempfile
+
+BENCH_DIR = tempfile.mkdtemp(prefix="vitaai_bench_")
+
+OFFLINE_DEFAULTS = {
+    "GOOGLE_API_KEY": "offline",
+    "PINECONE_API_KEY": "offline",
+    "GROQ_API_KEY": "offline",
+    "SECRET_KEY": "offline-benchmark-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "DATABASE_URL": f"sqlite:///{os.path.join(BENCH_DIR, 'bench.db')}",
+    "EMBED_CACHE_USE_REDIS": "false",
+    "ANSWER_CACHE_ENABLED": "false",
+    "USER_CACHE_USE_REDIS": "false",
+    "VECTOR_BACKEND": "local",
+    "LOCAL_VECTOR_DIR": os.path.join(BENCH_DIR, "vector_data"),
+    "LEXICAL_INDEX_DIR": os.path.join(BENCH_DIR, "lexical_index"),
+    "BATCH_RESULTS_DIR": os.path.join(BENCH_DIR, "batch_results"),
+    # config.EMAIL_CONF validates these on import; nothing is ever sent offline
+    "MAIL_USERNAME": "offline",
+    "MAIL_PASSWORD": "offline",
+    "MAIL_FROM": "offline@example.com",
+}
+
+for key, value in OFFLINE_DEFAULTS.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,381 @@
+"""
+End-to-end offline RAG harness: ingestion (process_documents_task) and answering
+(the /ask stream_generator) against local stand-ins.
+
+- deterministic hashing embedder and a fake streaming LLM (benchmarks/fakes.py)
+- the local vector store, the BM25 index and SQLite, all under a temp directory
+- synthetic drug monographs written as real PDFs, with a labeled question set
+  (or your own: --pdf-dir DIR --questions FILE, a JSON list of
+  {"question": ..., "expected_source": "<pdf filename>"})
+
+Reports ingestion pages/s and chunks/s, time-to-first-token and total latency
+percentiles, retrieval hit rate / MRR against the labels, and peak RSS. The JSON
+output has a fixed layout so runs can be compared across commits.
+
+Run from the server directory:
+    python -m benchmarks.rag_harness --output rag_baseline.json
+    python -m benchmarks.rag_harness --baseline rag_baseline.json   # exits 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+import benchmarks.offline_env as offline_env  # (sets offline defaults before config loads)
+import config
+from database import Base, engine, SessionLocal
+import models.user
+import models.chat
+import models.file
+import models.message
+from models.user import User, UserRole
+from models.file import UploadedFile
+from schemas.chat import ChatSessionCreate
+import crud.chat as chat_crud
+import modules.rag
+import modules.titles
+import routes.ask_question
+import tasks
+from modules.ingestion import count_pdf_pages
+from routes.ask_question import stream_generator
+import modules.stream_events as events
+from modules.stream_events import SSEDecoder
+from benchmarks.fakes import HashingEmbedder, FakeStreamingLLM, NullRedis, write_text_pdf
+
+SCHEMA_VERSION = 1
+
+# Metric -> True if higher is better; only these are compared against a baseline
+COMPARED_METRICS = {
+    "ingestion.pages_per_s": True,
+    "ingestion.chunks_per_s": True,
+    "answer.ttft_ms.p50": False,
+    "answer.ttft_ms.p95": False,
+    "answer.total_ms.p50": False,
+    "answer.total_ms.p95": False,
+    "retrieval.hit_rate": True,
+    "retrieval.mrr": True,
+    "memory.peak_rss_mb": False,
+}
+
+CONDITIONS = [
+    "type 2 diabetes", "hypertension", "atrial fibrillation", "asthma", "migraine", "gout",
+    "rheumatoid arthritis", "hypothyroidism", "major depressive disorder", "psoriasis",
+    "heart failure", "osteoporosis", "epilepsy", "chronic kidney disease", "glaucoma",
+]
+EFFECTS = [
+    "nausea", "dizziness", "headache", "dry mouth", "fatigue", "rash", "insomnia",
+    "constipation", "peripheral oedema", "muscle cramps", "blurred vision", "hair loss",
+]
+FILLER = [
+    "Patients should be reviewed regularly and the dose adjusted to response and tolerability.",
+    "Renal and hepatic function should be checked before starting treatment and periodically after.",
+    "Use in pregnancy should be avoided unless the expected benefit outweighs the potential risk.",
+    "Elderly patients may need lower starting doses because of reduced clearance.",
+    "The tablets should be swallowed whole with water and may be taken with or without food.",
+    "Concomitant use with strong CYP3A4 inhibitors may increase plasma concentrations.",
+    "Treatment should be stopped if signs of a severe hypersensitivity reaction occur.",
+    "Overdose is managed with supportive care; there is no specific antidote.",
+    "Store below 25 degrees Celsius in the original package to protect from moisture.",
+    "Clinical trials included adults aged 18 to 75 years over a period of 52 weeks.",
+]
+
+
+def percentiles(values: list[float]) -> dict:
+    """Nearest-rank p50/p95/p99 (stable for small samples), rounded to 0.1 ms."""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+
+    def rank(p):
+        return round(ordered[max(0, math.ceil(p * len(ordered)) - 1)], 1)
+
+    return {"p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99)}
+
+
+def drug_name(rng: random.Random) -> str:
+    start = rng.choice(["zor", "vel", "ketra", "mira", "dolu", "prax", "tenu", "luma", "cyra", "obri"])
+    middle = rng.choice(["va", "li", "fe", "mo", "ra", "xi", "ta", "no"])
+    end = rng.choice(["tinib", "mab", "pril", "sartan", "statin", "zolam", "cillin", "dronate"])
+    return (start + middle + end).capitalize()
+
+
+def synthetic_corpus(out_dir: str, docs: int, pages: int, questions_per_doc: int, seed: int):
+    """Writes `docs` PDFs (one fictional drug each); returns the labeled questions."""
+    rng = random.Random(seed)
+    names, questions = set(), []
+    while len(names) < docs:
+        names.add(drug_name(rng))
+
+    for name in sorted(names):
+        filename = f"{name.lower()}_monograph.pdf"
+        condition = rng.choice(CONDITIONS)
+        dose = rng.choice([5, 10, 20, 25, 50, 100, 250, 500])
+        frequency = rng.choice(["once daily", "twice daily", "three times daily", "once weekly"])
+        effects = rng.sample(EFFECTS, 3)
+        facts = [
+            f"{name} is indicated for the treatment of {condition} in adults.",
+            f"The recommended adult dose of {name} is {dose} mg {frequency}.",
+            f"The most common adverse effects of {name} are {', '.join(effects)}.",
+        ]
+        page_texts = []
+        for p in range(pages):
+            lines = [f"{name} prescribing information, page {p + 1}."]
+            if p < len(facts):
+                lines.append(facts[p])
+            lines += rng.sample(FILLER, 6)
+            page_texts.append("\n".join(lines))
+        write_text_pdf(os.path.join(out_dir, filename), page_texts)
+
+        asked = [
+            f"What is {name} used to treat?",
+            f"What is the recommended adult dose of {name}?",
+            f"What are the common side effects of {name}?",
+        ]
+        questions += [{"question": q, "expected_source": filename} for q in asked[:questions_per_doc]]
+    return questions
+
+
+def install_fakes(args):
+    """Points every module that captured a client at import time at the local stand-ins."""
+    config.embed_model.base = HashingEmbedder(dim=args.embed_dim, latency=args.embed_latency_ms / 1000)
+    fake_llm = FakeStreamingLLM(
+        first_token_latency=args.first_token_ms / 1000,
+        token_latency=args.token_ms / 1000,
+        answer_tokens=args.answer_tokens,
+    )
+    for module in (config, modules.rag, routes.ask_question):
+        module.llm = fake_llm
+    tasks.redis_client = NullRedis()
+    config.answer_cache.redis = NullRedis()
+
+
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        # ADMIN uploads go to the global KB, so every question session can retrieve them
+        user = User(email="harness@example.com", hashed_password="x", is_verified=True, role=UserRole.ADMIN)
+        db.add(user)
+        db.commit()
+        session = chat_crud.create_session(db, ChatSessionCreate(title="uploads"), user.id)
+        db.refresh(user)
+        db.expunge(user)  # used (read-only) by the answer runs after this session closes
+        return user, session.id
+    finally:
+        db.close()
+
+
+def new_sessions(user_id: int, count: int) -> list[int]:
+    db = SessionLocal()
+    try:
+        return [chat_crud.create_session(db, ChatSessionCreate(title="New Chat"), user_id).id for _ in range(count)]
+    finally:
+        db.close()
+
+
+def run_ingestion(pdf_dir: str, upload_session_id: int) -> dict:
+    # The task deletes its uploads, so it gets copies
+    upload_dir = os.path.join(offline_env.BENCH_DIR, "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    paths = []
+    for name in sorted(os.listdir(pdf_dir)):
+        if name.lower().endswith(".pdf"):
+            paths.append(shutil.copy(os.path.join(pdf_dir, name), os.path.join(upload_dir, name)))
+    pages = sum(count_pdf_pages(p) for p in paths)
+
+    start = time.perf_counter()
+    tasks.process_documents_task.apply(kwargs={"file_paths": paths, "session_id": upload_session_id}).get()
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        rows = db.query(UploadedFile).filter(UploadedFile.session_id == upload_session_id).all()
+        chunks = sum(len(r.chunk_hashes or []) for r in rows)
+    finally:
+        db.close()
+    return {
+        "files": len(paths),
+        "files_ok": len(rows),
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 1),
+        "chunks_per_s": round(chunks / elapsed, 1),
+    }
+
+
+async def ask(question: str, session_id: int, user) -> dict:
+    start = time.perf_counter()
+    first_token, sources, error = None, [], False
+    decoder = SSEDecoder()
+    async for frame in stream_generator(question, session_id, user, config.vector_store, f"session_{session_id}"):
+        for event, data in decoder.feed(frame):
+            if event == events.TOKEN and first_token is None:
+                first_token = time.perf_counter()
+            elif event == events.SOURCES:
+                sources = data
+            elif event == events.ERROR:
+                error = True
+    end = time.perf_counter()
+    return {
+        "ttft_ms": ((first_token or end) - start) * 1000,
+        "total_ms": (end - start) * 1000,
+        "sources": [s["source"] for s in sources],
+        "error": error,
+    }
+
+
+async def run_questions(questions: list[dict], user, concurrency: int) -> list[dict]:
+    session_ids = new_sessions(user.id, len(questions))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item, session_id):
+        async with semaphore:
+            return await ask(item["question"], session_id, user)
+
+    results = await asyncio.gather(*[one(q, s) for q, s in zip(questions, session_ids)])
+    # Let the background title jobs finish before the loop closes
+    await asyncio.gather(*list(modules.titles._background_tasks), return_exceptions=True)
+    return results
+
+
+def answer_metrics(questions: list[dict], results: list[dict], concurrency: int) -> tuple[dict, dict]:
+    reciprocal_ranks = []
+    for item, result in zip(questions, results):
+        sources = result["sources"]
+        expected = item["expected_source"]
+        reciprocal_ranks.append(1 / (sources.index(expected) + 1) if expected in sources else 0.0)
+    hits = sum(1 for rr in reciprocal_ranks if rr > 0)
+    answer = {
+        "questions": len(results),
+        "concurrency": concurrency,
+        "errors": sum(r["error"] for r in results),
+        "ttft_ms": percentiles([r["ttft_ms"] for r in results]),
+        "total_ms": percentiles([r["total_ms"] for r in results]),
+    }
+    retrieval = {
+        "hit_rate": round(hits / len(results), 4) if results else None,
+        "mrr": round(sum(reciprocal_ranks) / len(results), 4) if results else None,
+    }
+    return answer, retrieval
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return round(resource.getrusage(who).ru_maxrss / scale, 1)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def lookup(report: dict, dotted: str):
+    value = report
+    for part in dotted.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (relative)."""
+    if baseline.get("params") != report["params"]:
+        print("warning: baseline was run with different parameters; comparison may be meaningless")
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        new, old = lookup(report, metric), lookup(baseline, metric)
+        if new is None or old is None or old == 0:
+            continue
+        change = (new - old) / old
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        print(f"  {metric:28s} {old:>10} -> {new:<10} ({change:+.1%}){'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(metric)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=30, help="synthetic PDFs (ignored with --pdf-dir)")
+    parser.add_argument("--pages", type=int, default=6, help="pages per synthetic PDF")
+    parser.add_argument("--questions-per-doc", type=int, default=3)
+    parser.add_argument("--pdf-dir", help="ingest these PDFs instead of the synthetic corpus")
+    parser.add_argument("--questions", help="labeled question set (JSON), required with --pdf-dir")
+    parser.add_argument("--concurrency", type=int, default=8, help="questions in flight at once")
+    parser.add_argument("--embed-dim", type=int, default=384)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="fake embedding call latency")
+    parser.add_argument("--first-token-ms", type=float, default=200.0, help="fake LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="fake LLM delay between tokens")
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    if args.pdf_dir and not args.questions:
+        parser.error("--pdf-dir needs --questions")
+
+    install_fakes(args)
+    user, upload_session_id = setup_db()
+
+    if args.pdf_dir:
+        pdf_dir = args.pdf_dir
+        with open(args.questions, encoding="utf-8") as f:
+            questions = json.load(f)
+    else:
+        pdf_dir = os.path.join(offline_env.BENCH_DIR, "corpus")
+        os.makedirs(pdf_dir, exist_ok=True)
+        questions = synthetic_corpus(pdf_dir, args.docs, args.pages, args.questions_per_doc, args.seed)
+
+    ingestion = run_ingestion(pdf_dir, upload_session_id)
+    rss_after_ingestion = peak_rss_mb()
+
+    results = asyncio.run(run_questions(questions, user, args.concurrency))
+    answer, retrieval = answer_metrics(questions, results, args.concurrency)
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "tolerance")}
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "git_commit": git_commit(),
+        "params": params,
+        "ingestion": ingestion,
+        "answer": answer,
+        "retrieval": retrieval,
+        "memory": {
+            "peak_rss_after_ingestion_mb": rss_after_ingestion,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_children_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        },
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nvs baseline {baseline.get('git_commit')} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,13 @@ from dotenv import load_dotenv
 from logger import logger
 import os
 from fastapi_mail import ConnectionConfig
+import redis
+from modules.embedding_cache import CachedEmbeddings
+from modules.answer_cache import SemanticAnswerCache
+from utils.user_cache import UserCache
+from modules.vector_store import create_vector_store
+from modules.lexical_index import LexicalIndex
+from modules.metrics import configure as configure_metrics
 
 # Load environment variables
 load_dotenv()
@@ -17,18 +24,122 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "medicalindex")
 DATABASE_URL = os.getenv("DATABASE_URL")
+# --DB Pool--
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
 # --JWT--
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+# --Authenticated user cache--
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_LOCAL_TTL_SECONDS = int(os.getenv("USER_CACHE_LOCAL_TTL_SECONDS", "30"))
+USER_CACHE_REDIS_TTL_SECONDS = int(os.getenv("USER_CACHE_REDIS_TTL_SECONDS", "300"))
+USER_CACHE_USE_REDIS = os.getenv("USER_CACHE_USE_REDIS", "true").lower() == "true"
+
+# --- Vector Store Config ---
+# "pinecone" (default) or "local" (numpy + memory-mapped files, no network)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", "./vector_data")
 
 # --- Namespace Config ---
 GLOBAL_KB_NAMESPACE = "global_kb"
 
+# --- ANN Index Config (local backend only) ---
+# "ivf" (default), "hnsw" (needs hnswlib) or "none" for exact search everywhere
+ANN_INDEX = os.getenv("ANN_INDEX", "ivf").lower()
+ANN_NAMESPACES = [ns.strip() for ns in os.getenv("ANN_NAMESPACES", GLOBAL_KB_NAMESPACE).split(",") if ns.strip()]
+# Below this many live chunks exact search is fast enough
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", "20000"))
+# 0 = sqrt(rows) lists; see benchmarks/bench_ann.py for recall vs latency
+ANN_IVF_NLIST = int(os.getenv("ANN_IVF_NLIST", "0"))
+ANN_IVF_NPROBE = int(os.getenv("ANN_IVF_NPROBE", "16"))
+ANN_HNSW_M = int(os.getenv("ANN_HNSW_M", "16"))
+ANN_HNSW_EF_CONSTRUCTION = int(os.getenv("ANN_HNSW_EF_CONSTRUCTION", "200"))
+ANN_HNSW_EF_SEARCH = int(os.getenv("ANN_HNSW_EF_SEARCH", "64"))
+
+# --- Retrieval Config ---
+# Max seconds to wait on a single namespace query before answering without it
+RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", "5"))
+# BM25 keyword search fused with vector search (reciprocal rank fusion).
+# The index log dir must be shared by the API and the Celery worker.
+LEXICAL_SEARCH_ENABLED = os.getenv("LEXICAL_SEARCH_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "./lexical_index")
+# Namespaces kept in memory per process (least recently searched are dropped, then reloaded from the log)
+LEXICAL_MAX_NAMESPACES = int(os.getenv("LEXICAL_MAX_NAMESPACES", "64"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Candidates fetched per source, then merged (normalize -> dedupe -> MMR) down to RETRIEVAL_TOP_K
+RETRIEVAL_K_PRIVATE = int(os.getenv("RETRIEVAL_K_PRIVATE", "4"))
+RETRIEVAL_K_GLOBAL = int(os.getenv("RETRIEVAL_K_GLOBAL", "4"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+# 1.0 = pure relevance, lower values favour diverse chunks
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+# Chunks whose word 3-grams are this much contained in a better chunk are dropped
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.8"))
+# Max (estimated) tokens of retrieved context per prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+
+# --- Conversation Memory Config ---
+# Last N question/answer turns go into the prompt verbatim, within MEMORY_MAX_TOKENS
+MEMORY_TURNS = int(os.getenv("MEMORY_TURNS", "3"))
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "600"))
+# Older messages are folded into ChatSession.summary once they add up to this many tokens
+MEMORY_SUMMARY_TRIGGER_TOKENS = int(os.getenv("MEMORY_SUMMARY_TRIGGER_TOKENS", "1500"))
+MEMORY_SUMMARY_MAX_WORDS = int(os.getenv("MEMORY_SUMMARY_MAX_WORDS", "150"))
+
+# --- Message History Pages (GET /chat/sessions/{id}/messages) ---
+MESSAGES_PAGE_DEFAULT = int(os.getenv("MESSAGES_PAGE_DEFAULT", "100"))
+MESSAGES_PAGE_MAX = int(os.getenv("MESSAGES_PAGE_MAX", "500"))
+# GET /chat/export reads this many rows per server-side cursor fetch (= per response chunk)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
 # ---Celery Config ---
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
 
+# --- Upload Config ---
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+
+# --- Ingestion Pipeline Config ---
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+INGEST_UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "100"))
+# 0 = one parse worker per CPU core
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", "0"))
+
+# --- Batch Question Answering Config ---
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "5000"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+# Requests per minute sent to the LLM by one batch task (Groq free tier: 30)
+BATCH_LLM_RATE_PER_MINUTE = int(os.getenv("BATCH_LLM_RATE_PER_MINUTE", "30"))
+BATCH_LLM_MAX_RETRIES = int(os.getenv("BATCH_LLM_MAX_RETRIES", "5"))
+BATCH_EMBED_BATCH_SIZE = int(os.getenv("BATCH_EMBED_BATCH_SIZE", "100"))
+# JSONL results; must be shared by the API and the Celery worker
+BATCH_RESULTS_DIR = os.getenv("BATCH_RESULTS_DIR", "./batch_results")
+
+# --- Embedding Cache Config ---
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "models/embedding-001")
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL_SECONDS = int(os.getenv("EMBED_CACHE_TTL_SECONDS", "86400"))
+# Shared tier across workers; set to "false" to keep the cache in-process only
+EMBED_CACHE_USE_REDIS = os.getenv("EMBED_CACHE_USE_REDIS", "true").lower() == "true"
+
+# --- Semantic Answer Cache Config (global KB answers only) ---
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+
+# --- Metrics / Tracing Config ---
+# Stage latency histograms served at /metrics. With several API/Celery worker processes,
+# also set PROMETHEUS_MULTIPROC_DIR (an empty dir shared by all of them) before startup.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# OpenTelemetry spans for the same stages (needs opentelemetry-api plus an SDK/exporter setup)
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+
 EMAIL_CONF = ConnectionConfig(
     MAIL_USERNAME = os.getenv("MAIL_USERNAME"),
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD"),
@@ -44,7 +155,7 @@ EMAIL_CONF = ConnectionConfig(
 # Configuration checks
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY not found in .env file")
-if not PINECONE_API_KEY:
+if VECTOR_BACKEND == "pinecone" and not PINECONE_API_KEY:
     raise ValueError("PINECONE_API_KEY not found in .env file")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY not found in .env file")
@@ -57,17 +168,68 @@ if not SECRET_KEY:
 try:
     logger.info("Initializing global clients...")
 
+    # Stage timing (modules/metrics.py)
+    configure_metrics(enabled=METRICS_ENABLED, tracing=OTEL_ENABLED)
+
     # Pinecone
-    pc = Pinecone(api_key=PINECONE_API_KEY)
+    pc = Pinecone(api_key=PINECONE_API_KEY) if PINECONE_API_KEY else None
+
+    # Vector store used by retrieval, ingestion and file deletion
+    vector_store = create_vector_store(
+        VECTOR_BACKEND, pc=pc, index_name=PINECONE_INDEX_NAME, local_dir=LOCAL_VECTOR_DIR,
+        local_options={
+            "ann": None if ANN_INDEX == "none" else ANN_INDEX,
+            "ann_namespaces": ANN_NAMESPACES,
+            "ann_min_rows": ANN_MIN_ROWS,
+            "ann_options": {
+                "nlist": ANN_IVF_NLIST,
+                "nprobe": ANN_IVF_NPROBE,
+                "m": ANN_HNSW_M,
+                "ef_construction": ANN_HNSW_EF_CONSTRUCTION,
+                "ef_search": ANN_HNSW_EF_SEARCH,
+            },
+        },
+    )
+
+    # In-process BM25 indexes, replayed from the shared log directory
+    lexical_index = (
+        LexicalIndex(LEXICAL_INDEX_DIR, max_namespaces=LEXICAL_MAX_NAMESPACES) if LEXICAL_SEARCH_ENABLED else None
+    )
+
+    # Redis (shared by the caches; same instance as the Celery broker)
+    redis_client = redis.from_url(CELERY_BROKER_URL)
 
     # Google Generative AI
     genai.configure(api_key=GOOGLE_API_KEY)
 
-    # Google Embeddings model
-    embed_model = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
+    # Google Embeddings model, wrapped with the query embedding cache
+    base_embed_model = GoogleGenerativeAIEmbeddings(
+        model=EMBED_MODEL_NAME,
         google_api_key=GOOGLE_API_KEY
     )
+    embed_model = CachedEmbeddings(
+        base_embed_model,
+        model_name=EMBED_MODEL_NAME,
+        max_size=EMBED_CACHE_SIZE,
+        ttl=EMBED_CACHE_TTL_SECONDS,
+        redis_client=redis_client if EMBED_CACHE_USE_REDIS else None
+    )
+
+    # Authenticated user cache (skips the per-request user lookup)
+    user_cache = UserCache(
+        redis_client=redis_client if USER_CACHE_USE_REDIS else None,
+        max_size=USER_CACHE_SIZE,
+        local_ttl=USER_CACHE_LOCAL_TTL_SECONDS,
+        redis_ttl=USER_CACHE_REDIS_TTL_SECONDS
+    )
+
+    # Semantic answer cache for global-KB questions
+    answer_cache = SemanticAnswerCache(
+        redis_client=redis_client,
+        threshold=ANSWER_CACHE_SIMILARITY,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        ttl=ANSWER_CACHE_TTL_SECONDS
+    )
 
     # Groq LLM
     llm = ChatGroq(
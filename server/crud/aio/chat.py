@@ -0,0 +1,70 @@
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models.chat import ChatSession
+from schemas.chat import ChatSessionCreate
+from logger import logger
+
+async def create_session(db: AsyncSession, session: ChatSessionCreate, user_id: int):
+    db_session = ChatSession(
+        user_id=user_id,
+        title=session.title,
+        last_message_at=func.now()  # new chats sort first until they have messages
+    )
+    db.add(db_session)
+    await db.commit()
+    await db.refresh(db_session)
+    logger.info(f"Created new chat session {db_session.id} for user {user_id}")
+    return db_session
+
+async def get_user_sessions(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 50):
+    result = await db.execute(
+        select(ChatSession)
+        .filter(ChatSession.user_id == user_id)
+        .order_by(ChatSession.last_message_at.desc())  # ix_chat_sessions_user_last_message
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def get_session(db: AsyncSession, session_id: int, user_id: int):
+    result = await db.execute(
+        select(ChatSession).filter(
+            ChatSession.id == session_id,
+            ChatSession.user_id == user_id
+        )
+    )
+    return result.scalars().first()
+
+async def delete_session(db: AsyncSession, session_id: int, user_id: int):
+    # Eager-load the cascaded children; lazy loads aren't allowed under asyncio
+    result = await db.execute(
+        select(ChatSession)
+        .options(selectinload(ChatSession.messages), selectinload(ChatSession.files))
+        .filter(ChatSession.id == session_id, ChatSession.user_id == user_id)
+    )
+    session = result.scalars().first()
+    if session:
+        await db.delete(session)
+        await db.commit()
+        return True
+    return False
+
+async def update_session_summary(db: AsyncSession, session_id: int, user_id: int,
+                                 summary: str, summary_message_id: int):
+    session = await get_session(db, session_id, user_id)
+    if session:
+        session.summary = summary
+        session.summary_message_id = summary_message_id
+        await db.commit()
+        return session
+    return None
+
+async def update_session_title(db: AsyncSession, session_id: int, title: str, user_id: int):
+    session = await get_session(db, session_id, user_id)
+    if session:
+        session.title = title
+        await db.commit()
+        await db.refresh(session)
+        return session
+    return None
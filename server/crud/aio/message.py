@@ -0,0 +1,76 @@
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.message import Message
+from models.chat import ChatSession
+from crud.message import session_activity, before_message, PAGE_COLUMNS, PAGE_ORDER, EXPORT_COLUMNS
+from schemas.message import MessageCreate
+
+async def create_message(db: AsyncSession, message: MessageCreate, user_id: int, session_id: int) -> Message:
+    db_message = Message(
+        content=message.content,
+        role=message.role,
+        sources=message.sources,
+        owner_id=user_id,
+        session_id=session_id
+    )
+    db.add(db_message)
+    # Same transaction as the INSERT, so the session list never disagrees with the history
+    await db.execute(
+        update(ChatSession)
+        .where(ChatSession.id == session_id)
+        .values(session_activity(message.content))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+async def get_messages_page(db: AsyncSession, session_id: int, user_id: int, limit: int = 100,
+                            before_id: int | None = None) -> list[dict]:
+    """
+    Keyset page: the latest `limit` messages before message `before_id` (or the latest overall),
+    oldest first, as dicts. One range scan of ix_messages_session_created, no ORM objects.
+    """
+    query = select(*PAGE_COLUMNS).filter(Message.session_id == session_id, Message.owner_id == user_id)
+    if before_id is not None:
+        query = query.filter(before_message(before_id))
+    result = await db.execute(query.order_by(*PAGE_ORDER).limit(limit))
+    return [dict(row) for row in reversed(result.mappings().all())]
+
+async def get_recent_messages(db: AsyncSession, session_id: int, user_id: int, limit: int = 10,
+                              after_id: int | None = None, before_id: int | None = None):
+    """The latest `limit` messages (optionally with after_id < id < before_id), oldest first."""
+    query = select(Message).filter(Message.session_id == session_id, Message.owner_id == user_id)
+    if after_id is not None:
+        query = query.filter(Message.id > after_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    result = await db.execute(query.order_by(Message.id.desc()).limit(limit))
+    return list(reversed(result.scalars().all()))
+
+async def get_messages_version(db: AsyncSession, session_id: int, user_id: int) -> tuple[int, int | None]:
+    """(count, max id) of a session's messages; messages are append-only, so this changes iff the history does."""
+    result = await db.execute(
+        select(func.count(Message.id), func.max(Message.id))
+        .filter(Message.session_id == session_id, Message.owner_id == user_id)
+    )
+    return tuple(result.one())
+
+async def iter_export_batches(db: AsyncSession, user_id: int, session_id: int | None = None,
+                              batch_size: int = 500):
+    """
+    All of a user's messages (or one session's), grouped by session in history order,
+    as batches of row mappings. yield_per streams from a server-side cursor, so memory
+    stays at one batch however long the history is.
+    """
+    query = (
+        select(*EXPORT_COLUMNS)
+        .join(ChatSession, ChatSession.id == Message.session_id)
+        .filter(ChatSession.user_id == user_id)
+    )
+    if session_id is not None:
+        query = query.filter(Message.session_id == session_id)
+    query = query.order_by(Message.session_id, Message.created_at, Message.id)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for batch in result.mappings().partitions():
+        yield batch
@@ -0,0 +1,29 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user import User
+from schemas.user import UserCreate
+from utils.security import get_password_hash
+from logger import logger
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: UserCreate):
+    logger.info(f"Hashing password for user {user.email}")
+    hashed_password = get_password_hash(user.password)
+
+    db_user = User(
+        email = user.email,
+        hashed_password = hashed_password
+    )
+
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    '''Fetches a single user by their ID.'''
+    result = await db.execute(select(User).filter(User.id == user_id))
+    return result.scalars().first()
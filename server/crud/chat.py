@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from models.chat import ChatSession
 from schemas.chat import ChatSessionCreate
@@ -6,7 +7,8 @@ from logger import logger
 def create_session(db: Session, session: ChatSessionCreate, user_id: int):
     db_session = ChatSession(
         user_id=user_id,
-        title=session.title
+        title=session.title,
+        last_message_at=func.now()  # new chats sort first until they have messages
     )
     db.add(db_session)
     db.commit()
@@ -18,7 +20,7 @@ def get_user_sessions(db: Session, user_id: int, skip: int = 0, limit: int = 50)
     return (
         db.query(ChatSession)
         .filter(ChatSession.user_id == user_id)
-        .order_by(ChatSession.updated_at.desc())
+        .order_by(ChatSession.last_message_at.desc())  # ix_chat_sessions_user_last_message
         .offset(skip)
         .limit(limit)
         .all()
@@ -45,4 +47,13 @@ def update_session_title(db: Session, session_id: int, title: str, user_id: int)
         db.commit()
         db.refresh(session)
         return session
-    return None
\ No newline at end of file
+    return None
+
+def update_session_summary(db: Session, session_id: int, user_id: int, summary: str, summary_message_id: int):
+    session = get_session(db, session_id, user_id)
+    if session:
+        session.summary = summary
+        session.summary_message_id = summary_message_id
+        db.commit()
+        return session
+    return None
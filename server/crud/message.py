@@ -1,28 +1,99 @@
+from sqlalchemy import select, func, tuple_
 from sqlalchemy.orm import Session
 from models.message import Message, MessageRole
+from models.chat import ChatSession
 from schemas.message import MessageCreate
 from logger import logger
 
+PREVIEW_CHARS = 120
+
+def session_activity(content: str) -> dict:
+    """SET values that keep ChatSession.last_message_at / message_count / last_preview current."""
+    preview = " ".join(content.split())
+    if len(preview) > PREVIEW_CHARS:
+        preview = preview[:PREVIEW_CHARS - 1].rstrip() + "…"
+    return {
+        ChatSession.message_count: ChatSession.message_count + 1,  # in SQL, so concurrent inserts can't lose a count
+        ChatSession.last_message_at: func.now(),
+        ChatSession.last_preview: preview,
+    }
+
 def create_message(db: Session, message: MessageCreate, user_id: int, session_id: int) -> Message:
     db_message = Message(
         content=message.content,
         role=message.role,
+        sources=message.sources,
         owner_id=user_id,
         session_id=session_id
     )
     db.add(db_message)
+    # Same transaction as the INSERT, so the session list never disagrees with the history
+    db.query(ChatSession).filter(ChatSession.id == session_id).update(
+        session_activity(message.content), synchronize_session=False
+    )
     db.commit()
     db.refresh(db_message)
     return db_message
 
-def get_messages_by_session(db: Session, session_id: int, user_id: int):
-    """Retrieves messages for a specific session, verifying ownership."""
-    # We join with ChatSession to ensure the user owns this session
-    return (
-        db.query(Message)
-        .join(Message.session)
-        .filter(Message.session_id == session_id)
-        .filter(Message.owner_id == user_id)
-        .order_by(Message.created_at.asc())
-        .all()
-    )
\ No newline at end of file
+# Columns of a history page (what MessageDisplay needs), selected as plain rows
+PAGE_COLUMNS = (Message.id, Message.session_id, Message.role, Message.content, Message.created_at)
+# Newest first, the order ix_messages_session_created is scanned in; pages are reversed after the LIMIT
+PAGE_ORDER = (Message.created_at.desc(), Message.id.desc())
+
+def before_message(before_id: int):
+    """Keyset predicate: messages before message `before_id` in (created_at, id) order."""
+    cursor = select(Message.created_at).filter(Message.id == before_id).scalar_subquery()
+    return tuple_(Message.created_at, Message.id) < tuple_(cursor, before_id)
+
+def get_messages_page(db: Session, session_id: int, user_id: int, limit: int = 100,
+                      before_id: int | None = None) -> list[dict]:
+    """
+    Keyset page: the latest `limit` messages before message `before_id` (or the latest overall),
+    oldest first, as dicts. One range scan of ix_messages_session_created, no ORM objects.
+    """
+    query = db.query(*PAGE_COLUMNS).filter(Message.session_id == session_id, Message.owner_id == user_id)
+    if before_id is not None:
+        query = query.filter(before_message(before_id))
+    rows = query.order_by(*PAGE_ORDER).limit(limit).all()
+    return [row._asdict() for row in reversed(rows)]
+
+def get_recent_messages(db: Session, session_id: int, user_id: int, limit: int = 10,
+                        after_id: int | None = None, before_id: int | None = None):
+    """The latest `limit` messages (optionally with after_id < id < before_id), oldest first."""
+    query = db.query(Message).filter(Message.session_id == session_id, Message.owner_id == user_id)
+    if after_id is not None:
+        query = query.filter(Message.id > after_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    return list(reversed(query.order_by(Message.id.desc()).limit(limit).all()))
+
+def get_messages_version(db: Session, session_id: int, user_id: int) -> tuple[int, int | None]:
+    """(count, max id) of a session's messages; messages are append-only, so this changes iff the history does."""
+    return tuple(
+        db.query(func.count(Message.id), func.max(Message.id))
+        .filter(Message.session_id == session_id, Message.owner_id == user_id)
+        .one()
+    )
+
+# Columns of an export row: the message plus its session's title
+EXPORT_COLUMNS = (
+    Message.session_id, ChatSession.title.label("session_title"), Message.id, Message.role,
+    Message.created_at, Message.content, Message.sources,
+)
+
+def iter_export_batches(db: Session, user_id: int, session_id: int | None = None, batch_size: int = 500):
+    """
+    All of a user's messages (or one session's), grouped by session in history order,
+    as batches of row mappings. yield_per streams from a server-side cursor, so memory
+    stays at one batch however long the history is.
+    """
+    query = (
+        select(*EXPORT_COLUMNS)
+        .join(ChatSession, ChatSession.id == Message.session_id)
+        .filter(ChatSession.user_id == user_id)
+    )
+    if session_id is not None:
+        query = query.filter(Message.session_id == session_id)
+    query = query.order_by(Message.session_id, Message.created_at, Message.id)
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    yield from result.mappings().partitions()
@@ -1,12 +1,60 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE_SECONDS, DB_POOL_PRE_PING
+)
 from logger import logger
 
+
+def to_async_url(url: str) -> str:
+    """Maps a sync driver URL to its async driver (psycopg2 -> asyncpg, sqlite -> aiosqlite)."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if url.startswith(prefix):
+            async_url = make_url("postgresql+asyncpg://" + url[len(prefix):])
+            # asyncpg rejects libpq's sslmode; it takes the same modes as `ssl`
+            if "sslmode" in async_url.query:
+                query = dict(async_url.query)
+                query["ssl"] = query.pop("sslmode")
+                async_url = async_url.set(query=query)
+            return async_url.render_as_string(hide_password=False)
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE_SECONDS}
+    # File-based SQLite gets a QueuePool like Postgres; only in-memory SQLite uses a
+    # single/static connection pool, which doesn't take sizing arguments
+    parsed = make_url(url)
+    if issubclass(parsed.get_dialect().get_pool_class(parsed), QueuePool):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+    return options
+
+
 try:
-    engine = create_engine(DATABASE_URL)
+    # Sync engine: Celery tasks, scripts and sync (threadpool) routes
+    engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    # Async engine: async routes, so DB calls never block the event loop
+    ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
     Base = declarative_base()
     logger.info("Database connection pool established.")
 except Exception as e:
@@ -19,4 +67,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
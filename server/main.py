@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from middlewares.exception_handlers import catch_exception_middleware
+from middlewares.metrics import metrics_middleware
 from routes.upload_pdfs import router as upload_router
 from routes.ask_question import router as ask_router
 from routes.chat import router as chat_router
@@ -9,6 +10,8 @@ from logger import logger
 from config import *
 from database import engine, Base
 from routes.files import router as files_router
+from routes.batch_ask import router as batch_router
+from routes.metrics import router as metrics_router
 
 import models.user
 import models.message
@@ -28,13 +31,19 @@ app.add_middleware(
 )
 
 app.middleware("http")(catch_exception_middleware)
+if METRICS_ENABLED:
+    app.middleware("http")(metrics_middleware)
 
 app.include_router(upload_router)
 app.include_router(ask_router)
 app.include_router(auth_router)
 app.include_router(chat_router)
 app.include_router(files_router)
+app.include_router(batch_router)
+if METRICS_ENABLED:
+    app.include_router(metrics_router)
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Starting VitaAI API")
\ No newline at end of file
+    logger.info("Starting VitaAI API")
+    user_cache.start_invalidation_listener()
\ No newline at end of file
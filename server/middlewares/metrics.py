@@ -0,0 +1,16 @@
+import time
+from fastapi import Request
+from modules.metrics import observe_request
+
+
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template (/ask/{session_id}), not the raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        observe_request(request.method, getattr(route, "path", "unmatched"), status, time.perf_counter() - start)
@@ -0,0 +1,46 @@
+"""Content addressing of uploads: uploaded_files.namespace, content_hash, chunk_hashes
+
+Databases created before this revision were built by Base.metadata.create_all(), which
+only creates missing tables, so these columns are missing there. Every step checks first,
+so this revision is safe on any database (a fresh create_all() one already has everything).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (column, index name or None)
+COLUMNS = [
+    (sa.Column("namespace", sa.String(), nullable=True), "ix_uploaded_files_namespace"),
+    (sa.Column("content_hash", sa.String(64), nullable=True), "ix_uploaded_files_content_hash"),
+    (sa.Column("chunk_hashes", sa.JSON(), nullable=True), None),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "uploaded_files" not in inspector.get_table_names():
+        return  # create_all() will create it complete
+
+    existing = {c["name"] for c in inspector.get_columns("uploaded_files")}
+    indexes = {i["name"] for i in inspector.get_indexes("uploaded_files")}
+    for column, index in COLUMNS:
+        if column.name not in existing:
+            op.add_column("uploaded_files", column)
+        if index and index not in indexes:
+            op.create_index(index, "uploaded_files", [column.name])
+
+
+def downgrade():
+    with op.batch_alter_table("uploaded_files") as batch:
+        for column, index in reversed(COLUMNS):
+            if index:
+                batch.drop_index(index)
+            batch.drop_column(column.name)
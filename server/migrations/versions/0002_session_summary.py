@@ -0,0 +1,37 @@
+"""Rolling conversation summary: chat_sessions.summary, summary_message_id
+
+Like 0001, every step checks first, so a database created by create_all() is left as is.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("summary", sa.Text(), nullable=True),
+    sa.Column("summary_message_id", sa.Integer(), nullable=True),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "chat_sessions" not in inspector.get_table_names():
+        return  # create_all() will create it complete
+
+    existing = {c["name"] for c in inspector.get_columns("chat_sessions")}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column("chat_sessions", column)
+
+
+def downgrade():
+    with op.batch_alter_table("chat_sessions") as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column.name)
@@ -0,0 +1,32 @@
+"""Message history index for keyset pages: messages (session_id, created_at, id)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+MESSAGES_INDEX = "ix_messages_session_created"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "messages" not in inspector.get_table_names():
+        return  # create_all() will create it complete
+
+    if MESSAGES_INDEX not in {i["name"] for i in inspector.get_indexes("messages")}:
+        # On Postgres, build it without blocking message writes (needs to run outside the transaction)
+        with op.get_context().autocommit_block():
+            op.create_index(
+                MESSAGES_INDEX, "messages", ["session_id", "created_at", "id"], postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    op.drop_index(MESSAGES_INDEX, table_name="messages")
@@ -0,0 +1,68 @@
+"""Denormalized session activity (last_message_at, message_count, last_preview) for the session list
+
+Adds the columns, backfills them from messages and indexes (user_id, last_message_at DESC).
+Like 0001-0003, every step checks first, so a database created by create_all() is left as is.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+SESSIONS_INDEX = "ix_chat_sessions_user_last_message"
+PREVIEW_CHARS = 120  # crud.message.PREVIEW_CHARS
+
+BACKFILL = sa.text(f"""
+    UPDATE chat_sessions SET
+        message_count = (SELECT COUNT(*) FROM messages m WHERE m.session_id = chat_sessions.id),
+        last_message_at = COALESCE(
+            (SELECT MAX(m.created_at) FROM messages m WHERE m.session_id = chat_sessions.id),
+            chat_sessions.created_at
+        ),
+        last_preview = (
+            SELECT SUBSTR(m.content, 1, {PREVIEW_CHARS}) FROM messages m
+            WHERE m.session_id = chat_sessions.id
+            ORDER BY m.created_at DESC, m.id DESC LIMIT 1
+        )
+""")
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "chat_sessions" not in inspector.get_table_names():
+        return  # create_all() will create it complete
+
+    existing = {c["name"] for c in inspector.get_columns("chat_sessions")}
+    added = False
+    for column in (
+        sa.Column("last_message_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_preview", sa.String(), nullable=True),
+    ):
+        if column.name not in existing:
+            op.add_column("chat_sessions", column)
+            added = True
+    if added:
+        op.execute(BACKFILL)
+
+    if SESSIONS_INDEX not in {i["name"] for i in inspector.get_indexes("chat_sessions")}:
+        # On Postgres, build it without blocking writes (needs to run outside the transaction)
+        with op.get_context().autocommit_block():
+            op.create_index(
+                SESSIONS_INDEX, "chat_sessions", ["user_id", sa.text("last_message_at DESC")],
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    op.drop_index(SESSIONS_INDEX, table_name="chat_sessions")
+    with op.batch_alter_table("chat_sessions") as batch:
+        batch.drop_column("last_preview")
+        batch.drop_column("message_count")
+        batch.drop_column("last_message_at")
@@ -0,0 +1,26 @@
+"""Store the sources of each assistant answer on its message (used by GET /chat/export)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "messages" not in inspector.get_table_names():
+        return  # create_all() will create it complete
+    if "sources" not in {c["name"] for c in inspector.get_columns("messages")}:
+        op.add_column("messages", sa.Column("sources", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("sources")
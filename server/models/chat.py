@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -13,6 +13,22 @@ class ChatSession(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Rolling summary of the conversation up to (and including) summary_message_id
+    # (existing databases: migrations/versions/0002_session_summary.py)
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
+
+    # Denormalized from messages so the session list is one indexed query.
+    # Set on creation, then updated in the same transaction as every new message
+    # (crud.message.create_message). Existing databases: migrations/versions/0004_session_activity.py
+    last_message_at = Column(DateTime(timezone=True), nullable=True)  # creation time until the first message
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_preview = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_chat_sessions_user_last_message", user_id, last_message_at.desc()),
+    )
+
     user = relationship("User", back_populates="sessions")
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -11,6 +11,12 @@ class UploadedFile(Base):
     filename = Column(String, nullable=False)
     # We store the Pinecone ID prefix (e.g., "file_123_") to delete all chunks later
     pinecone_id_prefix = Column(String, nullable=True)
+    # Content addressing: identical re-uploads link to existing vectors instead of re-embedding
+    # (existing databases: migrations/versions/0001_content_addressing.py)
+    namespace = Column(String, nullable=True, index=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    # SHA-256 of each chunk, in chunk order (chunk i is stored as "doc_{prefix}_{i}")
+    chunk_hashes = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime, Enum, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -11,11 +11,18 @@ class MessageRole(str, enum.Enum):
 
 class Message(Base):
     __tablename__ = "messages"
+    # History pages are keyset scans of one session in (created_at, id) order.
+    # Existing databases get it from migrations/versions/0003_history_index.py
+    __table_args__ = (
+        Index("ix_messages_session_created", "session_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     role = Column(Enum(MessageRole), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Assistant answers: the sources event sent with the answer ([{"source", "score", "merge_score", "type"}, ...])
+    sources = Column(JSON, nullable=True)
 
     # --- Foreign Keys ---
     # Link to the specific chat session
@@ -0,0 +1,238 @@
+import json
+import os
+import numpy as np
+from logger import logger
+
+IVF_FILE = "ann_ivf.npz"
+HNSW_FILE = "ann_hnsw.bin"
+HNSW_META_FILE = "ann_hnsw.json"
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    """K-means on unit vectors (cosine). Returns L2-normalized centroids (nlist, dim)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=nlist, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=nlist)
+
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFFlatIndex:
+    """
+    Inverted-file index over a store's row matrix.
+
+    Rows are assigned to their nearest centroid; a query scores only the rows in its
+    `nprobe` closest lists, exactly ("flat"). Deleted rows stay in the lists and are
+    dropped by the store's tombstone mask at query time; compaction remaps them away.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = 16, generation=None, trained_rows: int = 0):
+        self.centroids = centroids.astype(np.float32)
+        self.nprobe = nprobe
+        self.generation = generation
+        self.trained_rows = trained_rows
+        self.assign = np.zeros(0, dtype=np.int32)
+        self.lists = [np.zeros(0, dtype=np.int64) for _ in range(len(centroids))]
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, live_rows: np.ndarray, nlist: int = 0, nprobe: int = 16,
+              generation=None, seed: int = 0, **_) -> "IVFFlatIndex":
+        # Default list count grows with sqrt(n); k-means sees ~64 points per list
+        nlist = nlist or max(16, int(np.sqrt(len(live_rows))))
+        nlist = min(nlist, len(live_rows))
+        sample_size = min(len(live_rows), nlist * 64)
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(live_rows, sample_size, replace=False))
+        centroids = spherical_kmeans(np.asarray(matrix[sample]), nlist, seed=seed)
+        logger.info(f"Trained IVF index: {nlist} lists on {sample_size} vectors")
+        return cls(centroids, nprobe=nprobe, generation=generation, trained_rows=len(live_rows))
+
+    @property
+    def size(self) -> int:
+        return len(self.assign)
+
+    def extend(self, matrix: np.ndarray, upto: int, block_rows: int = 65536):
+        """Incremental insert: assigns rows [size, upto) to their nearest list."""
+        start = self.size
+        if upto <= start:
+            return
+        new_assign = []
+        for b in range(start, upto, block_rows):
+            block = np.asarray(matrix[b:min(b + block_rows, upto)])
+            new_assign.append(np.argmax(block @ self.centroids.T, axis=1).astype(np.int32))
+        new_assign = np.concatenate(new_assign)
+        self.assign = np.concatenate([self.assign, new_assign])
+
+        rows = np.arange(start, upto, dtype=np.int64)
+        order = np.argsort(new_assign, kind="stable")
+        bounds = np.searchsorted(new_assign[order], np.arange(len(self.centroids) + 1))
+        for lst in np.flatnonzero(np.diff(bounds)):
+            self.lists[lst] = np.concatenate([self.lists[lst], rows[order[bounds[lst]:bounds[lst + 1]]]])
+
+    def needs_retrain(self, live_count: int) -> bool:
+        """Centroids drift from the data as it grows; retrain once it has quadrupled."""
+        return live_count > 4 * max(self.trained_rows, 1)
+
+    def remove(self, rows):
+        """No-op: tombstoned rows are masked by the store at query time."""
+
+    def remap(self, live_rows: np.ndarray, generation=None):
+        """After compaction rows are renumbered: keep assignments of live rows only."""
+        assign = self.assign[live_rows[live_rows < self.size]]
+        self.assign = np.zeros(0, dtype=np.int32)
+        self.lists = [np.zeros(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        self.generation = generation
+        self._append_assignments(assign)
+
+    def _append_assignments(self, assign: np.ndarray):
+        start = self.size
+        self.assign = np.concatenate([self.assign, assign.astype(np.int32)])
+        rows = np.arange(start, start + len(assign), dtype=np.int64)
+        for lst in np.unique(assign):
+            self.lists[lst] = np.concatenate([self.lists[lst], rows[assign == lst]])
+
+    def search(self, matrix: np.ndarray, queries: np.ndarray, k: int, mask: np.ndarray):
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        out_rows, out_scores = [], []
+        for q, probe in zip(queries, probes):
+            cand = np.concatenate([self.lists[p] for p in probe])
+            # Rows past len(mask) were added after the caller's snapshot
+            cand = cand[cand < len(mask)]
+            cand = np.sort(cand[mask[cand]])
+            if len(cand) == 0:
+                out_rows.append([])
+                out_scores.append([])
+                continue
+            scores = np.asarray(matrix[cand]) @ q
+            kk = min(k, len(cand))
+            top = np.argpartition(-scores, kk - 1)[:kk]
+            top = top[np.argsort(-scores[top])]
+            out_rows.append(cand[top].tolist())
+            out_scores.append(scores[top].tolist())
+        return out_rows, out_scores
+
+    def save(self, directory: str):
+        tmp = os.path.join(directory, IVF_FILE + ".tmp.npz")
+        np.savez(tmp, centroids=self.centroids, assign=self.assign, trained_rows=np.array(self.trained_rows),
+                 generation=np.array(-1 if self.generation is None else self.generation))
+        os.replace(tmp, os.path.join(directory, IVF_FILE))
+
+    @classmethod
+    def load(cls, directory: str, nprobe: int = 16, **_) -> "IVFFlatIndex | None":
+        path = os.path.join(directory, IVF_FILE)
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        generation = int(data["generation"])
+        index = cls(data["centroids"], nprobe=nprobe, generation=None if generation < 0 else generation,
+                    trained_rows=int(data["trained_rows"]))
+        index._append_assignments(data["assign"])
+        return index
+
+
+class HNSWIndex:
+    """
+    HNSW graph index via the optional `hnswlib` package (pip install hnswlib).
+    Labels are store rows; deletes use hnswlib's mark_deleted tombstones.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 200, ef_search: int = 64,
+                 generation=None, capacity: int = 1024):
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("ANN_INDEX=hnsw requires the 'hnswlib' package") from e
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.generation = generation
+        self.graph = hnswlib.Index(space="ip", dim=dim)
+        self.graph.init_index(max_elements=capacity, M=m, ef_construction=ef_construction,
+                              allow_replace_deleted=False)
+        self.graph.set_ef(ef_search)
+        self.size = 0
+
+    @classmethod
+    def train(cls, matrix, live_rows, m: int = 16, ef_construction: int = 200, ef_search: int = 64,
+              generation=None, **_) -> "HNSWIndex":
+        return cls(matrix.shape[1], m=m, ef_construction=ef_construction, ef_search=ef_search,
+                   generation=generation, capacity=max(1024, int(matrix.shape[0] * 1.5)))
+
+    def extend(self, matrix: np.ndarray, upto: int, block_rows: int = 65536):
+        if upto <= self.size:
+            return
+        if upto > self.graph.get_max_elements():
+            self.graph.resize_index(int(upto * 1.5))
+        for b in range(self.size, upto, block_rows):
+            end = min(b + block_rows, upto)
+            self.graph.add_items(np.asarray(matrix[b:end]), np.arange(b, end))
+        self.size = upto
+
+    def needs_retrain(self, live_count: int) -> bool:
+        return False
+
+    def remove(self, rows):
+        for row in rows:
+            if row < self.size:
+                try:
+                    self.graph.mark_deleted(int(row))
+                except RuntimeError:
+                    pass
+
+    def remap(self, live_rows, generation=None):
+        # Graph labels can't be renumbered in place; the store rebuilds after compaction
+        raise NotImplementedError
+
+    def search(self, matrix, queries, k, mask):
+        fetch = min(self.size, max(k * 4, self.ef_search))
+        labels, distances = self.graph.knn_query(queries, k=fetch)
+        out_rows, out_scores = [], []
+        for row_labels, row_dist in zip(labels, distances):
+            keep = [
+                (int(r), 1.0 - float(d)) for r, d in zip(row_labels, row_dist)
+                if 0 <= r < len(mask) and mask[r]
+            ][:k]
+            out_rows.append([r for r, _ in keep])
+            out_scores.append([s for _, s in keep])
+        return out_rows, out_scores
+
+    def save(self, directory: str):
+        self.graph.save_index(os.path.join(directory, HNSW_FILE))
+        with open(os.path.join(directory, HNSW_META_FILE), "w") as f:
+            json.dump({"dim": self.dim, "size": self.size, "generation": self.generation,
+                       "m": self.m, "ef_construction": self.ef_construction}, f)
+
+    @classmethod
+    def load(cls, directory: str, ef_search: int = 64, **_) -> "HNSWIndex | None":
+        meta_path = os.path.join(directory, HNSW_META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        index = cls(meta["dim"], m=meta["m"], ef_construction=meta["ef_construction"],
+                    ef_search=ef_search, generation=meta["generation"])
+        index.graph.load_index(os.path.join(directory, HNSW_FILE), max_elements=max(1024, meta["size"]))
+        index.graph.set_ef(ef_search)
+        index.size = meta["size"]
+        return index
+
+
+ANN_INDEXES = {"ivf": IVFFlatIndex, "hnsw": HNSWIndex}
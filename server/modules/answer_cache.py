@@ -0,0 +1,117 @@
+import threading
+import time
+import numpy as np
+from logger import logger
+
+
+class SemanticAnswerCache:
+    """
+    Caches LLM answers for questions answered purely from a shared namespace (the global KB).
+
+    A cached answer is reused when:
+    1. The new question's embedding has cosine similarity >= `threshold` with a cached one.
+    2. Retrieval returned exactly the same set of chunk IDs, so the context is identical.
+
+    Entries live in-process per namespace. The namespace *version* lives in Redis so that
+    an admin upload processed by the Celery worker invalidates every API worker's cache.
+    """
+
+    def __init__(self, redis_client=None, threshold: float = 0.95,
+                 max_entries: int = 1000, ttl: float = 86400):
+        self.redis = redis_client
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local_versions = {}
+        self._namespaces = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --- Namespace versioning ---
+
+    def _version_key(self, namespace: str) -> str:
+        return f"kb_version:{namespace}"
+
+    def get_version(self, namespace: str) -> int:
+        if self.redis is not None:
+            try:
+                return int(self.redis.get(self._version_key(namespace)) or 0)
+            except Exception as e:
+                logger.warning(f"Answer cache version read failed: {e}")
+        return self._local_versions.get(namespace, 0)
+
+    def bump_version(self, namespace: str) -> int:
+        """Invalidates all cached answers for a namespace (call after its content changes)."""
+        if self.redis is not None:
+            try:
+                version = int(self.redis.incr(self._version_key(namespace)))
+                logger.info(f"Answer cache for '{namespace}' invalidated (version {version})")
+                return version
+            except Exception as e:
+                logger.warning(f"Answer cache version bump failed: {e}")
+        self._local_versions[namespace] = self._local_versions.get(namespace, 0) + 1
+        return self._local_versions[namespace]
+
+    # --- Entries ---
+
+    def _bucket(self, namespace: str, version: int) -> dict:
+        bucket = self._namespaces.get(namespace)
+        if bucket is None or bucket["version"] != version:
+            bucket = {"version": version, "vectors": None, "items": []}
+            self._namespaces[namespace] = bucket
+        return bucket
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(self, namespace: str, vector, chunk_ids: list[str]) -> dict | None:
+        version = self.get_version(namespace)
+        query = self._normalize(vector)
+        wanted = frozenset(chunk_ids)
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._bucket(namespace, version)
+            if bucket["vectors"] is None:
+                self.misses += 1
+                return None
+
+            sims = bucket["vectors"] @ query
+            for idx in np.argsort(-sims):
+                if sims[idx] < self.threshold:
+                    break
+                item = bucket["items"][idx]
+                if item["expires_at"] > now and item["chunk_ids"] == wanted:
+                    self.hits += 1
+                    return {"answer": item["answer"], "sources": item["sources"]}
+
+        self.misses += 1
+        return None
+
+    def store(self, namespace: str, vector, chunk_ids: list[str], answer: str, sources: list):
+        version = self.get_version(namespace)
+        row = self._normalize(vector)[None, :]
+        item = {
+            "chunk_ids": frozenset(chunk_ids),
+            "answer": answer,
+            "sources": sources,
+            "expires_at": time.monotonic() + self.ttl,
+        }
+
+        with self._lock:
+            bucket = self._bucket(namespace, version)
+            if bucket["vectors"] is None:
+                bucket["vectors"] = row
+            else:
+                bucket["vectors"] = np.vstack([bucket["vectors"], row])
+            bucket["items"].append(item)
+
+            # Drop the oldest entries once full
+            overflow = len(bucket["items"]) - self.max_entries
+            if overflow > 0:
+                bucket["vectors"] = bucket["vectors"][overflow:]
+                bucket["items"] = bucket["items"][overflow:]
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import random
+import re
+import time
+from asyncio_throttle import Throttler
+from logger import logger
+from config import embed_model
+from modules.embedding_cache import normalize_text
+from modules.rag import make_retriever, retrieval_plan, prepare_context, answer_chain, NO_HISTORY
+from modules.context_builder import estimate_tokens
+
+
+def results_path(root_dir: str, task_id: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9\-]+", task_id or ""):
+        raise ValueError(f"Invalid task id '{task_id}'")
+    return os.path.join(root_dir, f"{task_id}.jsonl")
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Groq/OpenAI-style clients raise RateLimitError (HTTP 429)."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError" or "rate limit" in str(error).lower()
+
+
+def retry_after(error: Exception) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def with_backoff(call, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+    """
+    Retries `call()` on rate-limit errors. Waits for the server's Retry-After when given,
+    otherwise exponential backoff with full jitter, so parallel callers don't retry in lockstep.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == max_retries or not is_rate_limited(e):
+                raise
+            delay = retry_after(e) or random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logger.warning(f"Rate limited, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+
+class BatchAnswerer:
+    """
+    Answers many questions with the same retrieval, merge, context and prompt as /ask.
+
+    - Identical questions (after normalization) are answered once and fanned out.
+    - Question embeddings are computed in batches, and retrieval runs one batched vector
+      query per namespace.
+    - LLM calls run at most `concurrency` at a time, under a requests-per-minute throttle,
+      with backoff on rate-limit errors.
+    - Results are handed to `write(record)` as soon as each answer finishes.
+    """
+
+    def __init__(self, vectorstore, concurrency: int = 4, rate_per_minute: int = 30,
+                 embed_batch_size: int = 100, max_retries: int = 5):
+        self.retriever = make_retriever(vectorstore)
+        self.concurrency = concurrency
+        self.throttler = Throttler(rate_limit=rate_per_minute, period=60)
+        self.embed_batch_size = embed_batch_size
+        self.max_retries = max_retries
+
+    async def run(self, items: list[dict], session_namespace: str | None, write, progress=None):
+        groups = {}
+        for item in items:
+            groups.setdefault(normalize_text(item["question"]), []).append(item)
+        questions = [members[0]["question"] for members in groups.values()]
+        logger.info(f"Batch: {len(items)} questions, {len(questions)} unique")
+
+        vectors = await asyncio.to_thread(embed_model.embed_queries, questions, self.embed_batch_size)
+        namespaces, k = retrieval_plan(session_namespace)
+        retrieved = await self.retriever.retrieve_many(questions, vectors, namespaces, k=k)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chain = answer_chain()
+
+        async def answer(question, docs, members):
+            started = time.perf_counter()
+            prepared = prepare_context(docs, question)
+            record = {"answer": None, "sources": prepared.sources, "usage": prepared.usage, "error": None}
+
+            async def call_llm():
+                # Every attempt, retries included, counts against the rate limit
+                async with self.throttler:
+                    return await chain.ainvoke(
+                        {"context": prepared.text, "question": question, "history": NO_HISTORY}
+                    )
+
+            try:
+                async with semaphore:
+                    record["answer"] = await with_backoff(call_llm, max_retries=self.max_retries)
+                record["usage"]["completion_tokens"] = estimate_tokens(record["answer"])
+            except Exception as e:
+                logger.error(f"Batch answer failed for '{question[:60]}': {e}")
+                record["error"] = str(e)
+            record["latency_ms"] = round((time.perf_counter() - started) * 1000)
+            return members, record
+
+        done = 0
+        tasks = [answer(q, docs, members) for q, docs, members in zip(questions, retrieved, groups.values())]
+        for finished in asyncio.as_completed(tasks):
+            members, record = await finished
+            for item in members:
+                write({"id": item.get("id"), "question": item["question"], **record})
+            done += len(members)
+            if progress:
+                progress(done, len(items))
+        return done
@@ -0,0 +1,85 @@
+"""
+Chat export formats for GET /chat/export. Rows arrive in batches (crud iter_export_batches),
+grouped by session in history order; each batch becomes one chunk of the response.
+
+    ndjson    one JSON object per message
+    markdown  a section per session, sources listed under each answer
+    csv       one row per message, sources as a JSON string
+"""
+import csv
+import io
+import json
+
+# format -> (media type, file extension)
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "markdown": ("text/markdown; charset=utf-8", "md"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+CSV_COLUMNS = ["session_id", "session_title", "message_id", "role", "created_at", "content", "sources"]
+
+
+def similarity_label(score) -> str:
+    return "keyword match" if score is None else f"similarity {score:.2f}"
+
+
+def _record(row) -> dict:
+    return {
+        "session_id": row["session_id"],
+        "session_title": row["session_title"],
+        "message_id": row["id"],
+        "role": getattr(row["role"], "value", row["role"]),
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+        "content": row["content"],
+        "sources": row["sources"] or [],
+    }
+
+
+class ExportFormatter:
+    """Turns batches of export rows into text chunks; keeps the little state markdown needs."""
+
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        self.fmt = fmt
+        self._session_id = None
+
+    def header(self) -> str:
+        if self.fmt == "csv":
+            return self._csv([CSV_COLUMNS])
+        if self.fmt == "markdown":
+            return "# VitaAI chat export\n"
+        return ""
+
+    def batch(self, rows) -> str:
+        records = [_record(row) for row in rows]
+        if self.fmt == "ndjson":
+            return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        if self.fmt == "csv":
+            return self._csv(
+                [[r[c] if c != "sources" else json.dumps(r[c], ensure_ascii=False) for c in CSV_COLUMNS]
+                 for r in records]
+            )
+        return "".join(self._markdown(r) for r in records)
+
+    def _markdown(self, r: dict) -> str:
+        parts = []
+        if r["session_id"] != self._session_id:
+            self._session_id = r["session_id"]
+            parts.append(f"\n## {r['session_title']} (session {r['session_id']})\n")
+        stamp = f" · {r['created_at']}" if r["created_at"] else ""
+        parts.append(f"\n**{r['role'].capitalize()}**{stamp}\n\n{r['content']}\n")
+        if r["sources"]:
+            parts.append("\nSources:\n")
+            parts.extend(
+                f"- {s.get('source')} ({s.get('type', 'Private')}, {similarity_label(s.get('score'))})\n"
+                for s in r["sources"]
+            )
+        return "".join(parts)
+
+    @staticmethod
+    def _csv(rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
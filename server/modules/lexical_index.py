@@ -0,0 +1,270 @@
+import fcntl
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from logger import logger
+
+# Keeps dotted/hyphenated medical tokens whole ("e11.9", "co-amoxiclav", "500mg")
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its of on or "
+    "that the their there these this to was were what when which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms; compound tokens are also indexed by their parts ("e11.9" -> e11.9, e11, 9)."""
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(p for p in re.split(r"[.\-/]", token) if p and p not in STOPWORDS)
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index for one namespace.
+
+    Postings map term -> {doc_key: term frequency}. Documents can be added and removed
+    one at a time; IDF and average length are derived from running totals, so there is
+    no rebuild step. The chunk text is kept so lexical-only hits can be returned.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.docs = {}        # doc_key -> (doc_id, text, metadata, length)
+        self.keys = {}        # doc_id -> doc_key
+        self.total_len = 0
+        self._next_key = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, doc_id: str, text: str, metadata: dict | None = None):
+        if doc_id in self.keys:
+            self.remove(doc_id)
+        terms = tokenize(text)
+        key = self._next_key
+        self._next_key += 1
+
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[key] = tf
+
+        self.docs[key] = (doc_id, text, metadata or {}, len(terms))
+        self.keys[doc_id] = key
+        self.total_len += len(terms)
+
+    def remove(self, doc_id: str) -> bool:
+        key = self.keys.pop(doc_id, None)
+        if key is None:
+            return False
+        _, text, _, length = self.docs.pop(key)
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_len -= length
+        return True
+
+    def remove_where(self, **fields) -> int:
+        """Removes every document whose metadata matches all `fields` (e.g. file_uuid=...)."""
+        doomed = [
+            doc_id for doc_id, _, meta, _ in self.docs.values()
+            if all(meta.get(k) == v for k, v in fields.items())
+        ]
+        for doc_id in doomed:
+            self.remove(doc_id)
+        return len(doomed)
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, str, dict, float]]:
+        """Top-k (doc_id, text, metadata, score), best first."""
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_len = self.total_len / n
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, tf in posting.items():
+                length = self.docs[key][3]
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_len))
+                scores[key] = scores.get(key, 0.0) + idf * norm
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.docs[key][0], self.docs[key][1], self.docs[key][2], score) for key, score in top]
+
+
+class _Log:
+    """One namespace's index plus how far into its on-disk log it has been replayed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.index = BM25Index()
+        self.offset = 0
+        self.inode = None
+        self.removed = 0
+
+
+class LexicalIndex:
+    """
+    BM25 indexes per namespace, kept in memory in every process.
+
+    Ingestion (Celery worker) and file deletion (API) append operations to a per-namespace
+    log, `<root_dir>/<namespace>.jsonl`; every process replays new log lines before a search,
+    so queries never leave the process. The log is rewritten with only the live documents
+    once removals dominate it.
+
+    At most `max_namespaces` indexes stay loaded (one per session, plus the global KB);
+    the least recently used is dropped and rebuilt from its log when it is next needed.
+    """
+
+    def __init__(self, root_dir: str, compact_min_removed: int = 5000, max_namespaces: int = 64):
+        self.root_dir = root_dir
+        self.compact_min_removed = compact_min_removed
+        self.max_namespaces = max_namespaces
+        self._logs = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _log(self, namespace: str) -> _Log:
+        if not namespace or not re.fullmatch(r"[A-Za-z0-9_\-]+", namespace):
+            raise ValueError(f"Invalid namespace '{namespace}'")
+        with self._lock:
+            log = self._logs.get(namespace)
+            if log is None:
+                log = _Log(os.path.join(self.root_dir, f"{namespace}.jsonl"))
+                self._logs[namespace] = log
+                # A caller still holding an evicted log finishes with it; the next call reloads
+                while len(self._logs) > self.max_namespaces:
+                    self._logs.popitem(last=False)
+            else:
+                self._logs.move_to_end(namespace)
+            return log
+
+    @contextmanager
+    def _file_lock(self, log: _Log, exclusive: bool):
+        with open(log.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self, log: _Log):
+        """Replays log lines appended since the last call. Caller holds log.lock and a file lock."""
+        try:
+            st = os.stat(log.path)
+        except FileNotFoundError:
+            log.reset()
+            return
+        if st.st_ino != log.inode or st.st_size < log.offset:
+            log.reset()
+            log.inode = st.st_ino
+        if st.st_size == log.offset:
+            return
+
+        with open(log.path, "rb") as f:
+            f.seek(log.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                log.offset += len(line)
+                self._apply(log, json.loads(line))
+
+    def _apply(self, log: _Log, op: dict):
+        if op["op"] == "add":
+            log.index.add(op["id"], op["text"], op.get("metadata"))
+        elif op["op"] == "remove":
+            removed = sum(log.index.remove(i) for i in op.get("ids", []))
+            if op.get("where"):
+                removed += log.index.remove_where(**op["where"])
+            log.removed += removed
+
+    def _append(self, namespace: str, ops: list[dict]):
+        log = self._log(namespace)
+        with log.lock, self._file_lock(log, exclusive=True):
+            self._refresh(log)
+            with open(log.path, "a") as f:
+                f.write("".join(json.dumps(op) + "\n" for op in ops))
+            self._refresh(log)
+            if log.removed >= self.compact_min_removed and log.removed > len(log.index):
+                self._compact(log)
+
+    def _compact(self, log: _Log):
+        tmp = log.path + ".tmp"
+        with open(tmp, "w") as f:
+            for doc_id, text, metadata, _ in log.index.docs.values():
+                f.write(json.dumps({"op": "add", "id": doc_id, "text": text, "metadata": metadata}) + "\n")
+        os.replace(tmp, log.path)
+        logger.info(f"Compacted lexical index log {log.path} to {len(log.index)} documents")
+        log.reset()
+        self._refresh(log)
+
+    # --- Public API ---
+
+    def add(self, namespace: str, docs):
+        """Indexes LangChain Documents (uses doc.id, page_content and source/file_uuid metadata)."""
+        ops = [
+            {
+                "op": "add",
+                "id": doc.id,
+                "text": doc.page_content,
+                "metadata": {k: doc.metadata[k] for k in ("source", "file_uuid") if k in doc.metadata},
+            }
+            for doc in docs
+        ]
+        if ops:
+            self._append(namespace, ops)
+
+    def delete(self, namespace: str, ids: list[str] | None = None, file_uuid: str | None = None):
+        op = {"op": "remove", "ids": ids or []}
+        if file_uuid:
+            op["where"] = {"file_uuid": file_uuid}
+        self._append(namespace, [op])
+
+    def search(self, namespace: str, query: str, k: int = 10):
+        log = self._log(namespace)
+        with log.lock:
+            if self._changed(log):
+                with self._file_lock(log, exclusive=False):
+                    self._refresh(log)
+            return log.index.search(query, k)
+
+    def _changed(self, log: _Log) -> bool:
+        try:
+            st = os.stat(log.path)
+        except FileNotFoundError:
+            return log.inode is not None
+        return (st.st_ino, st.st_size) != (log.inode, log.offset)
+
+
+def reciprocal_rank_fusion(ranked_lists: list[list[str]], k: int = 60) -> dict[str, float]:
+    """RRF: score(d) = sum over lists of 1 / (k + rank). Returns id -> fused score."""
+    fused = {}
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return fused
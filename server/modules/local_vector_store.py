@@ -0,0 +1,477 @@
+import fcntl
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+import numpy as np
+from modules.vector_store import VectorStore, to_document
+from modules.ann_index import ANN_INDEXES
+from logger import logger
+
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.jsonl"
+TOMBSTONES_FILE = "tombstones.log"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+# Rows scored per matrix multiply; bounds memory on large namespaces
+QUERY_BLOCK_ROWS = 65536
+
+
+def matches_filter(metadata: dict, flt: dict | None) -> bool:
+    """Pinecone-style metadata filter: equality, $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte, $and/$or."""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, c) for c in cond):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, arg in cond.items():
+            if op == "$eq" and value != arg:
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+                if op == "$lt" and not value < arg:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+    return True
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _Namespace:
+    """In-memory view of one namespace directory, refreshed incrementally from disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.dim = None
+        self.generation = None
+        self.ids = []
+        self.metadata = []
+        self.rows = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.vectors = None
+        self.meta_offset = 0
+        self.tomb_offset = 0
+        self.stamp = None
+        self.ann = None
+        self.ann_saved_size = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dead(self) -> int:
+        return self.count - int(self.alive.sum())
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Local, dependency-free vector backend (numpy + memory-mapped files).
+
+    Per namespace directory:
+    - vectors.f32     float32 rows (L2-normalized, so dot product == cosine), memory-mapped for reads
+    - meta.jsonl      one {"id", "metadata"} line per row (text in metadata["text"])
+    - tombstones.log  deleted/replaced row numbers
+    - manifest.json   {"dim", "generation"}; generation changes on compaction
+
+    Writes are append-only; compaction rewrites the live rows once the dead fraction
+    passes `compact_threshold`. A file lock makes it safe to share between the
+    API workers and the Celery worker.
+
+    Namespaces listed in `ann_namespaces` get an approximate index ("ivf" or "hnsw",
+    see modules/ann_index.py) once they hold `ann_min_rows` live rows. The writer
+    trains it and checkpoints it to disk; every process loads the checkpoint and
+    inserts rows appended since then itself.
+    """
+
+    def __init__(self, root_dir: str, compact_threshold: float = 0.3, compact_min_rows: int = 1000,
+                 ann: str | None = None, ann_namespaces=(), ann_min_rows: int = 20000,
+                 ann_options: dict | None = None, ann_save_every: int = 5000):
+        if ann and ann not in ANN_INDEXES:
+            raise ValueError(f"Unknown ANN index '{ann}' (expected one of {', '.join(ANN_INDEXES)})")
+        self.root_dir = root_dir
+        self.compact_threshold = compact_threshold
+        self.compact_min_rows = compact_min_rows
+        self.ann_cls = ANN_INDEXES[ann] if ann else None
+        self.ann_namespaces = set(ann_namespaces)
+        self.ann_min_rows = ann_min_rows
+        self.ann_options = ann_options or {}
+        self.ann_save_every = ann_save_every
+        self._namespaces = {}
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    # --- Files & locking ---
+
+    def _ns(self, namespace: str) -> _Namespace:
+        if not namespace or not re.fullmatch(r"[A-Za-z0-9_\-]+", namespace):
+            raise ValueError(f"Invalid namespace '{namespace}'")
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None:
+                ns = _Namespace(os.path.join(self.root_dir, namespace))
+                self._namespaces[namespace] = ns
+            return ns
+
+    @contextmanager
+    def _file_lock(self, ns: _Namespace, exclusive: bool):
+        os.makedirs(ns.path, exist_ok=True)
+        with open(os.path.join(ns.path, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file(self, ns: _Namespace, name: str) -> str:
+        return os.path.join(ns.path, name)
+
+    def _read_manifest(self, ns: _Namespace) -> dict:
+        try:
+            with open(self._file(ns, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_manifest(self, ns: _Namespace, manifest: dict):
+        tmp = self._file(ns, MANIFEST_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._file(ns, MANIFEST_FILE))
+
+    def _stamp(self, ns: _Namespace):
+        stamp = []
+        for name in (MANIFEST_FILE, META_FILE, TOMBSTONES_FILE):
+            try:
+                st = os.stat(self._file(ns, name))
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    # --- Loading ---
+
+    def _refresh(self, ns: _Namespace, locked: bool = False):
+        """
+        Loads whatever other writers appended since the last refresh. Caller holds ns.lock.
+        Pass locked=True when the exclusive file lock is already held (flock isn't re-entrant
+        across file descriptors, so taking the shared lock again would deadlock).
+        """
+        if locked:
+            self._reload(ns)
+            return
+        if self._stamp(ns) == ns.stamp:
+            return
+        with self._file_lock(ns, exclusive=False):
+            self._reload(ns)
+
+    # --- Writes ---
+
+    def upsert(self, vectors: list[dict], namespace: str):
+        if not vectors:
+            return
+        ns = self._ns(namespace)
+        # Last write wins for IDs repeated within one batch
+        vectors = list({v["id"]: v for v in vectors}.values())
+        matrix = normalize_rows(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+
+        with ns.lock, self._file_lock(ns, exclusive=True):
+            self._refresh(ns, locked=True)
+            if ns.dim is None:
+                ns.dim = matrix.shape[1]
+                ns.generation = 0
+                self._write_manifest(ns, {"dim": ns.dim, "generation": 0})
+            elif matrix.shape[1] != ns.dim:
+                raise ValueError(f"Vector dim {matrix.shape[1]} != namespace dim {ns.dim}")
+
+            replaced = [ns.rows[v["id"]] for v in vectors if v["id"] in ns.rows]
+
+            # Vectors first, then metadata: readers size the memmap from the metadata row count
+            with open(self._file(ns, VECTORS_FILE), "ab") as f:
+                f.write(matrix.tobytes())
+            with open(self._file(ns, META_FILE), "a") as f:
+                for v in vectors:
+                    f.write(json.dumps({"id": v["id"], "metadata": v.get("metadata") or {}}) + "\n")
+            if replaced:
+                self._append_tombstones(ns, replaced)
+
+            self._refresh(ns, locked=True)
+            if ns.ann is not None and replaced:
+                ns.ann.remove(replaced)
+            self._maybe_compact(ns)
+            self._checkpoint_ann(ns)
+
+    def delete(self, namespace: str, filter: dict | None = None, ids: list[str] | None = None):
+        ns = self._ns(namespace)
+        with ns.lock, self._file_lock(ns, exclusive=True):
+            self._refresh(ns, locked=True)
+            rows = set()
+            if ids:
+                rows.update(ns.rows[i] for i in ids if i in ns.rows)
+            if filter:
+                rows.update(row for row in ns.rows.values() if matches_filter(ns.metadata[row], filter))
+            if not rows:
+                return 0
+
+            self._append_tombstones(ns, sorted(rows))
+            self._refresh(ns, locked=True)
+            if ns.ann is not None:
+                ns.ann.remove(rows)
+            self._maybe_compact(ns)
+            self._checkpoint_ann(ns)
+            logger.info(f"Deleted {len(rows)} vectors from local namespace '{namespace}'")
+            return len(rows)
+
+    def _append_tombstones(self, ns: _Namespace, rows: list[int]):
+        with open(self._file(ns, TOMBSTONES_FILE), "a") as f:
+            f.write("".join(f"{r}\n" for r in rows))
+
+    def _reload(self, ns: _Namespace):
+        manifest = self._read_manifest(ns)
+        if manifest.get("generation") != ns.generation:
+            ns.reset()
+        self._load_appended(ns, manifest)
+
+    def _load_appended(self, ns: _Namespace, manifest: dict):
+        ns.generation = manifest.get("generation")
+        ns.dim = manifest.get("dim")
+
+        meta_path = self._file(ns, META_FILE)
+        added = 0
+        if os.path.exists(meta_path):
+            with open(meta_path, "rb") as f:
+                f.seek(ns.meta_offset)
+                for line in f:
+                    record = json.loads(line)
+                    ns.rows[record["id"]] = len(ns.ids)
+                    ns.ids.append(record["id"])
+                    ns.metadata.append(record["metadata"])
+                    added += 1
+                ns.meta_offset = f.tell()
+        if added:
+            ns.alive = np.concatenate([ns.alive, np.ones(added, dtype=bool)])
+
+        tomb_path = self._file(ns, TOMBSTONES_FILE)
+        if os.path.exists(tomb_path):
+            with open(tomb_path, "rb") as f:
+                f.seek(ns.tomb_offset)
+                for line in f:
+                    row = int(line)
+                    ns.alive[row] = False
+                    if ns.rows.get(ns.ids[row]) == row:
+                        del ns.rows[ns.ids[row]]
+                ns.tomb_offset = f.tell()
+
+        if ns.count and ns.dim:
+            ns.vectors = np.memmap(
+                self._file(ns, VECTORS_FILE), dtype=np.float32, mode="r", shape=(ns.count, ns.dim)
+            )
+        else:
+            ns.vectors = None
+        ns.stamp = self._stamp(ns)
+        self._sync_ann(ns)
+
+    # --- ANN index ---
+
+    def _sync_ann(self, ns: _Namespace):
+        """Loads the persisted index (or drops a stale one) and inserts rows it hasn't seen."""
+        if not self.ann_cls or os.path.basename(ns.path) not in self.ann_namespaces or ns.vectors is None:
+            return
+        if ns.ann is not None and ns.ann.generation != ns.generation:
+            ns.ann = None
+        if ns.ann is None:
+            try:
+                ann = self.ann_cls.load(ns.path, **self.ann_options)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable ANN index in {ns.path}: {e}")
+                ann = None
+            if ann is not None and ann.generation == ns.generation and ann.size <= ns.count:
+                ns.ann = ann
+                ns.ann_saved_size = ann.size
+        if ns.ann is not None:
+            ns.ann.extend(ns.vectors, ns.count)
+
+    def _checkpoint_ann(self, ns: _Namespace):
+        """Writer side (exclusive lock held): trains or retrains when due, then persists."""
+        if not self.ann_cls or os.path.basename(ns.path) not in self.ann_namespaces or ns.vectors is None:
+            return
+        live = int(ns.alive.sum())
+        if live < self.ann_min_rows:
+            return
+        if ns.ann is None or ns.ann.needs_retrain(live):
+            self._train_ann(ns)
+        elif ns.ann.size - ns.ann_saved_size >= self.ann_save_every:
+            ns.ann.save(ns.path)
+            ns.ann_saved_size = ns.ann.size
+
+    def _train_ann(self, ns: _Namespace):
+        ns.ann = self.ann_cls.train(
+            ns.vectors, np.flatnonzero(ns.alive), generation=ns.generation, **self.ann_options
+        )
+        ns.ann.extend(ns.vectors, ns.count)
+        ns.ann.save(ns.path)
+        ns.ann_saved_size = ns.ann.size
+
+    def build_ann(self, namespace: str):
+        """Trains and persists the ANN index for a namespace now, regardless of its size."""
+        ns = self._ns(namespace)
+        with ns.lock, self._file_lock(ns, exclusive=True):
+            self._refresh(ns, locked=True)
+            if self.ann_cls and ns.vectors is not None and ns.rows:
+                self._train_ann(ns)
+
+    # --- Compaction ---
+
+    def _maybe_compact(self, ns: _Namespace):
+        if ns.dead >= self.compact_min_rows and ns.dead / max(ns.count, 1) >= self.compact_threshold:
+            self._compact_locked(ns)
+
+    def compact(self, namespace: str):
+        """Rewrites a namespace keeping only live rows."""
+        ns = self._ns(namespace)
+        with ns.lock, self._file_lock(ns, exclusive=True):
+            self._refresh(ns, locked=True)
+            self._compact_locked(ns)
+
+    def _compact_locked(self, ns: _Namespace):
+        live = np.flatnonzero(ns.alive)
+        ann = ns.ann
+        logger.info(f"Compacting '{os.path.basename(ns.path)}': keeping {len(live)} of {ns.count} rows")
+
+        vec_tmp = self._file(ns, VECTORS_FILE + ".tmp")
+        meta_tmp = self._file(ns, META_FILE + ".tmp")
+        with open(vec_tmp, "wb") as f:
+            for start in range(0, len(live), QUERY_BLOCK_ROWS):
+                f.write(np.asarray(ns.vectors[live[start:start + QUERY_BLOCK_ROWS]]).tobytes())
+        with open(meta_tmp, "w") as f:
+            for row in live:
+                f.write(json.dumps({"id": ns.ids[row], "metadata": ns.metadata[row]}) + "\n")
+
+        # Open memmaps keep the old inodes alive, so concurrent readers aren't disturbed
+        os.replace(vec_tmp, self._file(ns, VECTORS_FILE))
+        os.replace(meta_tmp, self._file(ns, META_FILE))
+        open(self._file(ns, TOMBSTONES_FILE), "w").close()
+        self._write_manifest(ns, {"dim": ns.dim, "generation": (ns.generation or 0) + 1})
+
+        # Carry the index over to the new row numbering instead of retraining;
+        # the refresh below picks the saved copy up
+        if ann is not None:
+            try:
+                ann.remap(live, generation=(ns.generation or 0) + 1)
+                ann.save(ns.path)
+            except NotImplementedError:
+                pass
+
+        ns.reset()
+        self._refresh(ns, locked=True)
+        if ns.ann is None:
+            self._checkpoint_ann(ns)
+
+    # --- Reads ---
+
+    def fetch(self, ids: list[str], namespace: str) -> dict[str, list[float]]:
+        ns = self._ns(namespace)
+        with ns.lock:
+            self._refresh(ns)
+            return {i: ns.vectors[ns.rows[i]].tolist() for i in ids if i in ns.rows}
+
+    def live_mask(self, ns: _Namespace, filter: dict | None) -> np.ndarray:
+        if not filter:
+            return ns.alive
+        mask = np.zeros(ns.count, dtype=bool)
+        for row in ns.rows.values():
+            mask[row] = matches_filter(ns.metadata[row], filter)
+        return mask
+
+    def query(self, vectors, k, namespace, filter=None):
+        ns = self._ns(namespace)
+        with ns.lock:
+            self._refresh(ns)
+            if ns.vectors is None or not ns.rows:
+                return [[] for _ in vectors]
+            matrix, ids, metadata, ann = ns.vectors, ns.ids, ns.metadata, ns.ann
+            mask = self.live_mask(ns, filter).copy()
+
+        queries = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        rows = None
+        if ann is not None:
+            try:
+                rows, scores = ann.search(matrix, queries, k, mask)
+            except Exception as e:
+                logger.warning(f"ANN search failed on '{namespace}', using exact search: {e}")
+                rows = None
+            # A selective filter can leave the probed lists short of k matches
+            if rows is not None and filter and any(len(r) < k for r in rows):
+                rows = None
+        if rows is None:
+            rows, scores = exact_top_k(matrix, queries, k, mask)
+        return [
+            [(to_document(ids[r], metadata[r]), float(s)) for r, s in zip(row_ids, row_scores)]
+            for row_ids, row_scores in zip(rows, scores)
+        ]
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int, mask: np.ndarray):
+    """
+    Brute-force top-k by dot product, scored in row blocks.
+    Returns (rows, scores) per query, best first; masked-out rows never appear.
+    """
+    m = queries.shape[0]
+    best_scores = np.full((m, 0), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((m, 0), dtype=np.int64)
+
+    for start in range(0, matrix.shape[0], QUERY_BLOCK_ROWS):
+        block_mask = mask[start:start + QUERY_BLOCK_ROWS]
+        if not block_mask.any():
+            continue
+        block = np.asarray(matrix[start:start + QUERY_BLOCK_ROWS])
+        scores = queries @ block.T
+        scores[:, ~block_mask] = -np.inf
+
+        kk = min(k, scores.shape[1])
+        idx = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        best_scores = np.concatenate([best_scores, np.take_along_axis(scores, idx, axis=1)], axis=1)
+        best_rows = np.concatenate([best_rows, idx + start], axis=1)
+
+    order = np.argsort(-best_scores, axis=1)[:, :k]
+    top_scores = np.take_along_axis(best_scores, order, axis=1)
+    top_rows = np.take_along_axis(best_rows, order, axis=1)
+
+    results_rows, results_scores = [], []
+    for rows, scores in zip(top_rows, top_scores):
+        keep = np.isfinite(scores)
+        results_rows.append(rows[keep].tolist())
+        results_scores.append(scores[keep].tolist())
+    return results_rows, results_scores
@@ -0,0 +1,69 @@
+import asyncio
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from modules.context_builder import estimate_tokens, trim_to_sentences
+from models.message import MessageRole
+from logger import logger
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and MediBot, a medical assistant.
+Keep facts the user shared about themselves (symptoms, conditions, medications, doses) and the questions
+already answered. At most {max_words} words, plain prose.
+
+Current summary: {summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+def format_turns(messages) -> str:
+    return "\n".join(
+        f"{'User' if m.role == MessageRole.USER else 'Assistant'}: {m.content.strip()}" for m in messages
+    )
+
+
+def fit_recent(messages, max_tokens: int) -> list:
+    """Newest messages whose combined size fits in `max_tokens`, oldest first."""
+    kept, used = [], 0
+    for m in reversed(messages):
+        tokens = estimate_tokens(m.content)
+        if used + tokens > max_tokens:
+            break
+        kept.append(m)
+        used += tokens
+    return list(reversed(kept))
+
+
+def build_history(summary: str | None, recent_messages, max_tokens: int) -> str:
+    """Prompt text for the conversation so far: rolling summary + the latest turns, within max_tokens."""
+    parts = []
+    remaining = max_tokens
+    if summary:
+        # The summary may use up to a third of the budget; the latest turns get the rest
+        summary = trim_to_sentences(summary, max_tokens // 3) or summary[: max_tokens // 3 * 4]
+        parts.append(f"Summary of earlier conversation: {summary}")
+        remaining -= estimate_tokens(parts[0])
+    recent = fit_recent(recent_messages, remaining)
+    if recent:
+        parts.append(format_turns(recent))
+    return "\n".join(parts) if parts else "(none)"
+
+
+async def update_summary(llm, summary: str | None, messages, max_words: int = 150,
+                         timeout: float = 30.0) -> str | None:
+    """Folds `messages` into the rolling summary; None if the LLM call fails."""
+    chain = ChatPromptTemplate.from_template(SUMMARY_PROMPT) | llm | StrOutputParser()
+    try:
+        result = await asyncio.wait_for(
+            chain.ainvoke({
+                "summary": summary or "(none yet)",
+                "messages": format_turns(messages),
+                "max_words": max_words,
+            }),
+            timeout=timeout
+        )
+        return result.strip() or None
+    except Exception as e:
+        logger.warning(f"Conversation summary update failed: {e}")
+        return None
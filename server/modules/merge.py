@@ -0,0 +1,110 @@
+import re
+from langchain_core.documents import Document
+from modules.retrieval import chunk_id
+
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Word n-grams, used for near-duplicate detection and MMR similarity."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def containment(a: set, b: set) -> float:
+    """Share of the smaller set found in the larger one (1.0 = one text contains the other)."""
+    return len(a & b) / min(len(a), len(b)) if a and b else 0.0
+
+
+def normalize_scores(docs: list[tuple[Document, float]]) -> list[tuple[Document, float]]:
+    """
+    Min-max scales scores within each source_type so namespaces compete on equal terms.
+    A namespace with a single distinct score keeps its raw score (clamped to [0, 1]),
+    so one weak hit isn't promoted to 1.0. The raw score is kept in metadata["raw_score"].
+    """
+    by_source = {}
+    for doc, score in docs:
+        by_source.setdefault(doc.metadata.get("source_type"), []).append(score)
+
+    out = []
+    for doc, score in docs:
+        scores = by_source[doc.metadata.get("source_type")]
+        low, high = min(scores), max(scores)
+        doc.metadata["raw_score"] = score
+        norm = (score - low) / (high - low) if high > low else min(max(score, 0.0), 1.0)
+        out.append((doc, norm))
+    return out
+
+
+def remove_duplicates(docs: list[tuple[Document, float]], threshold: float = 0.8):
+    """Drops repeated chunk IDs and chunks whose text is mostly contained in a better-scored one."""
+    kept, kept_ids, kept_shingles = [], set(), []
+    for doc, score in sorted(docs, key=lambda x: x[1], reverse=True):
+        cid = chunk_id(doc)
+        if cid in kept_ids:
+            continue
+        sh = shingles(doc.page_content)
+        if any(containment(sh, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append((doc, score))
+        kept_ids.add(cid)
+        kept_shingles.append(sh)
+    return kept
+
+
+def mmr(docs: list[tuple[Document, float]], k: int, lambda_: float = 0.7):
+    """
+    Maximal marginal relevance: greedily picks the chunk maximising
+    lambda * relevance - (1 - lambda) * (max similarity to chunks already picked).
+    Similarity is word-shingle Jaccard, so no vectors need to be fetched.
+    """
+    pool = [(doc, score, shingles(doc.page_content)) for doc, score in docs]
+    picked = []
+    while pool and len(picked) < k:
+        best = max(
+            range(len(pool)),
+            key=lambda i: lambda_ * pool[i][1] - (1 - lambda_) * max(
+                (jaccard(pool[i][2], p[2]) for p in picked), default=0.0
+            )
+        )
+        picked.append(pool.pop(best))
+    return [(doc, score) for doc, score, _ in picked]
+
+
+def strip_overlap(previous: str, text: str, min_chars: int = 30, max_chars: int = 400) -> str:
+    """Removes the start of `text` that repeats the end of `previous` (the splitter's chunk_overlap)."""
+    for size in range(min(max_chars, len(previous), len(text)), min_chars - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:].lstrip()
+    return text
+
+
+def strip_overlaps(docs: list[tuple[Document, float]]) -> list[tuple[Document, float]]:
+    """Trims text shared between picked chunks that were adjacent in the same file."""
+    out = []
+    for i, (doc, score) in enumerate(docs):
+        text = doc.page_content
+        for other, _ in docs[:i]:
+            if other.metadata.get("source") == doc.metadata.get("source"):
+                text = strip_overlap(other.page_content, text)
+        if text != doc.page_content:
+            doc = Document(page_content=text, metadata=doc.metadata, id=doc.id)
+        out.append((doc, score))
+    return out
+
+
+def merge_results(docs: list[tuple[Document, float]], k: int = 4, lambda_: float = 0.7,
+                  duplicate_threshold: float = 0.8) -> list[tuple[Document, float]]:
+    """
+    Merges (Document, score) results from several namespaces into the final context set:
+    per-namespace score normalization -> near-duplicate removal -> MMR down to k ->
+    trimming of overlap between neighbouring chunks. Best first.
+    """
+    docs = remove_duplicates(normalize_scores(docs), duplicate_threshold)
+    return strip_overlaps(mmr(docs, k, lambda_))
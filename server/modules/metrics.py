@@ -0,0 +1,115 @@
+"""
+Stage latency histograms (auth, DB, embedding, namespace queries, context build,
+time-to-first-token, generation, total answer time, ingestion) exported in Prometheus
+format at /metrics.
+
+- One histogram labelled by stage; label children (stage and HTTP) are cached, so
+  recording a sample is a dict lookup plus a bucket increment (see benchmarks/bench_metrics.py).
+- Optional OpenTelemetry spans around the same `timed` blocks (opentelemetry-api
+  must be installed; exporters are configured through the OTel SDK / env vars).
+- API workers and Celery workers are separate processes: point them all at one
+  PROMETHEUS_MULTIPROC_DIR and /metrics aggregates every process.
+"""
+import os
+from time import perf_counter
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from logger import logger
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "vitaai_stage_seconds", "Time spent in one stage of a request or ingestion run", ["stage"], buckets=BUCKETS
+)
+STAGE_ERRORS = Counter("vitaai_stage_errors_total", "Stages that ended with an exception", ["stage"])
+HTTP_REQUESTS = Counter("vitaai_http_requests_total", "HTTP requests", ["method", "route", "status"])
+HTTP_SECONDS = Histogram(
+    "vitaai_http_request_seconds", "Time until the response starts (streams continue after this)",
+    ["method", "route"], buckets=BUCKETS
+)
+
+_enabled = True
+_tracer = None
+_stage_children = {}
+_request_children = {}
+
+
+def configure(enabled: bool = True, tracing: bool = False):
+    global _enabled, _tracer
+    _enabled = enabled
+    _tracer = None
+    if enabled and tracing:
+        try:
+            from opentelemetry import trace
+            _tracer = trace.get_tracer("vitaai")
+        except ImportError:
+            logger.warning("OTEL_ENABLED is set but opentelemetry-api is not installed; spans are off")
+
+
+def _stage(stage: str):
+    child = _stage_children.get(stage)
+    if child is None:
+        child = _stage_children[stage] = STAGE_SECONDS.labels(stage)
+    return child
+
+
+def observe(stage: str, seconds: float):
+    """Records a duration measured by the caller (e.g. time-to-first-token inside a stream)."""
+    if _enabled:
+        _stage(stage).observe(seconds)
+
+
+class timed:
+    """
+    `with timed("embed_query"):` records the block's duration, counts exceptions,
+    and wraps it in an OpenTelemetry span when tracing is on.
+    Don't wrap a `yield` of an async generator: the span would be detached in another context.
+    """
+    __slots__ = ("stage", "start", "span")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.span = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self.span = _tracer.start_as_current_span(self.stage)
+            self.span.__enter__()
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _enabled:
+            elapsed = perf_counter() - self.start
+            child = _stage_children.get(self.stage)
+            if child is None:
+                child = _stage(self.stage)
+            child.observe(elapsed)
+            if exc_type is not None:
+                STAGE_ERRORS.labels(self.stage).inc()
+        if self.span is not None:
+            self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    if _enabled:
+        key = (method, route, status)
+        children = _request_children.get(key)
+        if children is None:
+            children = _request_children[key] = (
+                HTTP_REQUESTS.labels(method, route, str(status)), HTTP_SECONDS.labels(method, route)
+            )
+        children[0].inc()
+        children[1].observe(seconds)
+
+
+def render() -> tuple[bytes, str]:
+    """(body, content type) for the /metrics endpoint."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,21 +1,95 @@
 import os
-import shutil
+import re
+import asyncio
+import uuid
+from pathlib import Path
 from fastapi import UploadFile
 from logger import logger
 
 UPLOAD_DIR = "./uploaded_docs"
+CHUNK_SIZE = 1024 * 1024  # 1 MB per read/write
 
-def save_uploaded_files(files: list[UploadFile]) -> list[str]:
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}/[^/\\]+$")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def safe_filename(filename: str) -> str:
+    """Strips any directory parts from a user-supplied filename."""
+    name = Path(filename or "").name.strip()
+    return name or "upload"
+
+
+def new_upload_path(filename: str) -> str:
+    """Unique per-upload directory, so concurrent uploads with the same name never collide."""
+    upload_dir = os.path.join(UPLOAD_DIR, uuid.uuid4().hex)
+    os.makedirs(upload_dir, exist_ok=True)
+    return os.path.join(upload_dir, safe_filename(filename))
+
+
+def upload_id_for(path: str) -> str:
+    return os.path.relpath(path, UPLOAD_DIR).replace(os.sep, "/")
+
+
+def path_for_upload_id(upload_id: str) -> str | None:
+    """Resolves an upload_id returned by save_upload_stream; None if it's invalid or missing."""
+    if not _UPLOAD_ID.match(upload_id or ""):
+        return None
+    path = os.path.join(UPLOAD_DIR, *upload_id.split("/"))
+    return path if os.path.isfile(path) else None
+
+
+def remove_upload(path: str):
+    try:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+async def save_upload_stream(chunks, filename: str, max_bytes: int) -> str:
+    """
+    Writes an async stream of byte chunks to a unique path without buffering the whole file.
+    Writes run in a worker thread in bounded chunks; the size limit is enforced as data arrives.
+    """
+    path = new_upload_path(filename)
+    written = 0
+    buffer = bytearray()
+    logger.info(f"Streaming upload to: {path}")
+
+    try:
+        with open(path, "wb") as f:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"{filename} exceeds the {max_bytes // (1024 * 1024)} MB limit")
+                buffer.extend(chunk)
+                if len(buffer) >= CHUNK_SIZE:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+    except Exception:
+        remove_upload(path)
+        raise
+    return path
+
+
+async def _read_chunks(file: UploadFile):
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def save_uploaded_files(files: list[UploadFile], max_bytes: int) -> list[str]:
     file_paths = []
     for file in files:
-        temp_path = os.path.join(UPLOAD_DIR, file.filename)
-        logger.info(f"Saving file: {temp_path}")
         try:
-            with open(temp_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            file_paths.append(temp_path)
+            file_paths.append(await save_upload_stream(_read_chunks(file), file.filename, max_bytes))
         except Exception as e:
             logger.error(f"Failed to save file {file.filename}: {str(e)}")
+            for path in file_paths:
+                remove_upload(path)
             raise
-    return file_paths
\ No newline at end of file
+    return file_paths
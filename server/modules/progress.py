@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from logger import logger
+
+# Share of the progress bar given to each stage
+STAGE_WEIGHTS = {"pages": 0.2, "embedded": 0.5, "upserted": 0.3}
+
+
+def progress_channel(task_id: str) -> str:
+    return f"ingest_progress:{task_id}"
+
+
+def progress_state_key(task_id: str) -> str:
+    return f"ingest_progress_state:{task_id}"
+
+
+class ProgressTracker:
+    """
+    Collects ingestion counters and pushes them over Redis pub/sub.
+
+    The latest snapshot is also stored under progress_state_key(), so a client that
+    subscribes late still gets the current state. Publishing is throttled to
+    `min_interval` seconds; safe to call from the pipeline's worker threads.
+    """
+
+    def __init__(self, redis_client, task_id: str, min_interval: float = 0.25, ttl: int = 3600):
+        self.redis = redis_client
+        self.task_id = task_id
+        self.min_interval = min_interval
+        self.ttl = ttl
+        self.started_at = time.monotonic()
+        self._last_publish = 0.0
+        self._lock = threading.Lock()
+        self.state = {
+            "task_id": task_id,
+            "status": "STARTED",
+            "stage": "parse",
+            "files_total": 0,
+            "files_done": 0,
+            "pages_total": 0,
+            "pages_parsed": 0,
+            "chunks_total": 0,
+            "chunks_embedded": 0,
+            "chunks_upserted": 0,
+            "progress": 0.0,
+            "eta_seconds": None,
+        }
+
+    def _fraction(self) -> float:
+        s = self.state
+        parts = {
+            "pages": s["pages_parsed"] / s["pages_total"] if s["pages_total"] else 0.0,
+            "embedded": s["chunks_embedded"] / s["chunks_total"] if s["chunks_total"] else 0.0,
+            "upserted": s["chunks_upserted"] / s["chunks_total"] if s["chunks_total"] else 0.0,
+        }
+        return min(1.0, sum(STAGE_WEIGHTS[k] * v for k, v in parts.items()))
+
+    def _publish(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.min_interval:
+            return
+        self._last_publish = now
+
+        fraction = 1.0 if self.state["status"] == "SUCCESS" else self._fraction()
+        elapsed = now - self.started_at
+        self.state["progress"] = round(fraction, 4)
+        self.state["eta_seconds"] = round(elapsed / fraction * (1 - fraction), 1) if 0.05 < fraction < 1 else None
+
+        payload = json.dumps(self.state)
+        try:
+            self.redis.setex(progress_state_key(self.task_id), self.ttl, payload)
+            self.redis.publish(progress_channel(self.task_id), payload)
+        except Exception as e:
+            logger.warning(f"Progress publish failed for task {self.task_id}: {e}")
+
+    def add(self, stage: str | None = None, **deltas):
+        """Increments counters, e.g. add(pages_parsed=8) or add(stage="embed", chunks_total=120)."""
+        with self._lock:
+            if stage:
+                self.state["stage"] = stage
+            for key, value in deltas.items():
+                self.state[key] += value
+            self._publish(force=bool(stage))
+
+    def finish(self, status: str = "SUCCESS", error: str | None = None):
+        with self._lock:
+            self.state["status"] = status
+            self.state["stage"] = "done"
+            if error:
+                self.state["error"] = error
+            self._publish(force=True)
@@ -0,0 +1,99 @@
+from dataclasses import dataclass, field
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from config import (
+    embed_model, llm, lexical_index, GLOBAL_KB_NAMESPACE, RRF_K, RETRIEVAL_TIMEOUT_SECONDS,
+    RETRIEVAL_K_PRIVATE, RETRIEVAL_K_GLOBAL, RETRIEVAL_TOP_K, MMR_LAMBDA, DUPLICATE_THRESHOLD,
+    CONTEXT_TOKEN_BUDGET
+)
+from modules.retrieval import HybridRetriever, chunk_id
+from modules.merge import merge_results
+from modules.context_builder import build_context, estimate_tokens
+from modules.metrics import timed
+
+# Shared by the streaming /ask route and the batch task, so both answer the same way
+SYSTEM_PROMPT = """You are MediBot. Answer based ONLY on the context.
+            Use the conversation so far only to understand what the question refers to.
+            Conversation so far: {history}
+            Context: {context}
+            Question: {question}"""
+
+NO_HISTORY = "(none)"
+
+
+@dataclass
+class PreparedContext:
+    docs: list                      # (Document, score) sent to the LLM, best first
+    text: str
+    sources: list = field(default_factory=list)
+    chunk_ids: list = field(default_factory=list)
+    usage: dict = field(default_factory=dict)
+
+
+def make_retriever(vectorstore) -> HybridRetriever:
+    return HybridRetriever(
+        vectorstore, embed_model, timeout=RETRIEVAL_TIMEOUT_SECONDS, lexical=lexical_index, rrf_k=RRF_K
+    )
+
+
+def retrieval_plan(session_namespace: str | None):
+    """({namespace: source_type}, {namespace: k}) searched for a question; global only without a session."""
+    namespaces = {GLOBAL_KB_NAMESPACE: "Global"}
+    k = {GLOBAL_KB_NAMESPACE: RETRIEVAL_K_GLOBAL}
+    if session_namespace:
+        namespaces = {session_namespace: "Private", **namespaces}
+        k[session_namespace] = RETRIEVAL_K_PRIVATE
+    return namespaces, k
+
+
+def source_metadata(docs) -> list[dict]:
+    """
+    One entry per source file, "Private"/"Global" type, in merge order:
+    - score: the best vector similarity among its chunks (None if only keyword search found it)
+    - merge_score: the best chunk's merge score (normalized per namespace, so 1.0 = best there)
+    """
+    unique_sources = {}
+    for doc, score in docs:
+        src = doc.metadata.get("source", "Unknown")
+        similarity = doc.metadata.get("similarity")
+        entry = unique_sources.get(src)
+        if entry is None:
+            unique_sources[src] = {
+                "source": src,
+                "score": None if similarity is None else round(similarity, 4),
+                "merge_score": round(score, 4),
+                "type": doc.metadata.get("source_type", "Private")
+            }
+        elif similarity is not None and (entry["score"] is None or similarity > entry["score"]):
+            entry["score"] = round(similarity, 4)
+    return list(unique_sources.values())
+
+
+def prepare_context(all_docs, question: str, history_text: str = NO_HISTORY) -> PreparedContext:
+    """Merge (normalize -> dedupe -> MMR), then fill the token budget; records token counts."""
+    with timed("context_build"):
+        final_docs = merge_results(
+            all_docs, k=RETRIEVAL_TOP_K, lambda_=MMR_LAMBDA, duplicate_threshold=DUPLICATE_THRESHOLD
+        )
+        context = build_context(final_docs, CONTEXT_TOKEN_BUDGET)
+    history_tokens = estimate_tokens(history_text)
+    return PreparedContext(
+        docs=context.docs,
+        text=context.text,
+        sources=source_metadata(context.docs),
+        chunk_ids=[chunk_id(d) for d, _ in context.docs],
+        usage={
+            "context_tokens": context.tokens,
+            "history_tokens": history_tokens,
+            "prompt_tokens": (
+                estimate_tokens(SYSTEM_PROMPT) + context.tokens + history_tokens + estimate_tokens(question)
+            ),
+            "chunks": len(context.docs),
+            "chunks_dropped": context.dropped,
+            "chunks_trimmed": context.trimmed,
+        },
+    )
+
+
+def answer_chain():
+    return ChatPromptTemplate.from_template(SYSTEM_PROMPT) | llm | StrOutputParser()
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import time
+from langchain_core.documents import Document
+from logger import logger
+from modules.lexical_index import reciprocal_rank_fusion
+from modules.metrics import timed, observe
+
+
+def chunk_id(doc) -> str:
+    """Stable ID for a retrieved chunk; falls back to a content hash when the store returns none."""
+    doc_id = getattr(doc, "id", None)
+    if doc_id:
+        return doc_id
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:16]
+
+
+def tag_similarity(docs):
+    """Keeps the vector store's score in metadata["similarity"]; fusion and merging rescale the score."""
+    for doc, score in docs:
+        doc.metadata["similarity"] = score
+    return docs
+
+
+class HybridRetriever:
+    """
+    Retrieves context for a question from several namespaces at once.
+
+    - The question is embedded ONCE and the vector is reused for every namespace.
+    - Namespace queries run concurrently in worker threads, so the event loop stays free.
+    - Each namespace has its own timeout; a slow namespace just contributes no results.
+    - With a `lexical` BM25 index, each namespace's vector and keyword rankings are fused
+      with reciprocal rank fusion, scaled so a chunk ranked first by both scores 1.0.
+    - Vector hits keep their similarity in metadata["similarity"]; keyword-only hits have none.
+    """
+
+    def __init__(self, vectorstore, embedder, timeout: float = 5.0, lexical=None, rrf_k: int = 60):
+        self.vectorstore = vectorstore
+        self.embedder = embedder
+        self.timeout = timeout
+        self.lexical = lexical
+        self.rrf_k = rrf_k
+
+    async def embed(self, question: str) -> list[float]:
+        with timed("embed_query"):
+            return await asyncio.to_thread(self.embedder.embed_query, question)
+
+    async def search_namespace(self, vector: list[float], namespace: str, k: int = 3):
+        try:
+            return tag_similarity(await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.vectorstore.similarity_search_by_vector_with_score,
+                    vector, k=k, namespace=namespace
+                ),
+                timeout=self.timeout
+            ))
+        except asyncio.TimeoutError:
+            logger.warning(f"Retrieval from namespace '{namespace}' timed out after {self.timeout}s")
+        except Exception as e:
+            logger.error(f"Retrieval from namespace '{namespace}' failed: {e}")
+        return []
+
+    async def search_lexical(self, question: str, namespace: str, k: int = 3):
+        try:
+            hits = await asyncio.to_thread(self.lexical.search, namespace, question, k)
+        except Exception as e:
+            logger.error(f"Lexical search in namespace '{namespace}' failed: {e}")
+            return []
+        return [
+            (Document(page_content=text, metadata=dict(metadata), id=doc_id), score)
+            for doc_id, text, metadata, score in hits
+        ]
+
+    def fuse(self, vector_docs, lexical_docs, k: int):
+        """RRF over the two rankings of one namespace; returns the top k (Document, fused score)."""
+        by_id = {}
+        for doc, _ in lexical_docs + vector_docs:
+            by_id[chunk_id(doc)] = doc  # prefer the vector store's copy of a chunk
+        fused = reciprocal_rank_fusion(
+            [[chunk_id(d) for d, _ in vector_docs], [chunk_id(d) for d, _ in lexical_docs]], k=self.rrf_k
+        )
+        best = 2.0 / (self.rrf_k + 1)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(by_id[doc_id], score / best) for doc_id, score in ranked]
+
+    async def search_hybrid(self, question: str, vector: list[float], namespace: str, k: int = 3,
+                            scope: str = "other"):
+        # One timing per namespace, labelled by `scope` (private/global; namespace names are per
+        # session). Vector and BM25 queries run concurrently, so this is the namespace's latency.
+        with timed(f"namespace_query_{scope}"):
+            if self.lexical is None:
+                return await self.search_namespace(vector, namespace, k)
+            vector_docs, lexical_docs = await asyncio.gather(
+                self.search_namespace(vector, namespace, k),
+                self.search_lexical(question, namespace, k)
+            )
+            return self.fuse(vector_docs, lexical_docs, k)
+
+    async def retrieve(self, question: str, namespaces: dict[str, str], k: int | dict = 3, vector=None):
+        """
+        Searches every namespace concurrently.
+
+        `namespaces` maps a namespace to the source type it is tagged with
+        (e.g. {"session_1": "Private", "global_kb": "Global"}).
+        `k` is either one count for every namespace or a {namespace: k} dict.
+        Pass `vector` to reuse an embedding the caller already computed.
+        Returns a list of (Document, score) tuples from all namespaces.
+        """
+        if vector is None:
+            vector = await self.embed(question)
+        results = await asyncio.gather(
+            *[
+                self.search_hybrid(question, vector, ns, k[ns] if isinstance(k, dict) else k, source_type.lower())
+                for ns, source_type in namespaces.items()
+            ]
+        )
+
+        all_docs = []
+        for (namespace, source_type), docs in zip(namespaces.items(), results):
+            for doc, _ in docs:
+                doc.metadata["source_type"] = source_type
+            all_docs.extend(docs)
+        return all_docs
+
+    async def retrieve_many(self, questions: list[str], vectors: list[list[float]],
+                            namespaces: dict[str, str], k: int | dict = 3, query_batch: int = 256):
+        """
+        Batch form of retrieve(): one batched vector query per namespace (VectorStore.query)
+        instead of one round trip per question. Returns one (Document, score) list per question.
+        """
+        results = [[] for _ in questions]
+        for namespace, source_type in namespaces.items():
+            ns_k = k[namespace] if isinstance(k, dict) else k
+            stage = f"namespace_query_{source_type.lower()}"
+            for start in range(0, len(vectors), query_batch):
+                batch = range(start, min(start + query_batch, len(vectors)))
+                started = time.perf_counter()
+                try:
+                    vector_hits = await asyncio.to_thread(
+                        self.vectorstore.query, vectors[start:start + query_batch], ns_k, namespace
+                    )
+                except Exception as e:
+                    logger.error(f"Batched retrieval from namespace '{namespace}' failed: {e}")
+                    vector_hits = [[] for _ in batch]
+
+                for i, docs in zip(batch, vector_hits):
+                    tag_similarity(docs)
+                    if self.lexical is not None:
+                        lexical_docs = await self.search_lexical(questions[i], namespace, ns_k)
+                        docs = self.fuse(docs, lexical_docs, ns_k)
+                    for doc, _ in docs:
+                        doc.metadata["source_type"] = source_type
+                    results[i].extend(docs)
+                # Same stage as search_hybrid: each question is charged its share of the batch
+                per_question = (time.perf_counter() - started) / len(batch)
+                for _ in batch:
+                    observe(stage, per_question)
+        return results
@@ -0,0 +1,62 @@
+"""
+Framing for the /ask answer stream: Server-Sent Events, one JSON payload per event.
+
+    event: token    data: {"text": "..."}        answer text, in order
+    event: sources  data: [{"source", "score", "merge_score", "type"}, ...]
+    event: usage    data: {"prompt_tokens", "completion_tokens", ..., "cached"}
+    event: error    data: {"message": "..."}
+    event: done     data: {}                     always last (unless the connection drops)
+
+Token text is JSON-encoded, so no token can be mistaken for a frame boundary.
+"""
+import json
+
+TOKEN = "token"
+SOURCES = "sources"
+USAGE = "usage"
+ERROR = "error"
+DONE = "done"
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SSEDecoder:
+    """
+    Incremental parser: feed() arbitrary text pieces, get back complete (event, data) pairs.
+    Only newly received text is scanned, so each piece costs time proportional to its size.
+    client/utils/stream.py has a copy for the Streamlit client; tests/test_stream_events.py pins both.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[tuple[str, object]]:
+        # A boundary may straddle two pieces, so resume the search one char back
+        start = max(0, len(self._buffer) - 1)
+        buffer = self._buffer + text
+        events, pos = [], 0
+        while True:
+            end = buffer.find("\n\n", start)
+            if end == -1:
+                break
+            parsed = self._parse(buffer[pos:end])
+            if parsed:
+                events.append(parsed)
+            pos = start = end + 2
+        self._buffer = buffer[pos:]
+        return events
+
+    @staticmethod
+    def _parse(frame: str):
+        event, data = "message", []
+        for line in frame.split("\n"):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data.append(line[len("data:"):].lstrip())
+            # Lines starting with ":" are comments (keepalives)
+        if not data:
+            return None
+        return event, json.loads("\n".join(data))
@@ -0,0 +1,45 @@
+import asyncio
+import re
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from logger import logger
+
+# Strong references so fire-and-forget tasks aren't garbage collected mid-flight
+_background_tasks = set()
+
+_FILLER_WORDS = {
+    "a", "an", "the", "is", "are", "was", "what", "whats", "how", "can", "could", "do", "does",
+    "i", "me", "my", "you", "please", "tell", "about", "of", "to", "for", "and", "or", "in", "on",
+}
+
+
+def heuristic_title(question: str, max_words: int = 5) -> str:
+    """Cheap, instant title: first few meaningful words of the question."""
+    words = re.findall(r"[A-Za-z0-9][A-Za-z0-9'\-]*", question)
+    keywords = [w for w in words if w.lower() not in _FILLER_WORDS] or words
+    if not keywords:
+        return "New Chat"
+    return " ".join(w if w.isupper() else w.capitalize() for w in keywords[:max_words])
+
+
+async def generate_title(llm, question: str, timeout: float = 15.0) -> str:
+    """Asks the LLM for a short title; falls back to the heuristic on error or timeout."""
+    title_prompt = ChatPromptTemplate.from_template(
+        "Summarize this question into a short 3-5 word title: {question}"
+    )
+    title_chain = title_prompt | llm | StrOutputParser()
+    try:
+        title = await asyncio.wait_for(title_chain.ainvoke({"question": question}), timeout=timeout)
+        title = title.strip().strip('"').strip()
+        return title or heuristic_title(question)
+    except Exception as e:
+        logger.warning(f"LLM title generation failed, using heuristic title: {e}")
+        return heuristic_title(question)
+
+
+def run_in_background(coro):
+    """Schedules a coroutine on the running loop without awaiting it."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
@@ -0,0 +1,85 @@
+from langchain_core.documents import Document
+from logger import logger
+
+
+class VectorStore:
+    """
+    Backend-agnostic vector store used by retrieval, ingestion and file deletion.
+
+    Records are dicts: {"id": str, "values": list[float], "metadata": dict}.
+    The chunk text lives in metadata["text"] (same layout langchain-pinecone uses).
+    """
+
+    def upsert(self, vectors: list[dict], namespace: str):
+        raise NotImplementedError
+
+    def fetch(self, ids: list[str], namespace: str) -> dict[str, list[float]]:
+        raise NotImplementedError
+
+    def delete(self, namespace: str, filter: dict | None = None, ids: list[str] | None = None):
+        raise NotImplementedError
+
+    def query(self, vectors: list[list[float]], k: int, namespace: str,
+              filter: dict | None = None) -> list[list[tuple[Document, float]]]:
+        """Batched top-k: one result list per query vector."""
+        raise NotImplementedError
+
+    def similarity_search_by_vector_with_score(self, embedding: list[float], k: int = 4,
+                                               namespace: str | None = None, filter: dict | None = None):
+        return self.query([embedding], k, namespace, filter)[0]
+
+
+def to_document(record_id: str, metadata: dict) -> Document:
+    metadata = dict(metadata or {})
+    text = metadata.pop("text", "")
+    return Document(page_content=text, metadata=metadata, id=record_id)
+
+
+class PineconeVectorBackend(VectorStore):
+    """Pinecone index behind the VectorStore interface. The index client is created lazily, once."""
+
+    def __init__(self, pc, index_name: str):
+        self.pc = pc
+        self.index_name = index_name
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self.pc.Index(self.index_name)
+        return self._index
+
+    def upsert(self, vectors: list[dict], namespace: str):
+        self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def fetch(self, ids: list[str], namespace: str) -> dict[str, list[float]]:
+        fetched = self.index.fetch(ids=ids, namespace=namespace).vectors
+        return {vid: list(v.values) for vid, v in fetched.items()}
+
+    def delete(self, namespace: str, filter: dict | None = None, ids: list[str] | None = None):
+        if ids:
+            self.index.delete(ids=ids, namespace=namespace)
+        if filter:
+            self.index.delete(filter=filter, namespace=namespace)
+
+    def query(self, vectors, k, namespace, filter=None):
+        results = []
+        for vector in vectors:
+            resp = self.index.query(
+                vector=list(vector), top_k=k, namespace=namespace,
+                filter=filter, include_metadata=True
+            )
+            results.append([(to_document(m.id, m.metadata), m.score) for m in resp.matches])
+        return results
+
+
+def create_vector_store(backend: str, pc=None, index_name: str | None = None, local_dir: str | None = None,
+                        local_options: dict | None = None):
+    """Builds the configured backend ("pinecone" or "local"); local_options go to LocalVectorStore."""
+    if backend == "local":
+        from modules.local_vector_store import LocalVectorStore
+        logger.info(f"Using local vector store at {local_dir}")
+        return LocalVectorStore(local_dir, **(local_options or {}))
+    if backend == "pinecone":
+        return PineconeVectorBackend(pc, index_name)
+    raise ValueError(f"Unknown VECTOR_BACKEND '{backend}' (expected 'pinecone' or 'local')")
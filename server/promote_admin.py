@@ -1,4 +1,5 @@
 from database import SessionLocal
+from config import user_cache
 from models.user import User, UserRole
 import models.chat
 import models.message
@@ -15,6 +16,8 @@ try:
     if user:
         user.role = UserRole.ADMIN
         db.commit()
+        # Drop cached copies so API workers see the new role right away
+        user_cache.invalidate(TARGET_EMAIL)
         print(f"✅ Success! {TARGET_EMAIL} is now an ADMIN.")
         print("Everything you upload now goes to the Global Knowledge Base.")
     else:
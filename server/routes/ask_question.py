@@ -1,109 +1,206 @@
-import json
+import time
+import asyncio
+import anyio
+from contextlib import aclosing
 from fastapi import APIRouter, Form, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from langchain_pinecone import PineconeVectorStore
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from logger import logger
-from config import pc, embed_model, PINECONE_INDEX_NAME, llm, PINECONE_API_KEY, GLOBAL_KB_NAMESPACE
-from sqlalchemy.orm import Session
-from database import get_db
-import crud.message as message_crud
-import crud.chat as chat_crud
+from config import (
+    vector_store, llm, GLOBAL_KB_NAMESPACE, ANSWER_CACHE_ENABLED, answer_cache,
+    MEMORY_TURNS, MEMORY_MAX_TOKENS, MEMORY_SUMMARY_TRIGGER_TOKENS, MEMORY_SUMMARY_MAX_WORDS
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, AsyncSessionLocal
+import crud.aio.message as message_crud
+import crud.aio.chat as chat_crud
 from schemas.message import MessageCreate
 from models.message import MessageRole
 from utils.auth_deps import get_current_user
 from models.user import User
+from modules.rag import make_retriever, retrieval_plan, prepare_context, answer_chain
+from modules.context_builder import estimate_tokens
+from modules.titles import heuristic_title, generate_title, run_in_background
+from modules.memory import build_history, update_summary
+from modules.metrics import timed, observe
+import modules.stream_events as events
+from modules.stream_events import sse_event
 
 router = APIRouter(prefix="/ask", tags=["ask"])
 
+# Sessions with a summary update in flight in this process
+_summarizing = set()
 
-async def stream_generator(question, session_id, db, user, vectorstore, session_namespace):
-    # 1. Save User Message
-    message_crud.create_message(
-        db, MessageCreate(content=question, role=MessageRole.USER), user.id, session_id
-    )
-
-    # 2. Auto-Title Check
-    msgs = message_crud.get_messages_by_session(db, session_id, user.id)
-    if len(msgs) <= 2:
-        try:
-            title_prompt = ChatPromptTemplate.from_template(
-                "Summarize this question into a short 3-5 word title: {question}"
+
+async def auto_title_session(session_id, user_id, question):
+    """
+    Background job with its own DB session.
+    Sets an instant heuristic title, then replaces it with the LLM title once ready.
+    The new title shows up on the next GET /chat/sessions.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            await chat_crud.update_session_title(db, session_id, heuristic_title(question), user_id)
+            title = await generate_title(llm, question)
+            await chat_crud.update_session_title(db, session_id, title, user_id)
+    except Exception as e:
+        logger.error(f"Auto-title failed for session {session_id}: {e}")
+
+
+async def summarize_session(session_id, user_id):
+    """
+    Background job: folds messages older than the verbatim window into ChatSession.summary
+    once they add up to MEMORY_SUMMARY_TRIGGER_TOKENS, so the prompt stays bounded.
+    """
+    if session_id in _summarizing:
+        return
+    _summarizing.add(session_id)
+    try:
+        async with AsyncSessionLocal() as db:
+            session = await chat_crud.get_session(db, session_id, user_id)
+            window = await message_crud.get_recent_messages(db, session_id, user_id, limit=2 * MEMORY_TURNS)
+            if not session or not window:
+                return
+            pending = await message_crud.get_recent_messages(
+                db, session_id, user_id, limit=200,
+                after_id=session.summary_message_id, before_id=window[0].id
             )
-            title_chain = title_prompt | llm | StrOutputParser()
-            new_title = title_chain.invoke({"question": question}).strip('"')
-            chat_crud.update_session_title(db, session_id, new_title, user.id)
-        except Exception:
-            pass
+            if sum(estimate_tokens(m.content) for m in pending) < MEMORY_SUMMARY_TRIGGER_TOKENS:
+                return
+
+            summary = await update_summary(llm, session.summary, pending, max_words=MEMORY_SUMMARY_MAX_WORDS)
+            if summary:
+                await chat_crud.update_session_summary(db, session_id, user_id, summary, pending[-1].id)
+                logger.info(f"Folded {len(pending)} messages into the summary of session {session_id}")
+    except Exception as e:
+        logger.error(f"Summary update failed for session {session_id}: {e}")
+    finally:
+        _summarizing.discard(session_id)
+
+
+async def stream_generator(question, session_id, user, vectorstore, session_namespace):
+    # The stream outlives the request's dependencies, so it owns its DB session
+    async with AsyncSessionLocal() as db:
+        async with aclosing(answer_stream(question, session_id, db, user, vectorstore, session_namespace)) as stream:
+            async for event, data in stream:
+                yield sse_event(event, data)
+
+
+async def answer_stream(question, session_id, db, user, vectorstore, session_namespace):
+    """Yields (event, data) pairs; see modules/stream_events.py for the event types."""
+    # Stage timings go to /metrics; no `timed` block may span a `yield` (see modules/metrics.py)
+    started = time.perf_counter()
+
+    # 1. Save User Message
+    with timed("db_write_message"):
+        user_message = await message_crud.create_message(
+            db, MessageCreate(content=question, role=MessageRole.USER), user.id, session_id
+        )
+
+    # 2. Conversation memory: rolling summary + the last few turns (never the whole history)
+    with timed("db_read_history"):
+        session = await chat_crud.get_session(db, session_id, user.id)
+        recent = await message_crud.get_recent_messages(
+            db, session_id, user.id, limit=2 * MEMORY_TURNS + 1,
+            after_id=session.summary_message_id if session else None
+        )
+    previous = [m for m in recent if m.id != user_message.id]
+    history_text = build_history(session.summary if session else None, previous, MEMORY_MAX_TOKENS)
+
+    # Auto-Title Check (runs in the background, off the answer path)
+    if not previous and not (session and session.summary):
+        run_in_background(auto_title_session(session_id, user.id, question))
 
     full_response = ""
+    parts = []  # streamed answer chunks, joined once at the end
     source_metadata = []
+    usage = {}
 
     try:
         # 3. HYBRID RETRIEVAL (Session + Global)
-
-        # A. Search Private Session
-        docs_session = vectorstore.similarity_search_with_score(
-            question, k=3, namespace=session_namespace
-        )
-        # Tag them as Private
-        for doc, _ in docs_session:
-            doc.metadata["source_type"] = "Private"
-
-        # B. Search Global Knowledge Base
-        docs_global = vectorstore.similarity_search_with_score(
-            question, k=3, namespace=GLOBAL_KB_NAMESPACE
+        # One embedding, both namespaces queried concurrently (vector + BM25 per namespace)
+        retriever = make_retriever(vectorstore)
+        question_vector = await retriever.embed(question)
+        namespaces, k = retrieval_plan(session_namespace)
+        all_docs = await retriever.retrieve(question, namespaces, k=k, vector=question_vector)
+
+        # Merge (normalize, dedupe, MMR) and fill the context token budget
+        prepared = prepare_context(all_docs, question, history_text)
+        final_docs = prepared.docs
+        source_metadata = prepared.sources
+        usage = prepared.usage
+
+        # 4. Semantic Answer Cache
+        # Only answers built purely from the Global KB are shared between users, and only
+        # for a session's first question (follow-ups depend on the conversation)
+        chunk_ids = prepared.chunk_ids
+        cacheable = ANSWER_CACHE_ENABLED and not previous and bool(final_docs) and all(
+            d.metadata.get("source_type") == "Global" for d, _ in final_docs
         )
-        # Tag them as Global
-        for doc, _ in docs_global:
-            doc.metadata["source_type"] = "Global"
-
-        # C. Combine & Sort
-        all_docs = docs_session + docs_global
-        all_docs.sort(key=lambda x: x[1], reverse=True)
-        final_docs = all_docs[:4]
-
-        # Prepare Context
-        context_text = "\n\n".join([d.page_content for d, _ in final_docs])
-
-        # Prepare Metadata (Including the new "type" field)
-        unique_sources = {}
-        for doc, score in final_docs:
-            src = doc.metadata.get("source", "Unknown")
-            if src not in unique_sources:
-                unique_sources[src] = {
-                    "source": src,
-                    "score": round(score, 4),
-                    "type": doc.metadata.get("source_type", "Private")  # <--- Sending this to UI
-                }
-        source_metadata = list(unique_sources.values())
-
-        # 4. Generate Answer
-        system_prompt = """You are MediBot. Answer based ONLY on the context.
-        Context: {context}
-        Question: {question}"""
-
-        prompt = ChatPromptTemplate.from_template(system_prompt)
-        chain = prompt | llm | StrOutputParser()
-
-        async for chunk in chain.astream({"context": context_text, "question": question}):
-            full_response += chunk
-            yield chunk
-
-        # 5. Append Sources
-        if source_metadata:
-            yield f"|||SOURCES|||{json.dumps(source_metadata)}"
+        cached = None
+        if cacheable:
+            with timed("answer_cache_lookup"):
+                cached = await asyncio.to_thread(
+                    answer_cache.lookup, GLOBAL_KB_NAMESPACE, question_vector, chunk_ids
+                )
+
+        if cached:
+            logger.info(f"Answer cache hit for session {session_id}")
+            full_response = cached["answer"]
+            source_metadata = cached["sources"]
+            usage["cached"] = True
+            observe("ttft", time.perf_counter() - started)
+            yield events.TOKEN, {"text": full_response}
+        else:
+            # 5. Generate Answer
+            generation_started = time.perf_counter()
+            async for chunk in answer_chain().astream(
+                    {"context": prepared.text, "question": question, "history": history_text}
+            ):
+                if not chunk:
+                    continue
+                if not parts:
+                    observe("ttft", time.perf_counter() - started)
+                parts.append(chunk)
+                yield events.TOKEN, {"text": chunk}
+            full_response = "".join(parts)
+            observe("generation", time.perf_counter() - generation_started)
+
+            usage["completion_tokens"] = estimate_tokens(full_response)
+            usage["cached"] = False
+            logger.info(f"Token usage for session {session_id}: {usage}")
+
+            if cacheable and full_response:
+                await asyncio.to_thread(
+                    answer_cache.store, GLOBAL_KB_NAMESPACE, question_vector, chunk_ids,
+                    full_response, source_metadata
+                )
+
+        # 6. Sources and token usage, as their own events after the answer text
+        yield events.SOURCES, source_metadata
+        yield events.USAGE, usage
+        yield events.DONE, {}
 
     except Exception as e:
-        yield f"Error: {e}"
+        logger.error(f"Answer stream failed for session {session_id}: {e}")
+        yield events.ERROR, {"message": str(e)}
+        yield events.DONE, {}
 
     finally:
+        observe("ask_total", time.perf_counter() - started)
+        # A client that disconnects mid-answer still gets the partial answer saved.
+        # Starlette cancels the stream on disconnect, so the save is shielded from that cancellation
+        full_response = full_response or "".join(parts)
         if full_response:
-            message_crud.create_message(
-                db, MessageCreate(content=full_response, role=MessageRole.ASSISTANT),
-                user.id, session_id
-            )
+            with anyio.CancelScope(shield=True):
+                with timed("db_write_message"):
+                    await message_crud.create_message(
+                        db, MessageCreate(content=full_response, role=MessageRole.ASSISTANT,
+                                          sources=source_metadata or None),
+                        user.id, session_id
+                    )
+                # The verbatim window is full, so older turns may be due for summarizing
+                if len(recent) > 2 * MEMORY_TURNS:
+                    run_in_background(summarize_session(session_id, user.id))
 
 
 @router.post("/{session_id}")
@@ -111,19 +208,17 @@ async def ask_question(
         session_id: int,
         question: str = Form(...),
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    session = chat_crud.get_session(db, session_id, current_user.id)
+    session = await chat_crud.get_session(db, session_id, current_user.id)
     if not session: raise HTTPException(404, "Session not found")
 
-    vectorstore = PineconeVectorStore(
-        index_name=PINECONE_INDEX_NAME, embedding=embed_model, pinecone_api_key=PINECONE_API_KEY
-    )
-
     # Pass the private namespace. The generator will ALSO check global.
     session_namespace = f"session_{session_id}"
 
     return StreamingResponse(
-        stream_generator(question, session_id, db, current_user, vectorstore, session_namespace),
-        media_type="text/plain"
+        stream_generator(question, session_id, current_user, vector_store, session_namespace),
+        media_type="text/event-stream",
+        # Proxies (e.g. nginx) must not buffer, or tokens arrive in bursts
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
\ No newline at end of file
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 import json
 from datetime import timedelta
@@ -11,8 +12,9 @@ from models.user import User, UserRole
 from utils.security import verify_password, create_access_token, get_password_hash
 from config import ACCESS_TOKEN_EXPIRE_MINUTES, EMAIL_CONF, CELERY_BROKER_URL
 from utils.auth_deps import get_current_user
-from database import get_db
+from database import get_db, get_async_db
 import crud.user as crud
+import crud.aio.user as async_crud
 import schemas.user as schemas
 from logger import logger
 from schemas.user import VerifyRequest
@@ -24,9 +26,9 @@ router = APIRouter(prefix='/auth', tags=["Authentication"])
 
 
 @router.post("/register")
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     # 1. Check if user already exists in DB
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -133,7 +135,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),
 
     # 3. Generate Token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": user.email, "role": user.role.value},
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role.value},
                                        expires_delta=access_token_expires)
 
     logger.info(f"Successful login for user: {form_data.username}")
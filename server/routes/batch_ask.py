@@ -0,0 +1,113 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+import redis.asyncio as aioredis
+from celery.result import AsyncResult
+from sqlalchemy.ext.asyncio import AsyncSession
+from logger import logger
+from config import BATCH_MAX_QUESTIONS, BATCH_RESULTS_DIR, CELERY_BROKER_URL
+from database import get_async_db
+import crud.aio.chat as chat_crud
+from schemas.batch import BatchAskRequest
+from utils.auth_deps import get_current_user
+from models.user import User
+from modules.batch_answer import results_path
+from tasks import batch_answer_task
+
+router = APIRouter(prefix="/batch_ask", tags=["batch"])
+
+async_redis = aioredis.from_url(CELERY_BROKER_URL)
+
+OWNER_TTL_SECONDS = 7 * 24 * 3600
+RESULTS_POLL_SECONDS = 0.5
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def owner_key(task_id: str) -> str:
+    return f"batch_owner:{task_id}"
+
+
+async def require_owner(task_id: str, user: User):
+    owner = await async_redis.get(owner_key(task_id))
+    if owner is None or int(owner) != user.id:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+
+@router.post("/")
+async def start_batch(
+        req: BatchAskRequest,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Queues a batch of questions; answers are read back from GET /batch_ask/{task_id}/results."""
+    if not req.questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(req.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+
+    session_namespace = None
+    if req.session_id is not None:
+        if not await chat_crud.get_session(db, req.session_id, current_user.id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        session_namespace = f"session_{req.session_id}"
+
+    task = batch_answer_task.delay(
+        items=[q.model_dump() for q in req.questions], session_namespace=session_namespace
+    )
+    await async_redis.setex(owner_key(task.id), OWNER_TTL_SECONDS, current_user.id)
+    logger.info(f"User {current_user.id} queued batch {task.id} ({len(req.questions)} questions)")
+    return JSONResponse(status_code=202, content={"task_id": task.id, "questions": len(req.questions)})
+
+
+@router.get("/{task_id}")
+async def get_batch_status(task_id: str, current_user: User = Depends(get_current_user)):
+    await require_owner(task_id, current_user)
+    result = AsyncResult(task_id)
+    info = result.info if isinstance(result.info, dict) else {}
+    return {
+        "task_id": task_id,
+        "status": result.status,  # PENDING, STARTED, PROGRESS, SUCCESS, FAILURE
+        "done": info.get("done", 0),
+        "total": info.get("total"),
+        "error": str(result.result) if result.failed() else None,
+    }
+
+
+def _read_from(path: str, offset: int) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(READ_CHUNK_SIZE)
+    except FileNotFoundError:
+        return b""
+
+
+async def follow_results(task_id: str):
+    """Yields complete JSONL lines as the task writes them, until the task has finished."""
+    path = results_path(BATCH_RESULTS_DIR, task_id)
+    offset = 0
+    pending = b""
+    while True:
+        # Check BEFORE reading, so lines written just before completion are still sent
+        finished = AsyncResult(task_id).ready()
+        data = await asyncio.to_thread(_read_from, path, offset)
+        if data:
+            offset += len(data)
+            pending += data
+            complete, _, pending = pending.rpartition(b"\n")
+            if complete:
+                yield complete + b"\n"
+            continue
+        if finished:
+            return
+        await asyncio.sleep(RESULTS_POLL_SECONDS)
+
+
+@router.get("/{task_id}/results")
+async def stream_batch_results(task_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Streams results as JSON lines: {"id", "question", "answer", "sources", "usage", "error", "latency_ms"}.
+    Lines arrive in completion order while the batch is running; the stream ends when it is done.
+    """
+    await require_owner(task_id, current_user)
+    return StreamingResponse(follow_results(task_id), media_type="application/x-ndjson")
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
 
-from database import get_db
-import crud.chat as chat_crud
-import crud.message as message_crud
+from database import get_async_db, AsyncSessionLocal
+import crud.aio.chat as chat_crud
+import crud.aio.message as message_crud
 import schemas.chat as chat_schemas
 import schemas.message as message_schemas
-from utils.auth_deps import get_current_user
+from utils.auth_deps import get_current_user, get_token_principal
 from models.user import User
+from utils.http_cache import make_etag, not_modified, set_etag
+from config import MESSAGES_PAGE_DEFAULT, MESSAGES_PAGE_MAX, EXPORT_BATCH_SIZE
+from modules.chat_export import ExportFormatter, FORMATS
 
 router = APIRouter(prefix="/chat", tags=["Chat Sessions"])
 
@@ -16,29 +20,38 @@ router = APIRouter(prefix="/chat", tags=["Chat Sessions"])
 # --- Session Management ---
 
 @router.post("/sessions", response_model=chat_schemas.ChatSession)
-def create_new_session(
+async def create_new_session(
         session_data: chat_schemas.ChatSessionCreate,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    return chat_crud.create_session(db, session_data, current_user.id)
+    return await chat_crud.create_session(db, session_data, current_user.id)
 
 
 @router.get("/sessions", response_model=List[chat_schemas.ChatSession])
-def get_my_sessions(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+async def get_my_sessions(
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_token_principal),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    return chat_crud.get_user_sessions(db, current_user.id)
+    """Sends an ETag; a client that already has this list gets 304 Not Modified."""
+    sessions = await chat_crud.get_user_sessions(db, current_user.id)
+    etag = make_etag(*[(s.id, s.title, s.updated_at, s.last_message_at, s.message_count) for s in sessions])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    return sessions
 
 
 @router.delete("/sessions/{session_id}")
-def delete_session(
+async def delete_session(
         session_id: int,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    success = chat_crud.delete_session(db, session_id, current_user.id)
+    success = await chat_crud.delete_session(db, session_id, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"message": "Session deleted"}
@@ -47,14 +60,65 @@ def delete_session(
 # --- Message History for a Session ---
 
 @router.get("/sessions/{session_id}/messages", response_model=List[message_schemas.MessageDisplay])
-def get_session_history(
+async def get_session_history(
         session_id: int,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        request: Request,
+        response: Response,
+        before_id: int | None = Query(None, description="Return messages older than this message id"),
+        limit: int = Query(MESSAGES_PAGE_DEFAULT, ge=1, le=MESSAGES_PAGE_MAX),
+        current_user: User = Depends(get_token_principal),
+        db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    The latest `limit` messages (older than `before_id` if given), oldest first.
+    Page backwards with before_id = the first id of the previous page; a short page is the last one.
+    """
     # Check if session exists and belongs to user
-    session = chat_crud.get_session(db, session_id, current_user.id)
+    session = await chat_crud.get_session(db, session_id, current_user.id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    return message_crud.get_messages_by_session(db, session_id, current_user.id)
\ No newline at end of file
+    # Revalidation costs one aggregate query; the page is only loaded when the history changed
+    version = await message_crud.get_messages_version(db, session_id, current_user.id)
+    etag = make_etag(session_id, before_id, limit, *version)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    return await message_crud.get_messages_page(db, session_id, current_user.id, limit=limit, before_id=before_id)
+
+
+# --- Export ---
+
+async def export_stream(user_id: int, session_id: int | None, fmt: str):
+    # The stream outlives the request's dependencies, so it owns its DB session
+    formatter = ExportFormatter(fmt)
+    header = formatter.header()
+    if header:
+        yield header
+    async with AsyncSessionLocal() as db:
+        async for batch in message_crud.iter_export_batches(db, user_id, session_id, EXPORT_BATCH_SIZE):
+            yield formatter.batch(batch)
+
+
+@router.get("/export")
+async def export_chats(
+        fmt: Literal["ndjson", "markdown", "csv"] = Query("ndjson", alias="format"),
+        session_id: int | None = Query(None, description="Export only this session (default: all sessions)"),
+        current_user: User = Depends(get_token_principal),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Streams one or all of the user's sessions, with the sources of each answer.
+    Rows come from a server-side cursor a batch at a time, so memory use doesn't grow with the history.
+    """
+    if session_id is not None and not await chat_crud.get_session(db, session_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    media_type, extension = FORMATS[fmt]
+    filename = f"vitaai_session_{session_id}.{extension}" if session_id is not None else f"vitaai_chats.{extension}"
+    return StreamingResponse(
+        export_stream(current_user.id, session_id, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from models.user import User, UserRole
 from models.file import UploadedFile
 from models.chat import ChatSession
-from utils.auth_deps import get_current_user
-from config import pc, PINECONE_INDEX_NAME, GLOBAL_KB_NAMESPACE
+import crud.chat as chat_crud
+from utils.auth_deps import get_current_user, get_token_principal
+from config import vector_store, lexical_index, GLOBAL_KB_NAMESPACE, answer_cache
 from logger import logger
+from utils.http_cache import make_etag, not_modified, set_etag
 
 router = APIRouter(prefix="/chat", tags=["files"])
 
 
 @router.get("/sessions/{session_id}/files")
-def get_session_files(session_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return db.query(UploadedFile).filter(UploadedFile.session_id == session_id).all()
+def get_session_files(session_id: int, request: Request, response: Response,
+                      db: Session = Depends(get_db), user: User = Depends(get_token_principal)):
+    # Check the session belongs to the user before anything (the ETag included) is computed
+    if not chat_crud.get_session(db, session_id, user.id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    files = db.query(UploadedFile).filter(UploadedFile.session_id == session_id).all()
+    etag = make_etag(session_id, *[(f.id, f.filename) for f in files])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    return files
 
 
 @router.delete("/sessions/{session_id}/files/{file_id}")
@@ -34,17 +47,28 @@ def delete_file(session_id: int, file_id: int, db: Session = Depends(get_db), us
     if session.user.role == UserRole.ADMIN:
         namespace = GLOBAL_KB_NAMESPACE
 
-    # 3. Delete Vectors from Pinecone
-    try:
-        index = pc.Index(PINECONE_INDEX_NAME)
-        index.delete(
-            filter={"file_uuid": file_record.pinecone_id_prefix},
-            namespace=namespace
-        )
-        logger.info(f"Deleted vectors for {file_record.filename} from {namespace}")
-
-    except Exception as e:
-        logger.error(f"Pinecone delete error: {e}")
+    # 3. Delete Vectors from the vector store
+    # Identical re-uploads share vectors, so only delete when no other record uses them
+    shared = db.query(UploadedFile).filter(
+        UploadedFile.id != file_record.id,
+        UploadedFile.pinecone_id_prefix == file_record.pinecone_id_prefix,
+        UploadedFile.namespace == namespace
+    ).first()
+
+    if shared:
+        logger.info(f"Vectors for {file_record.filename} are shared; keeping them")
+    else:
+        try:
+            vector_store.delete(namespace, filter={"file_uuid": file_record.pinecone_id_prefix})
+            logger.info(f"Deleted vectors for {file_record.filename} from {namespace}")
+            if lexical_index is not None:
+                lexical_index.delete(namespace, file_uuid=file_record.pinecone_id_prefix)
+
+            if namespace == GLOBAL_KB_NAMESPACE:
+                answer_cache.bump_version(namespace)
+
+        except Exception as e:
+            logger.error(f"Vector delete error: {e}")
 
     # 4. Delete from DB
     db.delete(file_record)
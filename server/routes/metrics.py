@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from modules.metrics import render
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (stage latency histograms, HTTP request counts)."""
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
 from logger import logger
 from typing import List
-from modules.pdf_handlers import save_uploaded_files
+from modules.pdf_handlers import (
+    save_uploaded_files, save_upload_stream, upload_id_for, path_for_upload_id, UploadTooLarge
+)
+from schemas.upload import ProcessUploadsRequest
+from config import MAX_UPLOAD_MB, CELERY_BROKER_URL
+from database import get_async_db
+import crud.aio.chat as chat_crud
+from modules.progress import progress_channel, progress_state_key
 from utils.auth_deps import get_current_user
 from models.user import User
 from tasks import process_documents_task
@@ -10,33 +20,90 @@ from celery.result import AsyncResult  # <--- Import this
 
 router = APIRouter(prefix="/upload_files", tags=["upload"])
 
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+
+# Async Redis client for progress pub/sub (never blocks the event loop)
+async_redis = aioredis.from_url(CELERY_BROKER_URL)
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+async def require_session(db: AsyncSession, session_id: int, user: User):
+    # Ingestion writes into the session's private namespace, so only its owner may start it
+    if not await chat_crud.get_session(db, session_id, user.id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+def start_processing(file_paths: list[str], session_id: int):
+    # Start the task
+    task = process_documents_task.delay(file_paths=file_paths, session_id=session_id)
+
+    # Return the Task ID so the frontend can track it
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Processing started.",
+            "task_id": task.id  # <--- sending this back
+        }
+    )
+
 
 @router.post("/")
 async def upload_files(
         files: List[UploadFile] = File(...),
         session_id: int = Form(...),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
+    await require_session(db, session_id, current_user)
     try:
-        file_paths = save_uploaded_files(files)
-
-        # Start the task
-        task = process_documents_task.delay(file_paths=file_paths, session_id=session_id)
-
-        # Return the Task ID so the frontend can track it
-        return JSONResponse(
-            status_code=202,
-            content={
-                "message": "Processing started.",
-                "task_id": task.id  # <--- sending this back
-            }
-        )
+        file_paths = await save_uploaded_files(files, MAX_UPLOAD_BYTES)
+        return start_processing(file_paths, session_id)
 
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
     except Exception as e:
         logger.exception(f"Error during file upload: {str(e)}")
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+@router.put("/stream")
+async def upload_file_stream(
+        request: Request,
+        filename: str = Query(...),
+        current_user: User = Depends(get_current_user)
+):
+    """
+    Streaming upload of ONE file as the raw request body (no multipart buffering).
+    Returns an upload_id; pass the IDs to POST /upload_files/process to ingest them.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES:
+        return JSONResponse(status_code=413, content={"error": f"{filename} exceeds the {MAX_UPLOAD_MB} MB limit"})
+
+    try:
+        path = await save_upload_stream(request.stream(), filename, MAX_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    return {"upload_id": upload_id_for(path)}
+
+
+@router.post("/process")
+async def process_uploads(
+        req: ProcessUploadsRequest,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    await require_session(db, req.session_id, current_user)
+    file_paths = []
+    for upload_id in req.upload_ids:
+        path = path_for_upload_id(upload_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+        file_paths.append(path)
+    return start_processing(file_paths, req.session_id)
+
+
 @router.get("/status/{task_id}")
 async def get_upload_status(task_id: str):
     """
@@ -47,4 +114,43 @@ async def get_upload_status(task_id: str):
         "task_id": task_id,
         "status": task_result.status,  # PENDING, STARTED, SUCCESS, FAILURE
         "result": str(task_result.result) if task_result.ready() else None
-    }
\ No newline at end of file
+    }
+
+
+async def progress_events(task_id: str):
+    """Yields server-sent events for one ingestion task until it finishes."""
+    pubsub = async_redis.pubsub()
+    # Subscribe BEFORE reading the snapshot so no event falls in between
+    await pubsub.subscribe(progress_channel(task_id))
+    try:
+        snapshot = await async_redis.get(progress_state_key(task_id))
+        if snapshot:
+            yield f"event: progress\ndata: {snapshot.decode()}\n\n"
+            if json.loads(snapshot).get("status") in ("SUCCESS", "FAILURE"):
+                return
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=SSE_KEEPALIVE_SECONDS)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            data = message["data"].decode()
+            yield f"event: progress\ndata: {data}\n\n"
+            if json.loads(data).get("status") in ("SUCCESS", "FAILURE"):
+                return
+    finally:
+        await pubsub.unsubscribe(progress_channel(task_id))
+        await pubsub.close()
+
+
+@router.get("/progress/{task_id}")
+async def stream_upload_progress(task_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Server-sent events with fine-grained ingestion progress
+    (files done, pages parsed, chunks embedded/upserted, progress 0-1, ETA).
+    """
+    return StreamingResponse(
+        progress_events(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
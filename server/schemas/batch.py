@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class BatchQuestion(BaseModel):
+    # Caller's reference ID, echoed back in the results
+    id: Optional[str] = None
+    question: str
+
+class BatchAskRequest(BaseModel):
+    questions: List[BatchQuestion]
+    # Also search this session's private documents (must belong to the caller)
+    session_id: Optional[int] = None
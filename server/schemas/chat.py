@@ -13,6 +13,9 @@ class ChatSession(ChatSessionBase):
     user_id: int
     created_at: datetime
     updated_at: datetime
+    last_message_at: Optional[datetime] = None
+    message_count: int = 0
+    last_preview: Optional[str] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 from models.message import MessageRole
 
 class MessageBase(BaseModel):
@@ -8,7 +9,7 @@ class MessageBase(BaseModel):
 
 class MessageCreate(MessageBase):
     # We allow passing session_id explicitly if needed
-    pass
+    sources: Optional[list] = None
 
 class MessageDisplay(MessageBase):
     id: int
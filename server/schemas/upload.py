@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+from typing import List
+
+class ProcessUploadsRequest(BaseModel):
+    session_id: int
+    # IDs returned by PUT /upload_files/stream
+    upload_ids: List[str]
@@ -1,23 +1,18 @@
 # server/tasks.py
 
 import os
-from pathlib import Path
-from tqdm.auto import tqdm
-from langchain_community.document_loaders import PyPDFLoader
+import json
+import asyncio
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_pinecone import PineconeVectorStore
-from langchain_core.documents import Document
 from logger import logger
 import google.generativeai as genai
-from PIL import Image
-import io
-import uuid
-from pinecone import ServerlessSpec
 
 from celery_app import celery
 from config import (
-    pc, embed_model, PINECONE_INDEX_NAME, GOOGLE_API_KEY,
-    PINECONE_API_KEY, GLOBAL_KB_NAMESPACE
+    embed_model, vector_store, GOOGLE_API_KEY, GLOBAL_KB_NAMESPACE, answer_cache, redis_client, lexical_index,
+    INGEST_EMBED_BATCH_SIZE, INGEST_EMBED_CONCURRENCY, INGEST_UPSERT_BATCH_SIZE, INGEST_PARSE_WORKERS,
+    BATCH_RESULTS_DIR, BATCH_LLM_CONCURRENCY, BATCH_LLM_RATE_PER_MINUTE, BATCH_LLM_MAX_RETRIES,
+    BATCH_EMBED_BATCH_SIZE
 )
 
 # Import Models
@@ -28,24 +23,60 @@ import models.file
 import models.message
 from models.file import UploadedFile
 from database import SessionLocal
+from modules.ingestion import IngestionPipeline
+from modules.pdf_handlers import remove_upload
+from modules.progress import ProgressTracker
+from modules.batch_answer import BatchAnswerer, results_path
+
+
+def find_identical_file(db, namespace: str, content_hash: str):
+    """An existing upload with the same bytes in this namespace -> (file_uuid, chunk_hashes)."""
+    match = (
+        db.query(UploadedFile)
+        .filter(UploadedFile.namespace == namespace, UploadedFile.content_hash == content_hash)
+        .order_by(UploadedFile.id.desc())
+        .first()
+    )
+    return (match.pinecone_id_prefix, match.chunk_hashes) if match else None
+
+
+def previous_chunk_ids(db, namespace: str, filename: str) -> dict:
+    """Chunk hash -> vector ID for the latest earlier version of a file with this name."""
+    prev = (
+        db.query(UploadedFile)
+        .filter(
+            UploadedFile.namespace == namespace,
+            UploadedFile.filename == filename,
+            UploadedFile.chunk_hashes.isnot(None)
+        )
+        .order_by(UploadedFile.id.desc())
+        .first()
+    )
+    if not prev:
+        return {}
+    return {h: f"doc_{prev.pinecone_id_prefix}_{i}" for i, h in enumerate(prev.chunk_hashes)}
 
 
-@celery.task(name="process_documents_task")
-def process_documents_task(file_paths: list, session_id: int):
+@celery.task(name="process_documents_task", bind=True)
+def process_documents_task(self, file_paths: list, session_id: int):
     """
     Processes files.
     - ADMIN uploads go to GLOBAL_KB_NAMESPACE.
     - USER uploads go to session_{id} namespace.
+    Progress events are published over Redis (see modules/progress.py).
     """
     logger.info(f"Task started for session_id {session_id}")
 
     db = SessionLocal()
+    progress = ProgressTracker(redis_client, self.request.id)
 
     # 1. Determine Namespace based on User Role
     try:
         session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
         if not session:
             logger.error(f"Session {session_id} not found.")
+            progress.finish("FAILURE", "Session not found")
+            db.close()
             return
 
         user = session.user
@@ -58,10 +89,11 @@ def process_documents_task(file_paths: list, session_id: int):
 
     except Exception as e:
         logger.error(f"Error fetching session/user: {e}")
+        progress.finish("FAILURE", str(e))
         db.close()
         return
 
-    # 2. Process Files
+    # 2. Process Files (parse -> split -> embed -> upsert)
     try:
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000, chunk_overlap=200, length_function=len
@@ -69,62 +101,92 @@ def process_documents_task(file_paths: list, session_id: int):
         genai.configure(api_key=GOOGLE_API_KEY)
         vision_model = genai.GenerativeModel("gemini-2.5-flash")
 
-        # Create Index check (omitted for brevity, same as before)
+        pipeline = IngestionPipeline(
+            embedder=embed_model,
+            store=vector_store,
+            text_splitter=text_splitter,
+            vision_model=vision_model,
+            embed_batch_size=INGEST_EMBED_BATCH_SIZE,
+            embed_concurrency=INGEST_EMBED_CONCURRENCY,
+            upsert_batch_size=INGEST_UPSERT_BATCH_SIZE,
+            parse_workers=INGEST_PARSE_WORKERS or None,
+            progress=progress
+        )
+        results = pipeline.run(
+            file_paths, namespace,
+            find_identical=lambda content_hash: find_identical_file(db, namespace, content_hash),
+            previous_chunks=lambda filename: previous_chunk_ids(db, namespace, filename)
+        )
 
-        for file_path in file_paths:
+        # Keyword index: new chunks only (linked files reuse chunks that are already indexed)
+        if lexical_index is not None:
             try:
-                if not os.path.exists(file_path): continue
+                lexical_index.add(namespace, [c for f in results if f.ok and not f.linked for c in f.chunks])
+            except Exception as e:
+                logger.error(f"Failed to update lexical index for {namespace}: {e}")
+
+        # 3. Record all successful files in a single transaction
+        try:
+            for f in results:
+                if f.ok:
+                    db.add(UploadedFile(
+                        session_id=session_id,
+                        filename=f.filename,
+                        pinecone_id_prefix=f.file_uuid,
+                        namespace=namespace,
+                        content_hash=f.content_hash,
+                        chunk_hashes=f.chunk_hashes
+                    ))
+                    logger.info(f"Saved {f.filename} ({len(f.chunks)} chunks) to namespace {namespace}")
+                else:
+                    logger.error(f"Error processing {f.file_path}: {f.error}")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to record uploaded files: {e}")
 
-                filename = Path(file_path).name
-                file_uuid = str(uuid.uuid4())[:8]
-                pinecone_id_prefix = f"doc_{file_uuid}"
+        for file_path in file_paths:
+            remove_upload(file_path)
 
-                chunks = []
+        # Global KB changed -> cached answers built on the old content are stale
+        if namespace == GLOBAL_KB_NAMESPACE:
+            answer_cache.bump_version(namespace)
 
-                if file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    with open(file_path, "rb") as f:
-                        img_data = f.read()
-                    image = Image.open(io.BytesIO(img_data))
-                    resp = vision_model.generate_content(["Extract text and describe:", image])
-                    doc = Document(page_content=resp.text, metadata={"source": filename})
-                    chunks = text_splitter.split_documents([doc])
-                else:
-                    loader = PyPDFLoader(file_path)
-                    docs = loader.load()
-                    chunks = text_splitter.split_documents(docs)
-
-                for i, chunk in enumerate(chunks):
-                    chunk.metadata["source"] = filename
-                    chunk.metadata["file_uuid"] = file_uuid
-                    chunk.id = f"{pinecone_id_prefix}_{i}"
-
-                # Upload to determined namespace
-                vectorstore = PineconeVectorStore(
-                    index_name=PINECONE_INDEX_NAME,
-                    embedding=embed_model,
-                    pinecone_api_key=PINECONE_API_KEY,
-                    namespace=namespace
-                )
-                vectorstore.add_documents(chunks, ids=[c.id for c in chunks])
-
-                # Record in DB
-                db_file = UploadedFile(
-                    session_id=session_id,
-                    filename=filename,
-                    pinecone_id_prefix=file_uuid
-                )
-                db.add(db_file)
-                db.commit()
-
-                logger.info(f"Saved {filename} to namespace {namespace}")
-
-                try:
-                    os.remove(file_path)
-                except:
-                    pass
+        progress.finish("SUCCESS")
 
-            except Exception as e:
-                logger.error(f"Error processing {file_path}: {e}")
+    except Exception as e:
+        progress.finish("FAILURE", str(e))
+        raise
 
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@celery.task(name="batch_answer_task", bind=True)
+def batch_answer_task(self, items: list, session_namespace: str | None = None):
+    """
+    Answers a batch of questions (see modules/batch_answer.py).
+    Each result is appended to BATCH_RESULTS_DIR/<task_id>.jsonl as soon as it is ready.
+    """
+    os.makedirs(BATCH_RESULTS_DIR, exist_ok=True)
+    path = results_path(BATCH_RESULTS_DIR, self.request.id)
+    answerer = BatchAnswerer(
+        vector_store,
+        concurrency=BATCH_LLM_CONCURRENCY,
+        rate_per_minute=BATCH_LLM_RATE_PER_MINUTE,
+        embed_batch_size=BATCH_EMBED_BATCH_SIZE,
+        max_retries=BATCH_LLM_MAX_RETRIES
+    )
+
+    with open(path, "a", encoding="utf-8") as out:
+        def write(record):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+        def progress(done, total):
+            self.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
+        done = asyncio.run(answerer.run(items, session_namespace, write, progress))
+
+    logger.info(f"Batch task {self.request.id} answered {done} questions")
+    return {"done": done, "total": len(items)}
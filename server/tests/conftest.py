@@ -0,0 +1,56 @@
+"""
+Run from the server directory:
+    python -m pytest tests
+
+Tests use the offline defaults from the benchmarks (SQLite, local vector store, no Redis),
+set before config/database are imported.
+"""
+import benchmarks.offline_env  # noqa: F401
+
+import asyncio
+
+import pytest
+
+from database import Base, engine, SessionLocal, AsyncSessionLocal, async_engine
+import models.user
+import models.chat
+import models.file
+import models.message  # noqa: F401  (registers every table before create_all)
+from models.user import User
+from schemas.chat import ChatSessionCreate
+import crud.chat as chat_crud
+
+
+@pytest.fixture
+def db():
+    """A sync session on freshly created tables."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def make_user(db, email: str) -> User:
+    user = User(email=email, hashed_password="x", is_verified=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def make_session(db, user: User, title: str = "New Chat"):
+    return chat_crud.create_session(db, ChatSessionCreate(title=title), user.id)
+
+
+def run_async(work):
+    """Runs `await work(db)` on an AsyncSession in a fresh event loop and returns its result."""
+    async def main():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await work(db)
+        finally:
+            await async_engine.dispose()  # pooled aiosqlite connections belong to this loop
+    return asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Recall of the ANN indexes against exact search (modules/ann_index.py)."""
+import numpy as np
+import pytest
+
+from benchmarks.bench_ann import synthetic_embeddings, recall
+from modules.ann_index import IVFFlatIndex, HNSWIndex
+from modules.local_vector_store import exact_top_k, normalize_rows
+
+ROWS, DIM, K = 4000, 32, 10
+
+
+@pytest.fixture(scope="module")
+def data():
+    matrix = synthetic_embeddings(ROWS, DIM, clusters=40)
+    rng = np.random.default_rng(1)
+    picked = matrix[rng.choice(ROWS, 50, replace=False)]
+    queries = normalize_rows(picked + 0.3 * rng.standard_normal(picked.shape).astype(np.float32))
+    return matrix, queries
+
+
+def exact(matrix, queries, mask):
+    return exact_top_k(matrix, queries, K, mask)[0]
+
+
+def ivf(matrix, nprobe):
+    index = IVFFlatIndex.train(matrix, np.arange(len(matrix)), nprobe=nprobe)
+    index.extend(matrix, len(matrix))
+    return index
+
+
+def test_ivf_recall(data):
+    matrix, queries = data
+    mask = np.ones(ROWS, dtype=bool)
+    rows, _ = ivf(matrix, nprobe=16).search(matrix, queries, K, mask)
+    assert recall(rows, exact(matrix, queries, mask), K) >= 0.9
+
+
+def test_ivf_probing_every_list_is_exact(data):
+    matrix, queries = data
+    mask = np.ones(ROWS, dtype=bool)
+    index = ivf(matrix, nprobe=10_000)
+    rows, scores = index.search(matrix, queries, K, mask)
+    assert recall(rows, exact(matrix, queries, mask), K) == 1.0
+    assert all(s == sorted(s, reverse=True) for s in scores)
+
+
+def test_ivf_skips_tombstoned_rows(data):
+    matrix, queries = data
+    mask = np.ones(ROWS, dtype=bool)
+    index = ivf(matrix, nprobe=16)
+    first, _ = index.search(matrix, queries[:1], K, mask)
+    mask[first[0]] = False
+    rows, _ = index.search(matrix, queries[:1], K, mask)
+    assert not set(rows[0]) & set(first[0])
+
+
+def test_ivf_remap_after_compaction(data):
+    matrix, queries = data
+    index = ivf(matrix, nprobe=16)
+    live = np.arange(0, ROWS, 2)
+    compacted = np.ascontiguousarray(matrix[live])
+    index.remap(live)
+    mask = np.ones(len(compacted), dtype=bool)
+    rows, _ = index.search(compacted, queries, K, mask)
+    assert index.size == len(compacted)
+    assert recall(rows, exact(compacted, queries, mask), K) >= 0.9
+
+
+def test_ivf_save_and_load(data, tmp_path):
+    matrix, queries = data
+    mask = np.ones(ROWS, dtype=bool)
+    index = ivf(matrix, nprobe=8)
+    index.save(str(tmp_path))
+    loaded = IVFFlatIndex.load(str(tmp_path), nprobe=8)
+    assert loaded.search(matrix, queries, K, mask)[0] == index.search(matrix, queries, K, mask)[0]
+
+
+def test_hnsw_recall(data):
+    pytest.importorskip("hnswlib")
+    matrix, queries = data
+    mask = np.ones(ROWS, dtype=bool)
+    index = HNSWIndex.train(matrix, np.arange(ROWS), ef_search=64)
+    index.extend(matrix, ROWS)
+    rows, _ = index.search(matrix, queries, K, mask)
+    assert recall(rows, exact(matrix, queries, mask), K) >= 0.9
+
+    mask[rows[0]] = False
+    index.remove(rows[0])
+    assert not set(index.search(matrix, queries[:1], K, mask)[0][0]) & set(rows[0])
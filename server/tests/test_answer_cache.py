@@ -0,0 +1,60 @@
+"""Semantic answer cache for global-KB answers (modules/answer_cache.py)."""
+from modules.answer_cache import SemanticAnswerCache
+
+
+class CounterRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+
+def seeded(cache=None):
+    cache = cache or SemanticAnswerCache(threshold=0.95)
+    cache.store("global", [1.0, 0.0], ["c1", "c2"], "Rest and fluids.", [{"source": "flu.pdf"}])
+    return cache
+
+
+def test_similar_question_with_same_chunks_hits():
+    cache = seeded()
+    assert cache.lookup("global", [0.99, 0.05], ["c2", "c1"]) == {
+        "answer": "Rest and fluids.", "sources": [{"source": "flu.pdf"}]}
+    assert cache.hits == 1
+
+
+def test_dissimilar_question_misses():
+    assert seeded().lookup("global", [0.6, 0.8], ["c1", "c2"]) is None
+
+
+def test_different_retrieved_chunks_miss():
+    assert seeded().lookup("global", [1.0, 0.0], ["c1", "c3"]) is None
+
+
+def test_namespaces_are_separate():
+    assert seeded().lookup("other", [1.0, 0.0], ["c1", "c2"]) is None
+
+
+def test_version_bump_in_redis_invalidates_every_worker():
+    redis = CounterRedis()
+    worker_a, worker_b = seeded(SemanticAnswerCache(redis)), seeded(SemanticAnswerCache(redis))
+    SemanticAnswerCache(redis).bump_version("global")  # e.g. the Celery worker after an admin upload
+    assert worker_a.lookup("global", [1.0, 0.0], ["c1", "c2"]) is None
+    assert worker_b.lookup("global", [1.0, 0.0], ["c1", "c2"]) is None
+
+
+def test_expired_entries_miss():
+    cache = seeded(SemanticAnswerCache(ttl=-1))
+    assert cache.lookup("global", [1.0, 0.0], ["c1", "c2"]) is None
+
+
+def test_oldest_entries_dropped_when_full():
+    cache = SemanticAnswerCache(max_entries=2)
+    for n, vector in enumerate(([1.0, 0.0], [0.0, 1.0], [-1.0, 0.0])):
+        cache.store("global", vector, [f"c{n}"], f"answer {n}", [])
+    assert cache.lookup("global", [1.0, 0.0], ["c0"]) is None
+    assert cache.lookup("global", [-1.0, 0.0], ["c2"])["answer"] == "answer 2"
@@ -0,0 +1,139 @@
+"""
+A client that disconnects mid-answer must not lose the assistant message.
+
+Starlette cancels the response's task group when the client goes away; the stream's
+`finally` (save + summary trigger) has to survive that cancellation.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from starlette.responses import StreamingResponse
+
+from database import Base, engine, SessionLocal
+import models.user
+import models.chat
+import models.file
+import models.message
+from models.user import User
+from models.message import Message, MessageRole
+from schemas.chat import ChatSessionCreate
+from schemas.message import MessageCreate
+import crud.chat as chat_crud
+import crud.message as message_crud
+import routes.ask_question as ask
+from modules.stream_events import SSEDecoder
+
+FIRST_TOKENS = ["Ibuprofen ", "is an ", "NSAID"]
+
+
+class FakeRetriever:
+    async def embed(self, text):
+        return [0.0]
+
+    async def retrieve(self, question, namespaces, k, vector=None):
+        return []
+
+
+class StallingChain:
+    """Streams a few tokens, then stalls as if the LLM were still generating."""
+
+    async def astream(self, inputs):
+        for token in FIRST_TOKENS:
+            yield token
+        await asyncio.sleep(30)
+        yield "never sent"
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(email="disconnect@example.com", hashed_password="x", is_verified=True)
+        db.add(user)
+        db.commit()
+        session = chat_crud.create_session(db, ChatSessionCreate(title="New Chat"), user.id)
+        db.refresh(user)
+        db.expunge(user)
+        session_id = session.id
+    finally:
+        db.close()
+
+    background = []
+    monkeypatch.setattr(ask, "make_retriever", lambda vectorstore: FakeRetriever())
+    monkeypatch.setattr(ask, "answer_chain", lambda: StallingChain())
+    monkeypatch.setattr(ask, "run_in_background", lambda coro: background.append(coro.__name__) or coro.close())
+    return SimpleNamespace(user=user, session_id=session_id, background=background)
+
+
+def add_history(chat, turns):
+    db = SessionLocal()
+    try:
+        for i in range(turns):
+            for role in (MessageRole.USER, MessageRole.ASSISTANT):
+                message_crud.create_message(db, MessageCreate(content=f"{role.value} {i}", role=role),
+                                            chat.user.id, chat.session_id)
+    finally:
+        db.close()
+
+
+def saved_answers(session_id):
+    db = SessionLocal()
+    try:
+        return [m.content for m in db.query(Message)
+                .filter(Message.session_id == session_id, Message.role == MessageRole.ASSISTANT)
+                .order_by(Message.id)]
+    finally:
+        db.close()
+
+
+async def stream_then_disconnect(chat, after_tokens):
+    """Runs /ask's StreamingResponse and disconnects once `after_tokens` tokens arrived."""
+    response = StreamingResponse(
+        ask.stream_generator("What is ibuprofen?", chat.session_id, chat.user, None, f"session_{chat.session_id}"),
+        media_type="text/event-stream",
+    )
+    decoder, received, disconnected = SSEDecoder(), [], asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            for event, data in decoder.feed(message.get("body", b"").decode()):
+                if event == "token":
+                    received.append(data["text"])
+            if len(received) >= after_tokens:
+                disconnected.set()
+
+    # ASGI < 2.4: Starlette watches for http.disconnect and cancels the stream
+    scope = {"type": "http", "asgi": {"spec_version": "2.3"}}
+    await asyncio.wait_for(response(scope, receive, send), timeout=10)
+    return received
+
+
+def test_disconnect_mid_stream_saves_assistant_message(chat):
+    received = asyncio.run(stream_then_disconnect(chat, after_tokens=len(FIRST_TOKENS)))
+
+    assert received == FIRST_TOKENS
+    assert len(saved_answers(chat.session_id)) == 1
+
+
+def test_disconnect_saves_partial_answer(chat):
+    received = asyncio.run(stream_then_disconnect(chat, after_tokens=2))
+
+    # Everything generated before the cancellation is kept, even tokens the client never read
+    saved = saved_answers(chat.session_id)
+    assert saved == ["".join(FIRST_TOKENS)]
+    assert saved[0].startswith("".join(received))
+
+
+def test_disconnect_still_triggers_summary(chat):
+    add_history(chat, turns=ask.MEMORY_TURNS + 1)  # verbatim window full
+
+    asyncio.run(stream_then_disconnect(chat, after_tokens=1))
+
+    assert "summarize_session" in chat.background
@@ -0,0 +1,83 @@
+"""Async CRUD (crud/aio) against the same tables as the sync CRUD."""
+from models.chat import ChatSession
+from models.file import UploadedFile
+from models.message import Message, MessageRole
+from schemas.chat import ChatSessionCreate
+from schemas.message import MessageCreate
+from schemas.user import UserCreate
+import crud.message as message_crud
+import crud.aio.chat as aio_chat_crud
+import crud.aio.message as aio_message_crud
+import crud.aio.user as aio_user_crud
+from conftest import make_user, make_session, run_async
+
+
+def test_create_and_fetch_user(db):
+    async def work(adb):
+        created = await aio_user_crud.create_user(adb, UserCreate(email="a@example.com", password="pw"))
+        by_email = await aio_user_crud.get_user_by_email(adb, "a@example.com")
+        by_id = await aio_user_crud.get_user_by_id(adb, created.id)
+        return created.id, by_email.id, by_id.email, created.hashed_password
+    user_id, by_email, by_id, hashed = run_async(work)
+    assert (by_email, by_id) == (user_id, "a@example.com")
+    assert hashed != "pw"
+
+
+def test_sessions_are_scoped_to_their_owner(db):
+    owner, other = make_user(db, "owner@example.com"), make_user(db, "other@example.com")
+
+    async def work(adb):
+        session = await aio_chat_crud.create_session(adb, ChatSessionCreate(title="Labs"), owner.id)
+        return (session.id,
+                await aio_chat_crud.get_session(adb, session.id, other.id),
+                await aio_chat_crud.update_session_title(adb, session.id, "Hijacked", other.id),
+                await aio_chat_crud.delete_session(adb, session.id, other.id),
+                [s.title for s in await aio_chat_crud.get_user_sessions(adb, owner.id)])
+    session_id, foreign_get, foreign_rename, foreign_delete, titles = run_async(work)
+    assert (foreign_get, foreign_rename, foreign_delete) == (None, None, False)
+    assert titles == ["Labs"]
+    assert db.get(ChatSession, session_id).title == "Labs"
+
+
+def test_create_message_updates_session_activity(db):
+    user = make_user(db, "a@example.com")
+    session = make_session(db, user)
+
+    async def work(adb):
+        for text in ("first question", "an   answer\nover two lines"):
+            await aio_message_crud.create_message(
+                adb, MessageCreate(content=text, role=MessageRole.USER), user.id, session.id)
+        return await aio_message_crud.get_messages_version(adb, session.id, user.id)
+    count, last_id = run_async(work)
+
+    db.expire_all()
+    stored = db.get(ChatSession, session.id)
+    assert (stored.message_count, stored.last_preview) == (2, "an answer over two lines")
+    assert (count, last_id) == message_crud.get_messages_version(db, session.id, user.id)
+
+
+def test_recent_messages_window(db):
+    user = make_user(db, "a@example.com")
+    session = make_session(db, user)
+    ids = [message_crud.create_message(db, MessageCreate(content=f"m{n}", role=MessageRole.USER),
+                                       user.id, session.id).id for n in range(6)]
+
+    async def work(adb):
+        latest = await aio_message_crud.get_recent_messages(adb, session.id, user.id, limit=3)
+        window = await aio_message_crud.get_recent_messages(adb, session.id, user.id, limit=10,
+                                                            after_id=ids[1], before_id=ids[4])
+        return [m.id for m in latest], [m.id for m in window]
+    assert run_async(work) == (ids[3:], ids[2:4])
+
+
+def test_delete_session_cascades_to_messages_and_files(db):
+    user = make_user(db, "a@example.com")
+    session = make_session(db, user)
+    message_crud.create_message(db, MessageCreate(content="hi", role=MessageRole.USER), user.id, session.id)
+    db.add(UploadedFile(session_id=session.id, filename="labs.pdf"))
+    db.commit()
+
+    assert run_async(lambda adb: aio_chat_crud.delete_session(adb, session.id, user.id)) is True
+    db.expire_all()
+    assert db.query(Message).count() == 0
+    assert db.query(UploadedFile).count() == 0
@@ -0,0 +1,88 @@
+"""Rate-limit backoff for batch answering (modules/batch_answer.py)."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from modules import batch_answer
+from modules.batch_answer import is_rate_limited, retry_after, with_backoff, results_path
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def http_error(status, headers=None):
+    error = Exception(f"HTTP {status}")
+    error.response = SimpleNamespace(status_code=status, headers=headers or {})
+    return error
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(batch_answer.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def flaky(*errors, result="answer"):
+    """A call that raises each of `errors` in turn, then returns `result`."""
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return call, calls
+
+
+def test_rate_limit_detection():
+    assert is_rate_limited(http_error(429))
+    assert is_rate_limited(RateLimitError("slow down"))
+    assert is_rate_limited(Exception("Rate limit reached for model"))
+    assert not is_rate_limited(http_error(500))
+    assert not is_rate_limited(ValueError("bad prompt"))
+
+
+def test_retry_after_header():
+    assert retry_after(http_error(429, {"retry-after": "2.5"})) == 2.5
+    assert retry_after(http_error(429, {"retry-after": "soon"})) is None
+    assert retry_after(http_error(429)) is None
+
+
+def test_retries_rate_limits_with_capped_exponential_jitter(sleeps, monkeypatch):
+    monkeypatch.setattr(batch_answer.random, "uniform", lambda low, high: high)  # worst case
+    call, calls = flaky(*[RateLimitError()] * 4)
+    assert asyncio.run(with_backoff(call, max_retries=5, base_delay=1.0, max_delay=5.0)) == "answer"
+    assert len(calls) == 5
+    assert sleeps == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_server_retry_after_wins_over_backoff(sleeps):
+    call, _ = flaky(http_error(429, {"retry-after": "7"}))
+    asyncio.run(with_backoff(call))
+    assert sleeps == [7.0]
+
+
+def test_other_errors_are_not_retried(sleeps):
+    call, calls = flaky(ValueError("bad prompt"))
+    with pytest.raises(ValueError):
+        asyncio.run(with_backoff(call))
+    assert (len(calls), sleeps) == (1, [])
+
+
+def test_gives_up_after_max_retries(sleeps):
+    call, calls = flaky(*[RateLimitError()] * 3)
+    with pytest.raises(RateLimitError):
+        asyncio.run(with_backoff(call, max_retries=2))
+    assert (len(calls), len(sleeps)) == (3, 2)
+
+
+def test_results_path_rejects_traversal(tmp_path):
+    assert results_path(str(tmp_path), "abc-123").endswith("abc-123.jsonl")
+    with pytest.raises(ValueError):
+        results_path(str(tmp_path), "../etc/passwd")
@@ -0,0 +1,99 @@
+"""Batched chat export (iter_export_batches, modules/chat_export.py, GET /chat/export)."""
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.message import MessageRole
+from schemas.message import MessageCreate
+import crud.message as message_crud
+import crud.aio.message as aio_message_crud
+from modules.chat_export import ExportFormatter, CSV_COLUMNS
+from routes import chat
+from utils.auth_deps import get_token_principal
+from conftest import make_user, make_session, run_async
+
+SOURCES = [{"source": "labs.pdf", "score": 0.82, "merge_score": 1.0, "type": "Private"},
+           {"source": "kb.pdf", "score": None, "merge_score": 0.4, "type": "Global"}]
+
+
+@pytest.fixture
+def chats(db):
+    user, other = make_user(db, "export@example.com"), make_user(db, "other@example.com")
+    sessions = [make_session(db, user, "Labs"), make_session(db, user, "Diet"), make_session(db, other, "Theirs")]
+    for session, owner, turns in ((sessions[0], user, 3), (sessions[1], user, 2), (sessions[2], other, 1)):
+        for n in range(turns):
+            role = MessageRole.USER if n % 2 == 0 else MessageRole.ASSISTANT
+            message_crud.create_message(
+                db, MessageCreate(content=f"{session.title} {n}", role=role,
+                                  sources=SOURCES if role == MessageRole.ASSISTANT else None),
+                owner.id, session.id)
+    return user, other, sessions
+
+
+def contents(batches):
+    return [[row["content"] for row in batch] for batch in batches]
+
+
+def test_batches_are_bounded_and_in_session_history_order(db, chats):
+    user, _, sessions = chats
+    batches = list(message_crud.iter_export_batches(db, user.id, batch_size=2))
+    assert contents(batches) == [["Labs 0", "Labs 1"], ["Labs 2", "Diet 0"], ["Diet 1"]]
+    only_diet = list(message_crud.iter_export_batches(db, user.id, sessions[1].id, batch_size=2))
+    assert contents(only_diet) == [["Diet 0", "Diet 1"]]
+
+
+def test_async_batches_match_sync_batches(db, chats):
+    user, _, _ = chats
+
+    async def collect(adb):
+        return [list(batch) async for batch in aio_message_crud.iter_export_batches(adb, user.id, batch_size=2)]
+    assert contents(run_async(collect)) == contents(message_crud.iter_export_batches(db, user.id, batch_size=2))
+
+
+def test_markdown_heads_each_session_once_across_batches(db, chats):
+    user, _, _ = chats
+    formatter = ExportFormatter("markdown")
+    text = formatter.header() + "".join(
+        formatter.batch(batch) for batch in message_crud.iter_export_batches(db, user.id, batch_size=2))
+    assert text.count("## Labs") == 1 and text.count("## Diet") == 1
+    assert "- labs.pdf (Private, similarity 0.82)" in text
+    assert "- kb.pdf (Global, keyword match)" in text
+
+
+def test_csv_and_ndjson_rows(db, chats):
+    user, _, _ = chats
+    batch = next(message_crud.iter_export_batches(db, user.id, batch_size=2))
+
+    rows = list(csv.reader(io.StringIO(ExportFormatter("csv").header() + ExportFormatter("csv").batch(batch))))
+    assert rows[0] == CSV_COLUMNS
+    assert json.loads(rows[2][CSV_COLUMNS.index("sources")]) == SOURCES
+
+    records = [json.loads(line) for line in ExportFormatter("ndjson").batch(batch).splitlines()]
+    assert [(r["session_title"], r["role"], r["sources"]) for r in records] == \
+        [("Labs", "user", []), ("Labs", "assistant", SOURCES)]
+
+    with pytest.raises(ValueError):
+        ExportFormatter("pdf")
+
+
+def test_export_route_streams_only_the_callers_chats(db, chats, monkeypatch):
+    user, other, sessions = chats
+    monkeypatch.setattr(chat, "EXPORT_BATCH_SIZE", 2)
+    app = FastAPI()
+    app.include_router(chat.router)
+    current = {"user": user}
+    app.dependency_overrides[get_token_principal] = lambda: current["user"]
+    client = TestClient(app)
+
+    response = client.get("/chat/export", params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="vitaai_chats.ndjson"'
+    assert [json.loads(line)["content"] for line in response.text.splitlines()] == \
+        ["Labs 0", "Labs 1", "Labs 2", "Diet 0", "Diet 1"]
+
+    current["user"] = other
+    assert client.get("/chat/export", params={"session_id": sessions[0].id}).status_code == 404
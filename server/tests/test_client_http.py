@@ -0,0 +1,96 @@
+"""
+The client's pooled HTTP transport (client/utils/http.py, loaded by path like the client's
+SSE decoder) against a local keep-alive server.
+"""
+import importlib.util
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+CLIENT_HTTP = os.path.join(os.path.dirname(__file__), "..", "..", "client", "utils", "http.py")
+
+
+def load_client_http():
+    spec = importlib.util.spec_from_file_location("client_http", CLIENT_HTTP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def respond(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        failing = self.path == "/flaky" and server.hits[self.path] <= server.failures
+        body = b"unavailable" if failing else b"ok"
+        self.send_response(503 if failing else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.connections, httpd.hits, httpd.failures = set(), {}, 2
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def http():
+    return load_client_http()
+
+
+def test_calls_reuse_one_keep_alive_connection(server, http):
+    httpd, base = server
+    for _ in range(5):
+        assert http.request("GET", f"{base}/status", kind="status").text == "ok"
+    assert len(httpd.connections) == 1
+    assert http.get_session() is http.get_session()
+
+
+def test_idempotent_calls_retry_gateway_errors(server, http, monkeypatch):
+    httpd, base = server
+    monkeypatch.setattr(http, "get_session", lambda: http.make_session(retries=3))
+    response = http.request("GET", f"{base}/flaky")
+    assert (response.status_code, httpd.hits["/flaky"]) == (200, 3)
+
+
+def test_posts_are_not_retried_once_sent(server, http):
+    httpd, base = server
+    response = http.request("POST", f"{base}/flaky", data=b"question")
+    assert (response.status_code, httpd.hits["/flaky"]) == (503, 1)
+
+
+def test_timeout_is_picked_by_kind(http, monkeypatch):
+    seen = []
+
+    class Recorder:
+        def request(self, method, url, **kwargs):
+            seen.append(kwargs["timeout"])
+    monkeypatch.setattr(http, "get_session", lambda: Recorder())
+    http.request("GET", "http://api/status", kind="status")
+    http.request("GET", "http://api/x", kind="no-such-kind")
+    http.request("GET", "http://api/x", kind="ask", timeout=1)
+    assert seen == [http.TIMEOUTS["status"], http.TIMEOUTS["default"], 1]
+
+
+def test_http2_client_is_off_by_default(http):
+    assert http.get_http2_client() is None
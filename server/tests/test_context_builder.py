@@ -0,0 +1,55 @@
+"""Token-budgeted RAG context (modules/context_builder.py)."""
+from langchain_core.documents import Document
+
+from modules.context_builder import estimate_tokens, trim_to_sentences, build_context
+
+
+def doc(doc_id, text):
+    return Document(page_content=text, metadata={"source": f"{doc_id}.pdf"}, id=doc_id)
+
+
+def sentences(word, count):
+    return " ".join(f"{word} {word} {word} {word} {word}." for _ in range(count))
+
+
+def test_estimate_counts_punctuation_and_long_words():
+    assert estimate_tokens("Take 500mg twice daily.") == 1 + 2 + 2 + 2 + 1
+    assert estimate_tokens("") == 0
+
+
+def test_trim_keeps_whole_sentences():
+    text = "First sentence here. Second sentence here. Third one."
+    assert trim_to_sentences(text, 12) == "First sentence here. Second sentence here."
+    assert trim_to_sentences(text, 5) == ""
+
+
+def test_everything_fits_under_a_large_budget():
+    docs = [(doc("a", "alpha beta."), 0.9), (doc("b", "gamma delta."), 0.5)]
+    built = build_context(docs, budget=1000)
+    assert built.text == "alpha beta.\n\ngamma delta."
+    assert (built.dropped, built.trimmed) == (0, 0)
+    assert built.tokens == built.candidate_tokens + estimate_tokens("\n\n")
+
+
+def test_budget_is_never_exceeded():
+    docs = [(doc(str(n), sentences(f"w{n}", 10)), 1.0 - n / 10) for n in range(6)]
+    for budget in (50, 120, 200, 333):
+        built = build_context(docs, budget, min_chunk_tokens=10)
+        assert 0 < built.tokens <= budget
+
+
+def test_dense_chunks_win_and_are_laid_out_by_score():
+    long_best = doc("long", sentences("long", 40))   # highest score, but expensive
+    short = doc("short", sentences("short", 2))
+    built = build_context([(long_best, 0.9), (short, 0.6)], budget=40, min_chunk_tokens=100)
+    assert [d.id for d, _ in built.docs] == ["short"]
+    assert built.dropped == 1
+
+
+def test_overflowing_chunk_is_cut_at_a_sentence():
+    built = build_context([(doc("a", sentences("alpha", 3)), 0.9), (doc("b", sentences("beta", 20)), 0.8)],
+                          budget=60, min_chunk_tokens=10)
+    assert [d.id for d, _ in built.docs] == ["a", "b"]
+    assert built.trimmed == 1
+    assert built.docs[1][0].page_content.endswith(".")
+    assert built.tokens <= 60
@@ -0,0 +1,23 @@
+"""Engine URL and pool option helpers in database.py."""
+from database import to_async_url, pool_options
+
+
+def test_async_url_maps_drivers():
+    assert to_async_url("postgres://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert to_async_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert to_async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+
+def test_async_url_maps_sslmode_to_asyncpg_ssl():
+    url = to_async_url("postgresql://u:p@h:5432/db?sslmode=require&application_name=vita")
+    assert url.startswith("postgresql+asyncpg://u:p@h:5432/db?")
+    assert "sslmode" not in url
+    assert "ssl=require" in url
+    assert "application_name=vita" in url
+
+
+def test_pool_options_size_queue_pools_only():
+    for url in ("postgresql://u@h/db", "sqlite:///./app.db", "sqlite+aiosqlite:///./app.db"):
+        assert "pool_size" in pool_options(url), url
+    for url in ("sqlite://", "sqlite:///:memory:", "sqlite+aiosqlite://"):
+        assert "pool_size" not in pool_options(url), url
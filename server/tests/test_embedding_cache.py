@@ -0,0 +1,81 @@
+"""Query-embedding cache (modules/embedding_cache.py)."""
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from modules.embedding_cache import LRUCache, CachedEmbeddings
+
+
+class CountingEmbedder(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_lru_entries_expire(monkeypatch):
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_normalized_questions_share_one_embedding():
+    base = CountingEmbedder()
+    cached = CachedEmbeddings(base, "model")
+    first = cached.embed_query("What is  Anemia?")
+    assert cached.embed_query("what is anemia?") == first
+    assert len(base.calls) == 1
+    assert cached.stats()["hits_memory"] == 1
+
+
+def test_model_name_is_part_of_the_key():
+    assert CachedEmbeddings(CountingEmbedder(), "a").cache_key("q") != \
+        CachedEmbeddings(CountingEmbedder(), "b").cache_key("q")
+
+
+def test_redis_tier_is_shared_between_workers():
+    redis = DictRedis()
+    CachedEmbeddings(CountingEmbedder(), "model", redis_client=redis).embed_query("fever")
+    base = CountingEmbedder()
+    other_worker = CachedEmbeddings(base, "model", redis_client=redis)
+    assert other_worker.embed_query("fever") == [5.0, 1.0]
+    assert base.calls == []
+    assert other_worker.stats()["hits_redis"] == 1
+
+
+def test_embed_queries_batches_only_the_misses():
+    base = CountingEmbedder()
+    cached = CachedEmbeddings(base, "model")
+    cached.embed_query("b")
+    vectors = cached.embed_queries(["a", "b", "ccc", "dd"], batch_size=2)
+    assert vectors == [[1.0, 1.0], [1.0, 1.0], [3.0, 1.0], [2.0, 1.0]]
+    assert base.calls == [["b"], ["a", "ccc"], ["dd"]]
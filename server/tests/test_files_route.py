@@ -0,0 +1,45 @@
+"""GET /chat/sessions/{id}/files only lists the caller's own sessions."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.file import UploadedFile
+from routes import files
+from utils.auth_deps import get_token_principal
+from conftest import make_user, make_session
+
+
+@pytest.fixture
+def client(db):
+    owner, other = make_user(db, "owner@example.com"), make_user(db, "other@example.com")
+    session = make_session(db, owner)
+    db.add(UploadedFile(filename="labs.pdf", session_id=session.id))
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(files.router)
+    current = {"user": owner}
+    app.dependency_overrides[get_token_principal] = lambda: current["user"]
+    client = TestClient(app)
+    client.current, client.owner, client.other, client.session_id = current, owner, other, session.id
+    return client
+
+
+def test_owner_gets_files_with_etag(client):
+    response = client.get(f"/chat/sessions/{client.session_id}/files")
+    assert response.status_code == 200
+    assert [f["filename"] for f in response.json()] == ["labs.pdf"]
+    revalidated = client.get(f"/chat/sessions/{client.session_id}/files",
+                             headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_other_user_gets_404_without_etag(client):
+    client.current["user"] = client.other
+    response = client.get(f"/chat/sessions/{client.session_id}/files")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+def test_unknown_session_is_404(client):
+    assert client.get("/chat/sessions/999/files").status_code == 404
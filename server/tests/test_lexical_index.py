@@ -0,0 +1,81 @@
+"""BM25 keyword index and rank fusion (modules/lexical_index.py, HybridRetriever.fuse)."""
+from langchain_core.documents import Document
+
+from modules.lexical_index import tokenize, BM25Index, LexicalIndex, reciprocal_rank_fusion
+from modules.retrieval import HybridRetriever
+
+
+def chunk(doc_id, text, file_uuid="f1"):
+    return Document(page_content=text, metadata={"source": "a.pdf", "file_uuid": file_uuid}, id=doc_id)
+
+
+def test_tokenize_keeps_compound_medical_terms_and_their_parts():
+    assert tokenize("What is the ICD code E11.9 for co-amoxiclav?") == \
+        ["icd", "code", "e11.9", "e11", "9", "co-amoxiclav", "co", "amoxiclav"]
+
+
+def test_bm25_ranks_rare_terms_and_short_documents_higher():
+    index = BM25Index()
+    index.add("rare", "hyperkalemia notes")
+    index.add("common", "patient notes")
+    index.add("long", "hyperkalemia " + "filler " * 50)
+    index.add("other", "patient chart")
+    index.add("third", "patient history")
+    ranked = [hit[0] for hit in index.search("patient hyperkalemia")]
+    assert ranked[0] == "rare" and ranked[-1] == "long"
+    assert sorted(ranked[1:-1]) == ["common", "other", "third"]
+    assert index.search("unknownterm") == []
+
+
+def test_bm25_remove_and_readd_keep_running_totals():
+    index = BM25Index()
+    index.add("a", "metformin dose", {"file_uuid": "f1"})
+    index.add("b", "insulin dose", {"file_uuid": "f2"})
+    index.add("a", "metformin")  # replaces the earlier text
+    assert index.total_len == 3
+    assert index.remove_where(file_uuid="f2") == 1
+    assert [hit[0] for hit in index.search("dose metformin")] == ["a"]
+    assert "dose" not in index.postings
+
+
+def test_rrf_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60)
+    assert fused == {"a": 1 / 61, "b": 1 / 62 + 1 / 61, "c": 1 / 62}
+
+
+def test_fuse_scales_a_chunk_ranked_first_by_both_to_one():
+    retriever = HybridRetriever(vectorstore=None, embedder=None, rrf_k=60)
+    a, b, c = chunk("a", "vector copy"), chunk("b", "b"), chunk("c", "c")
+    fused = retriever.fuse([(a, 0.9), (b, 0.8)], [(chunk("a", "lexical copy"), 7.0), (c, 3.0)], k=2)
+    assert [(doc.id, round(score, 4)) for doc, score in fused] == [("a", 1.0), ("b", round(61 / 124, 4))]
+    assert fused[0][0].page_content == "vector copy"
+
+
+def test_loaded_namespaces_are_capped_least_recently_used_first(tmp_path):
+    index = LexicalIndex(str(tmp_path), max_namespaces=2)
+    for ns in ("session_1", "session_2", "session_3"):
+        index.add(ns, [chunk(f"{ns}_0", f"metformin dosing for {ns}")])
+    assert list(index._logs) == ["session_2", "session_3"]
+
+    index.search("session_2", "metformin")  # now the most recently used
+    index.add("session_4", [chunk("session_4_0", "insulin")])
+    assert list(index._logs) == ["session_2", "session_4"]
+
+
+def test_evicted_namespace_reloads_from_its_log(tmp_path):
+    index = LexicalIndex(str(tmp_path), max_namespaces=1)
+    index.add("session_1", [chunk("a", "metformin lowers glucose"), chunk("b", "aspirin", file_uuid="f2")])
+    index.delete("session_1", file_uuid="f2")
+    index.add("session_2", [chunk("c", "insulin")])  # evicts session_1
+    assert "session_1" not in index._logs
+
+    assert [hit[0] for hit in index.search("session_1", "metformin aspirin")] == ["a"]
+
+
+def test_other_process_writes_are_seen_after_reload(tmp_path):
+    reader = LexicalIndex(str(tmp_path), max_namespaces=1)
+    writer = LexicalIndex(str(tmp_path))
+    reader.search("session_1", "metformin")
+    reader.search("session_2", "metformin")  # evicts session_1
+    writer.add("session_1", [chunk("a", "metformin")])
+    assert [hit[0] for hit in reader.search("session_1", "metformin")] == ["a"]
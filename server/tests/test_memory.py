@@ -0,0 +1,79 @@
+"""Conversation memory: rolling summary + recent turns (modules/memory.py, summarize_session)."""
+import asyncio
+from types import SimpleNamespace
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from database import async_engine
+from models.chat import ChatSession
+from models.message import MessageRole
+from schemas.message import MessageCreate
+import crud.message as message_crud
+import routes.ask_question as ask
+from modules.memory import fit_recent, build_history, update_summary
+from conftest import make_user, make_session
+
+
+def turn(role, content, id=0):
+    return SimpleNamespace(id=id, role=role, content=content)
+
+
+def test_fit_recent_keeps_the_newest_turns_that_fit():
+    turns = [turn(MessageRole.USER, "one two three"), turn(MessageRole.ASSISTANT, "four five"),
+             turn(MessageRole.USER, "six")]
+    assert [t.content for t in fit_recent(turns, 2)] == ["six"]
+    assert [t.content for t in fit_recent(turns, 4)] == ["four five", "six"]
+
+
+def test_history_is_summary_then_turns_within_budget():
+    turns = [turn(MessageRole.USER, "Is metformin safe?"), turn(MessageRole.ASSISTANT, "Usually, yes.")]
+    assert build_history(None, [], 100) == "(none)"
+    assert build_history("User has type 2 diabetes.", turns, 100) == (
+        "Summary of earlier conversation: User has type 2 diabetes.\n"
+        "User: Is metformin safe?\nAssistant: Usually, yes."
+    )
+
+
+def test_long_summary_gets_at_most_a_third_of_the_budget():
+    summary = " ".join(f"Fact number {n} about the patient." for n in range(100))
+    history = build_history(summary, [turn(MessageRole.USER, "And now?")], 90)
+    assert history.endswith("User: And now?")
+    assert len(history) < len(summary) // 4
+
+
+def test_update_summary_returns_the_new_summary_or_none_on_failure():
+    llm = FakeListChatModel(responses=["  User takes 500mg metformin.  "])
+    messages = [turn(MessageRole.USER, "I take 500mg metformin")]
+    assert asyncio.run(update_summary(llm, None, messages)) == "User takes 500mg metformin."
+    assert asyncio.run(update_summary(FakeListChatModel(responses=[]), None, messages)) is None
+
+
+def test_old_messages_fold_into_the_summary_once_over_the_trigger(db, monkeypatch):
+    user = make_user(db, "memory@example.com")
+    session = make_session(db, user)
+    ids = [message_crud.create_message(db, MessageCreate(content=f"message {n} " * 5, role=MessageRole.USER),
+                                       user.id, session.id).id for n in range(8)]
+    folded = []
+
+    async def fake_update_summary(llm, summary, messages, max_words):
+        folded.append([m.id for m in messages])
+        return f"summary of {len(messages)}"
+
+    monkeypatch.setattr(ask, "MEMORY_TURNS", 2)
+    monkeypatch.setattr(ask, "update_summary", fake_update_summary)
+
+    async def summarize(trigger_tokens):
+        monkeypatch.setattr(ask, "MEMORY_SUMMARY_TRIGGER_TOKENS", trigger_tokens)
+        try:
+            await ask.summarize_session(session.id, user.id)
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(summarize(trigger_tokens=10_000))
+    assert folded == []
+
+    asyncio.run(summarize(trigger_tokens=10))
+    assert folded == [ids[:4]]  # everything before the last 2 turns (4 messages)
+    db.expire_all()
+    stored = db.get(ChatSession, session.id)
+    assert (stored.summary, stored.summary_message_id) == ("summary of 4", ids[3])
@@ -0,0 +1,60 @@
+"""Merging private and global results (modules/merge.py)."""
+from langchain_core.documents import Document
+
+from modules.merge import normalize_scores, remove_duplicates, mmr, strip_overlap, merge_results
+
+
+def doc(doc_id, text, source_type="Global", source="a.pdf"):
+    return Document(page_content=text, metadata={"source": source, "source_type": source_type}, id=doc_id)
+
+
+def ids(docs):
+    return [d.id for d, _ in docs]
+
+
+def test_scores_are_min_max_scaled_per_source_type():
+    docs = [(doc("g1", "x"), 0.9), (doc("g2", "y"), 0.7), (doc("p1", "z", "Private"), 0.4),
+            (doc("p2", "w", "Private"), 0.2), (doc("p3", "v", "Private"), 0.3)]
+    scaled = normalize_scores(docs)
+    assert [round(s, 4) for _, s in scaled] == [1.0, 0.0, 1.0, 0.0, 0.5]
+    assert [d.metadata["raw_score"] for d, _ in scaled] == [0.9, 0.7, 0.4, 0.2, 0.3]
+
+
+def test_a_single_weak_hit_keeps_its_raw_score():
+    assert [s for _, s in normalize_scores([(doc("p1", "x", "Private"), 0.31)])] == [0.31]
+    assert [s for _, s in normalize_scores([(doc("p1", "x", "Private"), 1.7)])] == [1.0]
+
+
+def test_duplicates_keep_the_best_scored_copy():
+    text = "metformin is the first line treatment for type two diabetes in adults"
+    docs = [(doc("a", text), 0.5), (doc("a", text, "Private"), 0.9),
+            (doc("b", text + " without contraindications"), 0.7), (doc("c", "insulin dosing schedule"), 0.1)]
+    kept = remove_duplicates(docs)
+    assert ids(kept) == ["a", "c"]
+    assert kept[0][0].metadata["source_type"] == "Private"
+
+
+def test_mmr_trades_relevance_for_diversity():
+    same = "aspirin reduces the risk of heart attack in adults"
+    docs = [(doc("a", same), 1.0), (doc("b", same + " over sixty"), 0.95),
+            (doc("c", "statins lower cholesterol levels"), 0.7)]
+    assert ids(mmr(docs, k=2, lambda_=0.7)) == ["a", "c"]
+    assert ids(mmr(docs, k=2, lambda_=1.0)) == ["a", "b"]
+
+
+def test_overlap_between_adjacent_chunks_is_trimmed():
+    previous = "Patients should fast for eight hours before the glucose tolerance test."
+    text = "before the glucose tolerance test. Bring a list of current medications."
+    assert strip_overlap(previous, text) == "Bring a list of current medications."
+    assert strip_overlap(previous, "Unrelated text that shares nothing at all with it.") == \
+        "Unrelated text that shares nothing at all with it."
+
+
+def test_merge_results_end_to_end():
+    private = [(doc("p1", "my lab report shows high potassium levels today", "Private", "labs.pdf"), 0.42)]
+    shared = [(doc("g1", "hyperkalemia is treated with calcium gluconate and insulin"), 0.81),
+              (doc("g1", "hyperkalemia is treated with calcium gluconate and insulin"), 0.81),
+              (doc("g2", "potassium rich foods include bananas and spinach"), 0.55)]
+    merged = merge_results(private + shared, k=4)
+    assert sorted(ids(merged)) == ["g1", "g2", "p1"]
+    assert merged[0][1] == 1.0
@@ -0,0 +1,69 @@
+"""Keyset history pages (crud/message.py and crud/aio/message.py share one predicate)."""
+from datetime import datetime
+
+import pytest
+
+from models.message import Message, MessageRole
+from schemas.message import MessageCreate
+import crud.message as message_crud
+import crud.aio.message as aio_message_crud
+from conftest import make_user, make_session, run_async
+
+
+@pytest.fixture
+def history(db):
+    """Seven messages; 2-4 share one created_at, so only the id breaks the tie."""
+    user = make_user(db, "pages@example.com")
+    session = make_session(db, user)
+    ids = []
+    for n in range(7):
+        message = message_crud.create_message(
+            db, MessageCreate(content=f"m{n}", role=MessageRole.USER), user.id, session.id)
+        ids.append(message.id)
+    stamps = [datetime(2026, 1, 1, 9, 0, n) for n in (0, 1, 2, 2, 2, 3, 4)]
+    for message_id, stamp in zip(ids, stamps):
+        db.query(Message).filter(Message.id == message_id).update({Message.created_at: stamp})
+    db.commit()
+    return db, user.id, session.id, ids
+
+
+def sync_pages(db, user_id, session_id, limit):
+    pages, before_id = [], None
+    while page := message_crud.get_messages_page(db, session_id, user_id, limit, before_id):
+        pages.append([m["id"] for m in page])
+        before_id = page[0]["id"]
+    return pages
+
+
+async def async_pages(db, user_id, session_id, limit):
+    pages, before_id = [], None
+    while page := await aio_message_crud.get_messages_page(db, session_id, user_id, limit, before_id):
+        pages.append([m["id"] for m in page])
+        before_id = page[0]["id"]
+    return pages
+
+
+def test_pages_walk_back_without_gaps_or_repeats_across_ties(history):
+    db, user_id, session_id, ids = history
+    pages = sync_pages(db, user_id, session_id, limit=2)
+    assert pages == [ids[5:7], ids[3:5], ids[1:3], ids[0:1]]
+
+
+def test_async_pages_match_sync_pages(history):
+    db, user_id, session_id, _ = history
+    for limit in (1, 2, 3, 100):
+        pages = run_async(lambda adb: async_pages(adb, user_id, session_id, limit))
+        assert pages == sync_pages(db, user_id, session_id, limit)
+
+
+def test_page_columns_only(history):
+    db, user_id, session_id, ids = history
+    page = message_crud.get_messages_page(db, session_id, user_id, limit=1)
+    assert set(page[0]) == {"id", "session_id", "role", "content", "created_at"}
+    assert page[0]["id"] == ids[-1]
+
+
+def test_other_users_get_an_empty_page(history):
+    db, _, session_id, _ = history
+    stranger = make_user(db, "stranger@example.com")
+    assert message_crud.get_messages_page(db, session_id, stranger.id) == []
@@ -0,0 +1,76 @@
+"""Stage latency histograms and the /metrics endpoint (modules/metrics.py)."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from modules import metrics
+from middlewares.metrics import metrics_middleware
+from routes.metrics import router as metrics_router
+
+
+def stage_count(stage):
+    return REGISTRY.get_sample_value("vitaai_stage_seconds_count", {"stage": stage}) or 0.0
+
+
+def stage_errors(stage):
+    return REGISTRY.get_sample_value("vitaai_stage_errors_total", {"stage": stage}) or 0.0
+
+
+@pytest.fixture(autouse=True)
+def enabled():
+    metrics.configure(enabled=True)
+    yield
+    metrics.configure(enabled=True)
+
+
+def test_timed_records_one_sample_per_block():
+    before = stage_count("test_timed")
+    for _ in range(3):
+        with metrics.timed("test_timed"):
+            pass
+    assert stage_count("test_timed") == before + 3
+
+
+def test_timed_counts_errors_and_reraises():
+    before = stage_errors("test_failing")
+    with pytest.raises(RuntimeError):
+        with metrics.timed("test_failing"):
+            raise RuntimeError("boom")
+    assert stage_errors("test_failing") == before + 1
+    assert stage_count("test_failing") >= 1
+
+
+def test_observe_records_the_given_duration():
+    before = REGISTRY.get_sample_value("vitaai_stage_seconds_sum", {"stage": "test_observed"}) or 0.0
+    metrics.observe("test_observed", 0.25)
+    assert REGISTRY.get_sample_value("vitaai_stage_seconds_sum", {"stage": "test_observed"}) == before + 0.25
+    assert REGISTRY.get_sample_value(
+        "vitaai_stage_seconds_bucket", {"stage": "test_observed", "le": "0.25"}) >= 1
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.configure(enabled=False)
+    with metrics.timed("test_disabled"):
+        pass
+    metrics.observe("test_disabled", 1.0)
+    assert stage_count("test_disabled") == 0
+
+
+def test_requests_are_labelled_by_route_template_and_exported():
+    app = FastAPI()
+    app.middleware("http")(metrics_middleware)
+    app.include_router(metrics_router)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    body = client.get("/metrics").text
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    assert REGISTRY.get_sample_value("vitaai_http_requests_total", labels) == 2
+    assert 'route="/items/{item_id}"' in body
+    assert "vitaai_stage_seconds_bucket" in body
@@ -0,0 +1,33 @@
+"""Source metadata sent with each answer (modules/rag.py)."""
+from langchain_core.documents import Document
+
+from modules.merge import normalize_scores
+from modules.rag import source_metadata
+from modules.retrieval import tag_similarity
+
+
+def doc(source, text, source_type="Global"):
+    return Document(page_content=text, metadata={"source": source, "source_type": source_type})
+
+
+def test_score_is_vector_similarity_not_normalized_score():
+    # The best chunk of a namespace normalizes to 1.0 however weak its similarity is
+    hits = tag_similarity([(doc("a.pdf", "one"), 0.31), (doc("b.pdf", "two"), 0.22)])
+    sources = source_metadata(normalize_scores(hits))
+    assert sources == [
+        {"source": "a.pdf", "score": 0.31, "merge_score": 1.0, "type": "Global"},
+        {"source": "b.pdf", "score": 0.22, "merge_score": 0.0, "type": "Global"},
+    ]
+
+
+def test_keyword_only_hits_have_no_similarity():
+    keyword = doc("a.pdf", "keyword hit", "Private")
+    sources = source_metadata([(keyword, 0.9)])
+    assert sources == [{"source": "a.pdf", "score": None, "merge_score": 0.9, "type": "Private"}]
+
+
+def test_one_entry_per_source_with_its_best_similarity():
+    first, second = doc("a.pdf", "keyword hit"), doc("a.pdf", "vector hit")
+    second.metadata["similarity"] = 0.8
+    sources = source_metadata([(first, 0.9), (second, 0.5)])
+    assert sources == [{"source": "a.pdf", "score": 0.8, "merge_score": 0.9, "type": "Global"}]
@@ -0,0 +1,47 @@
+"""Metrics and baseline comparison of the offline RAG harness (benchmarks/rag_harness.py)."""
+import os
+
+from benchmarks.rag_harness import percentiles, answer_metrics, lookup, compare, synthetic_corpus
+
+
+def result(sources, ttft=10.0, total=100.0, error=False):
+    return {"sources": sources, "ttft_ms": ttft, "total_ms": total, "error": error}
+
+
+def test_nearest_rank_percentiles():
+    assert percentiles(list(range(1, 101))) == {"p50": 50, "p95": 95, "p99": 99}
+    assert percentiles([3.14159]) == {"p50": 3.1, "p95": 3.1, "p99": 3.1}
+    assert percentiles([]) == {"p50": None, "p95": None, "p99": None}
+
+
+def test_hit_rate_and_mrr_against_the_labels():
+    questions = [{"expected_source": "a.pdf"}, {"expected_source": "b.pdf"}, {"expected_source": "c.pdf"}]
+    results = [result(["a.pdf", "x.pdf"]), result(["x.pdf", "b.pdf"], error=True), result(["x.pdf"])]
+    answer, retrieval = answer_metrics(questions, results, concurrency=2)
+    assert retrieval == {"hit_rate": round(2 / 3, 4), "mrr": round(1.5 / 3, 4)}
+    assert (answer["questions"], answer["errors"], answer["concurrency"]) == (3, 1, 2)
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {"params": {"docs": 1}, "answer": {"ttft_ms": {"p50": 100.0}}, "retrieval": {"mrr": 0.9}}
+    slower = {"params": {"docs": 1}, "answer": {"ttft_ms": {"p50": 120.0}}, "retrieval": {"mrr": 0.9}}
+    faster_worse_mrr = {"params": {"docs": 1}, "answer": {"ttft_ms": {"p50": 80.0}}, "retrieval": {"mrr": 0.8}}
+    assert lookup(slower, "answer.ttft_ms.p50") == 120.0
+    assert lookup(slower, "ingestion.pages_per_s") is None
+    assert compare(slower, baseline, tolerance=0.1) == ["answer.ttft_ms.p50"]
+    assert compare(slower, baseline, tolerance=0.25) == []
+    assert compare(faster_worse_mrr, baseline, tolerance=0.1) == ["retrieval.mrr"]
+
+
+def test_synthetic_corpus_is_deterministic(tmp_path):
+    def corpus(name):
+        out_dir = tmp_path / name
+        out_dir.mkdir()
+        return out_dir, synthetic_corpus(str(out_dir), docs=3, pages=2, questions_per_doc=2, seed=7)
+
+    (dir_a, first), (dir_b, second) = corpus("a"), corpus("b")
+    assert first == second
+    assert len(first) == 6
+    assert sorted(os.listdir(dir_a)) == sorted({q["expected_source"] for q in first})
+    for name in os.listdir(dir_a):
+        assert (dir_a / name).read_bytes() == (dir_b / name).read_bytes()
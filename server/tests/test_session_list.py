@@ -0,0 +1,75 @@
+"""Session list ordered by last message, with denormalized count and preview."""
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.chat import ChatSession
+from models.message import MessageRole
+from schemas.message import MessageCreate
+import crud.chat as chat_crud
+import crud.message as message_crud
+from crud.message import session_activity, PREVIEW_CHARS
+from routes import chat
+from utils.auth_deps import get_token_principal
+from conftest import make_user, make_session
+
+
+def add_message(db, user, session, content):
+    return message_crud.create_message(db, MessageCreate(content=content, role=MessageRole.USER),
+                                       user.id, session.id)
+
+
+def age(db, *sessions):
+    """Gives the sessions distinct last_message_at values in the past, oldest first."""
+    for n, session in enumerate(sessions):
+        db.query(ChatSession).filter(ChatSession.id == session.id).update(
+            {ChatSession.last_message_at: datetime(2026, 1, 1, 9, n)})
+    db.commit()
+
+
+def test_preview_collapses_whitespace_and_truncates():
+    assert session_activity("  Is   this\n\nnormal? ")[ChatSession.last_preview] == "Is this normal?"
+    preview = session_activity("word " * 100)[ChatSession.last_preview]
+    assert len(preview) == PREVIEW_CHARS and preview.endswith("…")
+
+
+def test_messages_update_count_preview_and_order(db):
+    user = make_user(db, "list@example.com")
+    first, second = make_session(db, user, "First"), make_session(db, user, "Second")
+    age(db, first, second)
+    assert [s.title for s in chat_crud.get_user_sessions(db, user.id)] == ["Second", "First"]
+
+    add_message(db, user, first, "What does a high ALT mean?")
+    add_message(db, user, first, "It can point to liver inflammation.")
+    db.expire_all()
+    sessions = chat_crud.get_user_sessions(db, user.id)
+    assert [s.title for s in sessions] == ["First", "Second"]
+    assert (sessions[0].message_count, sessions[0].last_preview) == (2, "It can point to liver inflammation.")
+    assert (sessions[1].message_count, sessions[1].last_preview) == (0, None)
+
+
+@pytest.fixture
+def client(db):
+    user = make_user(db, "list@example.com")
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_token_principal] = lambda: user
+    client = TestClient(app)
+    client.user = user
+    return client
+
+
+def test_sessions_etag_changes_when_a_message_arrives(db, client):
+    session = make_session(db, client.user, "Labs")
+    age(db, session)
+    listed = client.get("/chat/sessions")
+    assert listed.json()[0]["message_count"] == 0
+    etag = listed.headers["ETag"]
+    assert client.get("/chat/sessions", headers={"If-None-Match": etag}).status_code == 304
+
+    add_message(db, client.user, session, "Results attached")
+    relisted = client.get("/chat/sessions", headers={"If-None-Match": etag})
+    assert relisted.status_code == 200
+    assert (relisted.json()[0]["message_count"], relisted.json()[0]["last_preview"]) == (1, "Results attached")
@@ -0,0 +1,76 @@
+"""
+SSE framing of the /ask stream. The client keeps its own SSEDecoder (client/utils/stream.py,
+deployed without the server code); these tests pin both decoders to sse_event's framing.
+"""
+import importlib.util
+import os
+import random
+
+import pytest
+
+from modules import stream_events as events
+from modules.stream_events import sse_event
+
+CLIENT_STREAM = os.path.join(os.path.dirname(__file__), "..", "..", "client", "utils", "stream.py")
+
+
+def load_client_decoder():
+    spec = importlib.util.spec_from_file_location("client_stream", CLIENT_STREAM)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SSEDecoder
+
+
+DECODERS = {"server": events.SSEDecoder, "client": load_client_decoder()}
+
+EVENTS = [
+    (events.TOKEN, {"text": "Metformin "}),
+    (events.TOKEN, {"text": "line one\n\nline two"}),       # frame boundary inside the text
+    (events.TOKEN, {"text": "data: event: ünïcode 💊"}),
+    (events.SOURCES, [{"source": "a.pdf", "score": 0.82, "merge_score": 1.0, "type": "Global"}]),
+    (events.USAGE, {"prompt_tokens": 12, "completion_tokens": 3, "cached": False}),
+    (events.DONE, {}),
+]
+KEEPALIVE = ": keepalive\n\n"
+
+
+def stream_text():
+    frames = [sse_event(event, data) for event, data in EVENTS]
+    frames.insert(2, KEEPALIVE)
+    return "".join(frames)
+
+
+def decode(decoder_cls, pieces):
+    decoder = decoder_cls()
+    out = []
+    for piece in pieces:
+        out.extend(decoder.feed(piece))
+    return out
+
+
+@pytest.mark.parametrize("side", DECODERS)
+def test_whole_stream(side):
+    assert decode(DECODERS[side], [stream_text()]) == EVENTS
+
+
+@pytest.mark.parametrize("side", DECODERS)
+def test_every_split_point(side):
+    text = stream_text()
+    for cut in range(len(text) + 1):
+        assert decode(DECODERS[side], [text[:cut], text[cut:]]) == EVENTS, cut
+
+
+def test_both_decoders_agree_on_random_chunking():
+    text = stream_text()
+    rng = random.Random(7)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 20)))
+        pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert decode(DECODERS["server"], pieces) == decode(DECODERS["client"], pieces) == EVENTS
+
+
+@pytest.mark.parametrize("side", DECODERS)
+def test_incomplete_frame_is_held_back(side):
+    decoder = DECODERS[side]()
+    assert decoder.feed(sse_event(events.TOKEN, {"text": "a"})[:-1]) == []
+    assert decoder.feed("\n") == [(events.TOKEN, {"text": "a"})]
@@ -0,0 +1,58 @@
+"""Uploads can only be ingested into a session the caller owns."""
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from modules import pdf_handlers
+from routes import upload_pdfs
+from utils.auth_deps import get_current_user
+from conftest import make_user, make_session
+
+
+@pytest.fixture
+def client(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_handlers, "UPLOAD_DIR", str(tmp_path))
+    owner, other = make_user(db, "owner@example.com"), make_user(db, "other@example.com")
+    session = make_session(db, owner)
+
+    queued = []
+    monkeypatch.setattr(upload_pdfs.process_documents_task, "delay",
+                        lambda **kwargs: queued.append(kwargs) or SimpleNamespace(id="task-1"))
+    app = FastAPI()
+    app.include_router(upload_pdfs.router)
+    current = {"user": owner}
+    app.dependency_overrides[get_current_user] = lambda: current["user"]
+    client = TestClient(app)
+    client.current, client.other, client.session_id, client.queued = current, other, session.id, queued
+    return client
+
+
+def upload_id(client):
+    response = client.put("/upload_files/stream", params={"filename": "labs.pdf"}, content=b"%PDF-1.4 test")
+    assert response.status_code == 200
+    return response.json()["upload_id"]
+
+
+def test_owner_can_process_uploads(client):
+    response = client.post("/upload_files/process",
+                           json={"upload_ids": [upload_id(client)], "session_id": client.session_id})
+    assert response.status_code == 202
+    assert [q["session_id"] for q in client.queued] == [client.session_id]
+
+
+def test_process_into_someone_elses_session_is_404(client):
+    uid = upload_id(client)
+    client.current["user"] = client.other
+    response = client.post("/upload_files/process", json={"upload_ids": [uid], "session_id": client.session_id})
+    assert response.status_code == 404
+    assert client.queued == []
+
+
+def test_multipart_upload_into_someone_elses_session_is_404(client):
+    client.current["user"] = client.other
+    response = client.post("/upload_files/", data={"session_id": str(client.session_id)},
+                           files={"files": ("labs.pdf", b"%PDF-1.4 test", "application/pdf")})
+    assert response.status_code == 404
+    assert client.queued == []
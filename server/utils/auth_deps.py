@@ -1,63 +1,117 @@
 # server/utils/auth_deps.py
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
-from database import get_db
-from config import SECRET_KEY, ALGORITHM
+from database import get_async_db
+from config import SECRET_KEY, ALGORITHM, user_cache
 from schemas.user import TokenData
-from models.user import User
-import crud.user as crud
+from models.user import User, UserRole
+import crud.aio.user as crud
 from logger import logger
+from modules.metrics import timed
 
 # This tells FastAPI to look for the token in the 'Authorization' header
 # 'tokenUrl="auth/login"' tells the /docs UI which endpoint to use to get the token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
-def get_current_user(
+
+def decode_token(token: str) -> dict:
+    """Decodes and validates the JWT, returning its payload."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        logger.warning(f"JWT Error: {e}")
+        raise credentials_exception
+
+    # The email is stored in the 'sub' field
+    if payload.get("sub") is None:
+        logger.warning("Token decoding error: 'sub' (email) field missing.")
+        raise credentials_exception
+    return payload
+
+
+def user_to_cache(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "role": user.role.value,
+        "is_active": user.is_active,
+        "is_verified": user.is_verified,
+    }
+
+
+def user_from_cache(data: dict) -> User:
+    """Rebuilds a detached User from cached fields (no DB session attached)."""
+    return User(
+        id=data["id"],
+        email=data["email"],
+        role=UserRole(data["role"]),
+        is_active=data["is_active"],
+        is_verified=data["is_verified"],
+    )
+
+
+async def get_current_user(
         token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """
     Dependency to get the current authenticated user.
 
     1. Decodes the JWT token.
     2. Validates the token data.
-    3. Fetches the user from the database.
+    3. Fetches the user from the user cache, falling back to the database.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        # Decode the token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    with timed("auth"):
+        token_data = TokenData(email=decode_token(token)["sub"])
 
-        # Extract the email (which we stored in the 'sub' field)
-        email: str = payload.get("sub")
-        if email is None:
-            logger.warning("Token decoding error: 'sub' (email) field missing.")
-            raise credentials_exception
+        cached = user_cache.get(token_data.email)
+        if cached is not None:
+            user = user_from_cache(cached)
+        else:
+            # Get the user from the database
+            user = await crud.get_user_by_email(db, email=token_data.email)
 
-        token_data = TokenData(email=email)
+            if user is None:
+                logger.warning(f"Token refers to non-existent user: {token_data.email}")
+                raise credentials_exception
 
-    except JWTError as e:
-        logger.warning(f"JWT Error: {e}")
-        raise credentials_exception
-
-    # Get the user from the database
-    user = crud.get_user_by_email(db, email=token_data.email)
-
-    if user is None:
-        logger.warning(f"Token refers to non-existent user: {token_data.email}")
-        raise credentials_exception
+            user_cache.set(token_data.email, user_to_cache(user))
 
     if not user.is_active:
         logger.warning(f"Token refers to inactive user: {user.email}")
         raise HTTPException(status_code=400, detail="Inactive user")
 
-    return user
\ No newline at end of file
+    return user
+
+
+async def get_token_principal(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Fast path for READ-ONLY endpoints.
+
+    Trusts the signed 'uid' and 'role' claims, so no cache or DB lookup is needed.
+    Users known (in-process) to be deactivated are still rejected.
+    Tokens issued before the 'uid' claim existed fall back to get_current_user.
+    """
+    with timed("auth_token"):
+        payload = decode_token(token)
+        if "uid" in payload and "role" in payload:
+            cached = user_cache.memory.get(payload["sub"])
+            if cached is not None and not cached["is_active"]:
+                logger.warning(f"Token refers to inactive user: {payload['sub']}")
+                raise HTTPException(status_code=400, detail="Inactive user")
+
+            return User(id=payload["uid"], email=payload["sub"], role=UserRole(payload["role"]), is_active=True)
+
+    return await get_current_user(token, db)
@@ -0,0 +1,22 @@
+import hashlib
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given values (anything with a stable str())."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """A 304 response if the client's If-None-Match already has `etag`, else None."""
+    header = request.headers.get("if-none-match")
+    if header and (header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    return None
+
+
+def set_etag(response: Response, etag: str):
+    # no-cache = "store it, but revalidate every time", which is what ETags are for
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
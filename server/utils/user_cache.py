@@ -0,0 +1,84 @@
+import json
+import threading
+from modules.embedding_cache import LRUCache
+from logger import logger
+
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+
+class UserCache:
+    """
+    Short-TTL cache of authenticated users, keyed on the JWT subject (email).
+
+    1. In-process LRU (no I/O).
+    2. Optional Redis tier shared by all API workers.
+
+    Invalidation (role change, deactivation) deletes the Redis entry and publishes
+    the email on INVALIDATION_CHANNEL so every worker drops its in-process copy.
+    """
+
+    def __init__(self, redis_client=None, max_size: int = 10000,
+                 local_ttl: float = 30, redis_ttl: int = 300):
+        self.redis = redis_client
+        self.redis_ttl = redis_ttl
+        self.memory = LRUCache(max_size=max_size, ttl=local_ttl)
+        self._listener = None
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return f"user_cache:{email}"
+
+    def get(self, email: str) -> dict | None:
+        data = self.memory.get(email)
+        if data is not None:
+            return data
+
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self._key(email))
+                if raw:
+                    data = json.loads(raw)
+                    self.memory.set(email, data)
+                    return data
+            except Exception as e:
+                logger.warning(f"User cache Redis read failed: {e}")
+        return None
+
+    def set(self, email: str, data: dict):
+        self.memory.set(email, data)
+        if self.redis is not None:
+            try:
+                self.redis.setex(self._key(email), self.redis_ttl, json.dumps(data))
+            except Exception as e:
+                logger.warning(f"User cache Redis write failed: {e}")
+
+    def invalidate(self, email: str):
+        """Drops a user everywhere. Call after changing role, is_active or is_verified."""
+        self.memory.delete(email)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self._key(email))
+                self.redis.publish(INVALIDATION_CHANNEL, email)
+            except Exception as e:
+                logger.warning(f"User cache invalidation failed for {email}: {e}")
+
+    def start_invalidation_listener(self):
+        """Runs a daemon thread that applies invalidations published by other processes."""
+        if self.redis is None or self._listener is not None:
+            return
+
+        def listen():
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    email = message.get("data")
+                    if isinstance(email, bytes):
+                        email = email.decode("utf-8")
+                    if email:
+                        self.memory.delete(email)
+            except Exception as e:
+                logger.error(f"User cache invalidation listener stopped: {e}")
+
+        self._listener = threading.Thread(target=listen, name="user-cache-invalidation", daemon=True)
+        self._listener.start()
@@ -3,6 +3,9 @@
 # Move into the server directory where main.py is
 cd server
 
+# 0. Apply schema migrations (new columns/indexes on an existing database)
+alembic upgrade head
+
 # 1. Start Celery Worker (Background process)
 # --pool=solo is used because we are in a simple container environment
 celery -A celery_app worker --loglevel=info --pool=solo &